@@ -17,6 +17,10 @@ CREATE INDEX IF NOT EXISTS idx_orders_customer_id ON orders(customer_id);
 CREATE INDEX IF NOT EXISTS idx_orders_order_date ON orders(order_date);
 CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(order_status);
 
+-- Indexes for timestamp-based change detection
+CREATE INDEX IF NOT EXISTS idx_orders_last_updated ON orders(last_updated);
+CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders(created_at);
+
 -- Insert some initial sample data
 INSERT INTO orders (customer_id, product_id, quantity, unit_price, order_status) VALUES
 (1, 101, 2, 29.99, 'completed'),
@@ -1,37 +1,50 @@
 #!/usr/bin/env python3
 """
-Check warehouse database indexes for dim_orders_history table.
+Check warehouse database indexes for the SCD2 tables.
 """
 
-import psycopg2
-import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
 
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+from src.utils.db_pool import pooled_connection
+
 load_dotenv()
 
+# Suffix of the per-partition partial unique indexes enforcing one current
+# version per order in orders_dim
+CURRENT_KEY_SUFFIX = '_current_key'
+
 def check_indexes():
-    conn = psycopg2.connect(
-        host=os.getenv('WAREHOUSE_DB_HOST', 'localhost'),
-        port=os.getenv('WAREHOUSE_DB_PORT', '5433'),
-        database=os.getenv('WAREHOUSE_DB_NAME', 'warehouse_db'),
-        user=os.getenv('WAREHOUSE_DB_USER', 'postgres'),
-        password=os.getenv('WAREHOUSE_DB_PASSWORD', 'postgres')
-    )
-
-    cursor = conn.cursor()
-    cursor.execute("""
-SELECT indexname, indexdef 
-FROM pg_indexes 
-WHERE tablename = 'dim_orders_history'
-ORDER BY indexname;
+    with pooled_connection('warehouse') as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+SELECT tablename, indexname, indexdef
+FROM pg_indexes
+WHERE tablename = 'dim_orders_history' OR tablename LIKE 'orders\\_dim%'
+ORDER BY tablename, indexname;
 """)
 
-    indexes = cursor.fetchall()
-    print('Current indexes on dim_orders_history:')
-    for idx in indexes:
-        print(f'  {idx[0]}: {idx[1]}')
+        indexes = cursor.fetchall()
+
+    tables = sorted({idx[0] for idx in indexes} | {'dim_orders_history', 'orders_dim'})
+    for table in tables:
+        print(f'Current indexes on {table}:')
+        for idx in indexes:
+            if idx[0] == table:
+                marker = '  [current-version key]' if idx[1].endswith(CURRENT_KEY_SUFFIX) else ''
+                print(f'  {idx[1]}: {idx[2]}{marker}')
 
-    conn.close()
+    missing = [
+        table for table in tables
+        if table.startswith('orders_dim_')
+        and not any(idx[0] == table and idx[1].endswith(CURRENT_KEY_SUFFIX) for idx in indexes)
+    ]
+    for table in missing:
+        print(f'WARNING: {table} has no {CURRENT_KEY_SUFFIX} index; it does not '
+              f'enforce a single current version per order')
 
 if __name__ == "__main__":
     check_indexes()
@@ -7,15 +7,16 @@ import sys
 import os
 from pathlib import Path
 
-# Add src to path
-sys.path.append(str(Path(__file__).parent.parent / "src"))
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
 
-import psycopg2
-import json
 import time
 from datetime import datetime, timezone, timedelta
 from dotenv import load_dotenv
 
+from src.utils.db_pool import pooled_connection
+from src.utils.json_io import write_json_file
+
 load_dotenv()
 
 def create_test_batch():
@@ -37,8 +38,8 @@ def create_test_batch():
             "last_updated": "2026-02-01T20:00:00",
             "created_at": "2026-02-01T20:00:00",
             "operation_type": "INSERT",
-            "cdc_timestamp": (base_time).isoformat(),
-            "extracted_at": (base_time).isoformat()
+            "cdc_timestamp": base_time,
+            "extracted_at": base_time
         },
         {
             "id": 999,
@@ -52,8 +53,8 @@ def create_test_batch():
             "last_updated": "2026-02-01T20:01:00",
             "created_at": "2026-02-01T20:00:00",
             "operation_type": "UPDATE",
-            "cdc_timestamp": (base_time.replace(second=1)).isoformat(),
-            "extracted_at": (base_time.replace(second=1)).isoformat()
+            "cdc_timestamp": base_time.replace(second=1),
+            "extracted_at": base_time.replace(second=1)
         },
         {
             "id": 999,
@@ -67,17 +68,17 @@ def create_test_batch():
             "last_updated": "2026-02-01T20:02:00",
             "created_at": "2026-02-01T20:00:00",
             "operation_type": "UPDATE",
-            "cdc_timestamp": (base_time.replace(second=2)).isoformat(),
-            "extracted_at": (base_time.replace(second=2)).isoformat()
+            "cdc_timestamp": base_time.replace(second=2),
+            "extracted_at": base_time.replace(second=2)
         }
     ]
     
     # Create batch data
     batch_data = {
         "batch_metadata": {
-            "extracted_at": base_time.isoformat(),
+            "extracted_at": base_time,
             "change_count": len(changes),
-            "watermark": (base_time - timedelta(minutes=5)).isoformat()
+            "watermark": base_time - timedelta(minutes=5)
         },
         "changes": changes
     }
@@ -90,8 +91,7 @@ def create_test_batch():
     timestamp = base_time.strftime("%Y%m%d_%H%M%S_%f")[:-3]
     batch_file = cdc_dir / f"test_rapid_updates_{timestamp}.json"
     
-    with open(batch_file, 'w') as f:
-        json.dump(batch_data, f, indent=2)
+    write_json_file(batch_file, batch_data, indent=True)
     
     print(f"Created test batch file: {batch_file}")
     return batch_file
@@ -115,24 +115,17 @@ def test_rapid_updates():
     
     # Check results in warehouse
     print("\nChecking results in warehouse...")
-    conn = psycopg2.connect(
-        host=os.getenv('WAREHOUSE_DB_HOST', 'localhost'),
-        port=os.getenv('WAREHOUSE_DB_PORT', '5433'),
-        database=os.getenv('WAREHOUSE_DB_NAME', 'warehouse_db'),
-        user=os.getenv('WAREHOUSE_DB_USER', 'postgres'),
-        password=os.getenv('WAREHOUSE_DB_PASSWORD', 'postgres')
-    )
-    
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT surrogate_key, order_key, quantity, unit_price, order_status,
-               valid_from, valid_to, is_current, cdc_operation
-        FROM dim_orders_history 
-        WHERE order_key = 999
-        ORDER BY valid_from
-    """)
-    
-    records = cursor.fetchall()
+    with pooled_connection('warehouse') as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT surrogate_key, order_key, quantity, unit_price, order_status,
+                   valid_from, valid_to, is_current, cdc_operation
+            FROM dim_orders_history 
+            WHERE order_key = 999
+            ORDER BY valid_from
+        """)
+        
+        records = cursor.fetchall()
     
     print(f"\nFound {len(records)} records for order 999:")
     for record in records:
@@ -7,72 +7,261 @@ Implements SCD Type 2 logic for historical tracking.
 """
 
 import os
+import io
 import sys
-import json
+import csv
+import threading
 import logging
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 
 import psycopg2
+import psycopg2.errors
 from psycopg2 import sql
 from dotenv import load_dotenv
 
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.utils.db_pool import POOL_MAX_SIZE, acquire_connection, release_connection
+from src.utils.json_io import is_batch_file, load_batch_changes
+from src.utils.logging_config import setup_logging
+
 # Load environment variables
 load_dotenv()
 
-# Configure structured logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('change_processor.log')
-    ]
-)
+# Handlers are attached by setup_logging in main(), so importing the module
+# starts no logging thread and opens no log file
 logger = logging.getLogger(__name__)
 
+# Version of the orders_dim schema recorded in cdc_meta. Bump it whenever
+# _create_warehouse_schema changes so existing warehouses are migrated.
+SCHEMA_COMPONENT = 'change_processor'
+SCHEMA_VERSION = 4
+
+# Rows per multi-row statement; a batch's statements share one round-trip
+BATCH_PAGE_SIZE = 1000
+
+# Batches with at least this many new versions are staged through COPY
+COPY_THRESHOLD = int(os.getenv('CDC_COPY_THRESHOLD', '5000'))
+
+# Only process batch files extracted at or before this UTC time (ISO format)
+PROCESS_HORIZON = (
+    datetime.fromisoformat(os.environ['CDC_PROCESS_HORIZON'])
+    if os.getenv('CDC_PROCESS_HORIZON') else None
+)
+
+# Skip the WAL flush wait on batch commits; unprocessed files are replayed
+# after a crash, so losing the last few commits is recoverable
+ASYNC_COMMIT = os.getenv('CDC_ASYNC_COMMIT', 'true').lower() == 'true'
+
+# Batch files applied concurrently; 1 keeps processing sequential
+PROCESS_WORKERS = int(os.getenv('CDC_PROCESS_WORKERS', '1'))
+
+# Replay-only indexes dropped during bulk mode and rebuilt afterwards.
+# The per-partition *_current_key indexes are kept because they guard one
+# current version per order within a partition and serve the
+# close-current-row lookup.
+BULK_MODE_INDEXES = {
+    'idx_orders_dim_order_key': 'orders_dim(order_key)',
+    'idx_orders_dim_valid_from': 'orders_dim(valid_from)',
+}
+
+# Memory for rebuilding indexes after a bulk replay
+BULK_MAINTENANCE_WORK_MEM = os.getenv('CDC_BULK_MAINTENANCE_WORK_MEM', '1GB')
+
+# orders_dim columns carried by every incoming change
+VERSION_COLUMNS = (
+    'order_key', 'customer_id', 'product_id', 'quantity',
+    'unit_price', 'total_amount', 'order_status', 'order_date',
+    'valid_from', 'cdc_operation', 'cdc_timestamp'
+)
+
+# Builds a VERSION_COLUMNS row from a change record in one C-level call.
+# Values are passed through as decoded from JSON; numeric and timestamp
+# parsing happens server-side.
+version_row = itemgetter(
+    'id', 'customer_id', 'product_id', 'quantity',
+    'unit_price', 'total_amount', 'order_status', 'order_date',
+    'cdc_timestamp', 'operation_type', 'cdc_timestamp'
+)
+
+# DELETE rows only close the current version, so they carry no payload
+DELETE_PAYLOAD = (None,) * 7
+
+# Postgres types of incoming VERSION_COLUMNS, used to type the prepared
+# statement and the COPY stage table
+VERSION_TYPES = (
+    'integer', 'integer', 'integer', 'integer',
+    'numeric', 'numeric', 'varchar', 'timestamp',
+    'timestamp', 'varchar', 'timestamp'
+)
+
+# Closes current rows and inserts new versions in a single statement. The
+# scalar subquery on "closed" forces the UPDATE to run before any row is
+# inserted, so the old and new versions are never current together.
+# Every incoming order's current version is closed, whatever the operation:
+# orders_dim's unique current-version indexes are per partition, so a new
+# version in another month than the current one would not be caught there.
+SCD2_APPLY_SQL = """
+    WITH incoming ({columns}) AS ({{source}}),
+    closed AS (
+        UPDATE orders_dim AS d
+        SET valid_to = i.cdc_timestamp, is_current = FALSE
+        FROM incoming AS i
+        WHERE d.order_key = i.order_key
+          AND d.is_current = TRUE
+        RETURNING d.order_key
+    )
+    INSERT INTO orders_dim ({columns})
+    SELECT {columns} FROM incoming
+    WHERE cdc_operation IN ('INSERT', 'UPDATE')
+      AND (SELECT count(*) FROM closed) >= 0
+""".format(columns=', '.join(VERSION_COLUMNS))
+
+# SCD2_APPLY_SQL prepared once per connection. Each parameter is one column
+# of the page as an array, so a page of any size reuses the same plan.
+SCD2_APPLY_STATEMENT = 'scd2_apply'
+SCD2_APPLY_PREPARE = "PREPARE {name} ({types}) AS {body}".format(
+    name=SCD2_APPLY_STATEMENT,
+    types=', '.join(f'{t}[]' for t in VERSION_TYPES),
+    body=SCD2_APPLY_SQL.format(source="SELECT * FROM unnest({})".format(
+        ', '.join(f'${i}' for i in range(1, len(VERSION_COLUMNS) + 1))
+    ))
+)
+SCD2_APPLY_EXECUTE = "EXECUTE {name} ({params})".format(
+    name=SCD2_APPLY_STATEMENT,
+    params=', '.join(f'%s::{t}[]' for t in VERSION_TYPES)
+)
+
 class ChangeProcessor:
     """
     Processes CDC change logs and applies SCD Type 2 transformations
     for loading into the warehouse database.
     """
     
-    def __init__(self):
-        """Initialize database connection to warehouse."""
+    def __init__(self, bulk_mode: Optional[bool] = None):
+        """
+        Initialize database connection to warehouse.
+        
+        Args:
+            bulk_mode: Drop replay-only indexes while processing and rebuild
+                them afterwards. Defaults to the CDC_BULK_MODE env variable.
+        """
+        if bulk_mode is None:
+            bulk_mode = os.getenv('CDC_BULK_MODE', 'false').lower() == 'true'
+        self.bulk_mode = bulk_mode
         self.warehouse_connection = None
         self.cdc_logs_dir = Path("data/cdc_logs")
         self.processed_log = Path("data/cdc_logs/.processed_files")
+        self._processed: Set[str] = set()
+        self._pending_marks: List[str] = []
+        self._partitions: Set[str] = set()
+        self._partition_lock = threading.Lock()
         self._connect()
         self._ensure_processed_log()
         
     def _ensure_processed_log(self) -> None:
-        """Ensure processed files tracking exists."""
+        """Ensure processed files tracking exists and load it once."""
         self.processed_log.touch()
+        self._processed = self._get_processed_files()
         
     def _connect(self) -> None:
-        """Connect to warehouse database."""
+        """Acquire a warehouse connection from the shared pool."""
         try:
-            self.warehouse_connection = psycopg2.connect(
-                host=os.getenv('WAREHOUSE_DB_HOST', 'localhost'),
-                port=os.getenv('WAREHOUSE_DB_PORT', '5433'),
-                database=os.getenv('WAREHOUSE_DB_NAME', 'warehouse_db'),
-                user=os.getenv('WAREHOUSE_DB_USER', 'postgres'),
-                password=os.getenv('WAREHOUSE_DB_PASSWORD', 'postgres')
-            )
-            self.warehouse_connection.autocommit = False
+            self.warehouse_connection = acquire_connection('warehouse')
             logger.info("Successfully connected to warehouse_db")
         except psycopg2.OperationalError as e:
             logger.error(f"Failed to connect to warehouse_db: {e}")
             raise
     
+    def _reconnect(self) -> None:
+        """Discard a broken warehouse connection and acquire a fresh one."""
+        if self.warehouse_connection is not None:
+            release_connection(self.warehouse_connection, 'warehouse', discard=True)
+        self.warehouse_connection = None
+        self._connect()
+        self._prepare_statements()
+    
+    def _schema_is_current(self) -> bool:
+        """Check the cdc_meta sentinel for an up-to-date warehouse schema."""
+        try:
+            with self.warehouse_connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT schema_version FROM cdc_meta WHERE component = %s",
+                    (SCHEMA_COMPONENT,)
+                )
+                row = cursor.fetchone()
+            self.warehouse_connection.commit()
+            return row is not None and row[0] >= SCHEMA_VERSION
+        except psycopg2.errors.UndefinedTable:
+            self.warehouse_connection.rollback()
+            return False
+    
     def _create_warehouse_schema(self) -> None:
         """Create SCD Type 2 schema in warehouse."""
         try:
             with self.warehouse_connection.cursor() as cursor:
                 cursor.execute(sql.SQL("""
+                    -- Restore the column types narrowed by schema versions 2
+                    -- and 3 (order_status_t enum, single-letter cdc_operation)
+                    DO $$
+                    BEGIN
+                        IF EXISTS (
+                            SELECT 1 FROM information_schema.columns
+                            WHERE table_schema = current_schema() AND table_name = 'orders_dim'
+                              AND column_name = 'order_status' AND data_type = 'USER-DEFINED'
+                        ) THEN
+                            ALTER TABLE orders_dim
+                                ALTER COLUMN order_status TYPE VARCHAR(50)
+                                USING order_status::text;
+                        END IF;
+                        IF EXISTS (
+                            SELECT 1 FROM information_schema.columns
+                            WHERE table_schema = current_schema() AND table_name = 'orders_dim'
+                              AND column_name = 'cdc_operation' AND character_maximum_length = 1
+                        ) THEN
+                            ALTER TABLE orders_dim
+                                ALTER COLUMN cdc_operation TYPE VARCHAR(10)
+                                USING CASE cdc_operation
+                                    WHEN 'I' THEN 'INSERT'
+                                    WHEN 'U' THEN 'UPDATE'
+                                    WHEN 'D' THEN 'DELETE'
+                                END;
+                        END IF;
+                    END $$;
+                    DROP TYPE IF EXISTS order_status_t;
+                    
+                    -- Move an unpartitioned table from schema version 1/2 aside;
+                    -- its rows are copied into the partitioned table below
+                    DO $$
+                    DECLARE
+                        relation TEXT;
+                    BEGIN
+                        IF EXISTS (
+                            SELECT 1 FROM pg_class
+                            WHERE oid = to_regclass('orders_dim') AND relkind = 'r'
+                        ) THEN
+                            ALTER TABLE orders_dim RENAME TO orders_dim_unpartitioned;
+                            FOREACH relation IN ARRAY ARRAY[
+                                'orders_dim_pkey', 'orders_dim_order_key_valid_from_key',
+                                'idx_orders_dim_order_key', 'idx_orders_dim_valid_from',
+                                'idx_orders_dim_current', 'idx_orders_dim_current_key'
+                            ] LOOP
+                                EXECUTE format('ALTER INDEX IF EXISTS %I RENAME TO %I',
+                                               relation, relation || '_unpartitioned');
+                            END LOOP;
+                            ALTER SEQUENCE IF EXISTS orders_dim_surrogate_key_seq
+                                RENAME TO orders_dim_unpartitioned_surrogate_key_seq;
+                        END IF;
+                    END $$;
+                    
+                    -- Monthly range partitions on valid_from; rows outside any
+                    -- month partition land in orders_dim_default
                     CREATE TABLE IF NOT EXISTS orders_dim (
-                        surrogate_key SERIAL PRIMARY KEY,
+                        surrogate_key SERIAL,
                         order_key INTEGER NOT NULL,
                         customer_id INTEGER NOT NULL,
                         product_id INTEGER NOT NULL,
@@ -87,13 +276,88 @@ class ChangeProcessor:
                         cdc_operation VARCHAR(10) NOT NULL,
                         cdc_timestamp TIMESTAMP NOT NULL,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (surrogate_key, valid_from),
                         UNIQUE(order_key, valid_from)
-                    );
+                    ) PARTITION BY RANGE (valid_from);
                     
                     CREATE INDEX IF NOT EXISTS idx_orders_dim_order_key ON orders_dim(order_key);
-                    CREATE INDEX IF NOT EXISTS idx_orders_dim_current ON orders_dim(is_current);
                     CREATE INDEX IF NOT EXISTS idx_orders_dim_valid_from ON orders_dim(valid_from);
+                    
+                    -- Creates the month partition holding month_start. Each
+                    -- partition gets a partial unique index allowing at most one
+                    -- current version per order, which also serves the
+                    -- close-current-row lookup index-only. Postgres cannot
+                    -- enforce it on the parent since it omits valid_from;
+                    -- across partitions SCD2_APPLY_SQL keeps one current
+                    -- version by closing it before every new version.
+                    CREATE OR REPLACE FUNCTION orders_dim_ensure_partition(month_start DATE)
+                    RETURNS VOID AS $$
+                    DECLARE
+                        first_day DATE := date_trunc('month', month_start)::DATE;
+                        child TEXT := 'orders_dim_' || to_char(month_start, 'YYYY_MM');
+                    BEGIN
+                        IF to_regclass(child) IS NULL THEN
+                            EXECUTE format(
+                                'CREATE TABLE %I PARTITION OF orders_dim FOR VALUES FROM (%L) TO (%L)',
+                                child, first_day, (first_day + INTERVAL '1 month')::DATE
+                            );
+                        END IF;
+                        EXECUTE format(
+                            'CREATE UNIQUE INDEX IF NOT EXISTS %I ON %I (order_key) '
+                            'INCLUDE (valid_from) WHERE is_current',
+                            child || '_current_key', child
+                        );
+                    END $$ LANGUAGE plpgsql;
+                    
+                    CREATE TABLE IF NOT EXISTS orders_dim_default PARTITION OF orders_dim DEFAULT;
+                    CREATE UNIQUE INDEX IF NOT EXISTS orders_dim_default_current_key
+                        ON orders_dim_default(order_key) INCLUDE (valid_from) WHERE is_current;
+                    
+                    DO $$
+                    DECLARE
+                        month_start DATE;
+                    BEGIN
+                        IF to_regclass('orders_dim_unpartitioned') IS NOT NULL THEN
+                            FOR month_start IN
+                                SELECT DISTINCT date_trunc('month', valid_from)::DATE
+                                FROM orders_dim_unpartitioned
+                            LOOP
+                                PERFORM orders_dim_ensure_partition(month_start);
+                            END LOOP;
+                            
+                            INSERT INTO orders_dim (
+                                surrogate_key, order_key, customer_id, product_id, quantity,
+                                unit_price, total_amount, order_status, order_date, valid_from,
+                                valid_to, is_current, cdc_operation, cdc_timestamp, created_at
+                            )
+                            SELECT
+                                surrogate_key, order_key, customer_id, product_id, quantity,
+                                unit_price, total_amount, order_status, order_date, valid_from,
+                                valid_to, is_current, cdc_operation, cdc_timestamp, created_at
+                            FROM orders_dim_unpartitioned;
+                            
+                            PERFORM setval(
+                                pg_get_serial_sequence('orders_dim', 'surrogate_key'),
+                                COALESCE((SELECT max(surrogate_key) FROM orders_dim), 0) + 1,
+                                false
+                            );
+                            DROP TABLE orders_dim_unpartitioned;
+                        END IF;
+                    END $$;
+                    
+                    CREATE TABLE IF NOT EXISTS cdc_meta (
+                        component VARCHAR(50) PRIMARY KEY,
+                        schema_version INTEGER NOT NULL,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    );
                 """))
+                cursor.execute("""
+                    INSERT INTO cdc_meta (component, schema_version)
+                    VALUES (%s, %s)
+                    ON CONFLICT (component) DO UPDATE
+                    SET schema_version = EXCLUDED.schema_version,
+                        updated_at = CURRENT_TIMESTAMP
+                """, (SCHEMA_COMPONENT, SCHEMA_VERSION))
                 
                 self.warehouse_connection.commit()
                 logger.info("Created warehouse schema")
@@ -103,6 +367,69 @@ class ChangeProcessor:
             logger.error(f"Failed to create warehouse schema: {e}")
             raise
     
+    def _drop_bulk_mode_indexes(self) -> None:
+        """Drop indexes that only slow down a bulk replay."""
+        try:
+            with self.warehouse_connection.cursor() as cursor:
+                cursor.execute(f"DROP INDEX IF EXISTS {', '.join(BULK_MODE_INDEXES)}")
+            self.warehouse_connection.commit()
+            logger.info(f"Bulk mode: dropped indexes {', '.join(BULK_MODE_INDEXES)}")
+        except psycopg2.Error as e:
+            self.warehouse_connection.rollback()
+            logger.error(f"Failed to drop indexes for bulk mode: {e}")
+            raise
+    
+    def _rebuild_bulk_mode_indexes(self) -> None:
+        """
+        Recreate the indexes dropped for bulk mode.
+        
+        orders_dim is partitioned and Postgres cannot build partitioned
+        indexes CONCURRENTLY, so writers are blocked until this commits.
+        """
+        self.warehouse_connection.rollback()
+        try:
+            with self.warehouse_connection.cursor() as cursor:
+                cursor.execute("SET LOCAL maintenance_work_mem = %s", (BULK_MAINTENANCE_WORK_MEM,))
+                for name, target in BULK_MODE_INDEXES.items():
+                    cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+            self.warehouse_connection.commit()
+            logger.info(f"Bulk mode: rebuilt indexes {', '.join(BULK_MODE_INDEXES)}")
+        except psycopg2.Error as e:
+            self.warehouse_connection.rollback()
+            logger.error(f"Failed to rebuild bulk mode indexes: {e}")
+            raise
+    
+    def _ensure_partitions(self, valid_from: Tuple) -> None:
+        """
+        Create the monthly orders_dim partitions a batch will insert into.
+        
+        Runs on the processor's own connection and commits before the batch
+        transaction starts, so concurrent batch workers never hold the
+        partition DDL lock.
+        
+        Args:
+            valid_from: valid_from values of the batch (ISO timestamps)
+        """
+        months = {str(value)[:7] for value in valid_from} - self._partitions
+        if not months:
+            return
+        
+        with self._partition_lock:
+            months -= self._partitions
+            if not months:
+                return
+            
+            try:
+                with self.warehouse_connection.cursor() as cursor:
+                    for month in sorted(months):
+                        cursor.execute("SELECT orders_dim_ensure_partition(%s)", (f"{month}-01",))
+                self.warehouse_connection.commit()
+                self._partitions |= months
+            except psycopg2.Error as e:
+                self.warehouse_connection.rollback()
+                logger.error(f"Failed to create orders_dim partitions {sorted(months)}: {e}")
+                raise
+    
     def _get_processed_files(self) -> set:
         """Get set of already processed CDC log files."""
         if not self.processed_log.exists():
@@ -115,142 +442,333 @@ class ChangeProcessor:
             return set()
     
     def _mark_file_processed(self, filename: str) -> None:
-        """Mark a CDC log file as processed."""
+        """Mark a CDC log file as processed; persisted by _flush_processed."""
+        self._processed.add(filename)
+        self._pending_marks.append(filename)
+    
+    def _flush_processed(self) -> None:
+        """Append all pending processed-file marks in a single write."""
+        if not self._pending_marks:
+            return
+        
         try:
-            with open(self.processed_log, 'a') as f:
-                f.write(f"{filename}\n")
+            with open(self.processed_log, 'a', buffering=1 << 16) as f:
+                f.write('\n'.join(self._pending_marks) + '\n')
+            self._pending_marks.clear()
         except IOError as e:
-            logger.error(f"Failed to mark file as processed: {e}")
+            logger.error(f"Failed to mark files as processed: {e}")
+    
+    @staticmethod
+    def _batch_file_time(filename: str) -> Optional[datetime]:
+        """Parse the extraction time from a changes_YYYYMMDD_HHMMSS_mmm.json name."""
+        try:
+            return datetime.strptime(filename[8:23], '%Y%m%d_%H%M%S')
+        except ValueError:
+            return None
+    
+    def _pending_batch_files(self) -> List[Path]:
+        """
+        List unprocessed batch files in extraction order.
+        
+        Scans the log directory once, filtering out processed files before
+        sorting. Files extracted after PROCESS_HORIZON (when set) are left for
+        a later run.
+        
+        Returns:
+            Paths of batch files to process
+        """
+        with os.scandir(self.cdc_logs_dir) as entries:
+            names = sorted(
+                entry.name for entry in entries
+                if is_batch_file(entry.name)
+                and entry.name not in self._processed
+            )
+        
+        pending = []
+        for name in names:
+            if PROCESS_HORIZON is not None:
+                file_time = self._batch_file_time(name)
+                if file_time is not None and file_time > PROCESS_HORIZON:
+                    break
+            pending.append(self.cdc_logs_dir / name)
+        
+        return pending
     
-    def _process_change_record(self, change: Dict[str, Any]) -> None:
+    def _compact_changes(self, changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
-        Process a single change record using SCD Type 2 logic.
+        Collapse runs of changes to the same order into their net effect.
+        
+        Rapid updates to one order only need the final state in the warehouse,
+        so each order_key is reduced to its latest change, keeping that
+        change's operation and values (e.g. INSERT followed by updates -> one
+        UPDATE, anything ending in DELETE -> one DELETE). SCD2_APPLY_SQL
+        closes the order's current version whatever the operation, so
+        dropping the earlier changes never leaves two current versions.
         
         Args:
-            change: Change record from CDC log
+            changes: Change records from a CDC batch file
+            
+        Returns:
+            One change record per order_key
         """
-        try:
-            with self.warehouse_connection.cursor() as cursor:
-                order_key = change['id']
-                operation = change['operation_type']
+        last: Dict[int, Dict[str, Any]] = {}
+        
+        # Single pass keeping the latest change per order; ties on
+        # cdc_timestamp keep file order
+        for change in changes:
+            if change['operation_type'] not in ('INSERT', 'UPDATE', 'DELETE'):
+                logger.warning(f"Skipping unknown operation {change['operation_type']} for order {change['id']}")
+                continue
+            
+            order_key = change['id']
+            latest = last.get(order_key)
+            if latest is None or change['cdc_timestamp'] >= latest['cdc_timestamp']:
+                last[order_key] = change
+        
+        return list(last.values())
+    
+    def _plan_batch(self, changes: List[Dict[str, Any]]) -> List[Tuple]:
+        """
+        Turn a batch of changes into incoming columns for SCD2_APPLY_SQL.
+        
+        Args:
+            changes: Change records from a CDC batch file
+            
+        Returns:
+            One tuple per VERSION_COLUMNS column, holding one value per
+            order_key (empty when there is nothing to apply). DELETE rows only
+            carry the key and timestamps since they close the current row
+            without inserting a new version.
+        """
+        rows = []
+        
+        for change in self._compact_changes(changes):
+            if change['operation_type'] == 'DELETE':
                 cdc_timestamp = change['cdc_timestamp']
-                
-                if operation == 'DELETE':
-                    # For deletes, close the current record
-                    cursor.execute(sql.SQL("""
-                        UPDATE orders_dim 
-                        SET valid_to = %s, is_current = FALSE
-                        WHERE order_key = %s AND is_current = TRUE
-                    """), (cdc_timestamp, order_key))
-                    
-                elif operation == 'INSERT':
-                    # For inserts, create new current record
-                    cursor.execute(sql.SQL("""
-                        INSERT INTO orders_dim (
-                            order_key, customer_id, product_id, quantity,
-                            unit_price, total_amount, order_status, order_date,
-                            valid_from, cdc_operation, cdc_timestamp
-                        ) VALUES (
-                            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                        )
-                    """), (
-                        order_key,
-                        change['customer_id'],
-                        change['product_id'],
-                        change['quantity'],
-                        change['unit_price'],
-                        change['total_amount'],
-                        change['order_status'],
-                        change['order_date'],
-                        cdc_timestamp,
-                        operation,
-                        cdc_timestamp
-                    ))
-                    
-                elif operation == 'UPDATE':
-                    # For updates, close current record and create new one
-                    cursor.execute(sql.SQL("""
-                        UPDATE orders_dim 
-                        SET valid_to = %s, is_current = FALSE
-                        WHERE order_key = %s AND is_current = TRUE
-                    """), (cdc_timestamp, order_key))
-                    
-                    cursor.execute(sql.SQL("""
-                        INSERT INTO orders_dim (
-                            order_key, customer_id, product_id, quantity,
-                            unit_price, total_amount, order_status, order_date,
-                            valid_from, cdc_operation, cdc_timestamp
-                        ) VALUES (
-                            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                        )
-                    """), (
-                        order_key,
-                        change['customer_id'],
-                        change['product_id'],
-                        change['quantity'],
-                        change['unit_price'],
-                        change['total_amount'],
-                        change['order_status'],
-                        change['order_date'],
-                        cdc_timestamp,
-                        operation,
-                        cdc_timestamp
-                    ))
-                
-                self.warehouse_connection.commit()
-                logger.debug(f"Processed {operation} for order {order_key}")
-                
+                rows.append((change['id'], *DELETE_PAYLOAD, cdc_timestamp, 'DELETE', cdc_timestamp))
+            else:
+                rows.append(version_row(change))
+        
+        # Transpose once so statements can bind whole columns
+        return list(zip(*rows))
+    
+    def _copy_rows(self, cursor, table: str, columns: Tuple[str, ...], rows: Iterable[Tuple]) -> None:
+        """Stream rows into a table with COPY ... FROM STDIN (CSV)."""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    
+    def _session_settings(self) -> str:
+        """Transaction-local settings sent ahead of each batch's statements."""
+        return "SET LOCAL synchronous_commit = off;" if ASYNC_COMMIT else ""
+    
+    def _apply_changes_copy(self, cursor, columns: List[Tuple]) -> None:
+        """
+        Apply a large batch by staging it through COPY.
+        
+        Columns are zipped back into rows, streamed into a transaction-scoped temp table and merged
+        into orders_dim with SCD2_APPLY_SQL.
+        """
+        cursor.execute(f"""
+            {self._session_settings()}
+            CREATE TEMP TABLE stage_orders (
+                {', '.join(f'{c} {t}' for c, t in zip(VERSION_COLUMNS, VERSION_TYPES))}
+            ) ON COMMIT DROP
+        """)
+        self._copy_rows(cursor, 'stage_orders', VERSION_COLUMNS, zip(*columns))
+        cursor.execute(SCD2_APPLY_SQL.format(source="SELECT * FROM stage_orders"))
+    
+    def _prepare_statements(self, connection=None) -> None:
+        """Prepare SCD2_APPLY_SQL on a connection if not done yet."""
+        connection = connection or self.warehouse_connection
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM pg_prepared_statements WHERE name = %s",
+                    (SCD2_APPLY_STATEMENT,)
+                )
+                if cursor.fetchone() is None:
+                    cursor.execute(SCD2_APPLY_PREPARE)
+            connection.commit()
         except psycopg2.Error as e:
-            self.warehouse_connection.rollback()
-            logger.error(f"Failed to process change record: {e}")
+            connection.rollback()
+            logger.error(f"Failed to prepare SCD2 statements: {e}")
             raise
     
+    def _apply_changes_pipelined(self, cursor, columns: List[Tuple]) -> None:
+        """
+        Apply a batch as one round-trip of back-to-back prepared statements.
+        
+        Every page of the column arrays becomes one EXECUTE of the prepared
+        SCD2 statement; all of them are sent to the server in a single query
+        string.
+        """
+        statements = [self._session_settings().encode()]
+        
+        for start in range(0, len(columns[0]), BATCH_PAGE_SIZE):
+            page = [list(column[start:start + BATCH_PAGE_SIZE]) for column in columns]
+            statements.append(cursor.mogrify(SCD2_APPLY_EXECUTE, page) + b';')
+        
+        cursor.execute(b''.join(statements))
+    
+    def _apply_changes(self, changes: List[Dict[str, Any]], connection=None) -> int:
+        """
+        Apply a batch of changes using set-based SCD Type 2 statements.
+        
+        Each page of rows closes the affected current rows and inserts the
+        new versions in one statement, and all pages are sent in a single
+        round-trip. Batches of at least COPY_THRESHOLD rows are staged
+        through COPY instead. The caller owns the transaction.
+        
+        Args:
+            changes: Change records from a CDC batch file
+            connection: Warehouse connection to use; defaults to the
+                processor's own connection
+            
+        Returns:
+            Number of new versions inserted
+        """
+        columns = self._plan_batch(changes)
+        if not columns:
+            return 0
+        row_count = len(columns[0])
+        
+        self._ensure_partitions(columns[8])
+        
+        connection = connection or self.warehouse_connection
+        with connection.cursor() as cursor:
+            if row_count >= COPY_THRESHOLD:
+                self._apply_changes_copy(cursor, columns)
+            else:
+                self._apply_changes_pipelined(cursor, columns)
+        
+        inserted = row_count - columns[9].count('DELETE')
+        logger.debug("Applied %d changes, inserted %d versions", row_count, inserted)
+        return inserted
+    
     def process_cdc_logs(self) -> None:
         """Process all unprocessed CDC log files."""
         logger.info("Starting CDC log processing")
         
-        # Ensure warehouse schema exists
-        self._create_warehouse_schema()
+        # Ensure warehouse schema exists; skipped when the sentinel is current
+        if not self._schema_is_current():
+            self._create_warehouse_schema()
+        self._prepare_statements()
+        
+        if self.bulk_mode:
+            self._drop_bulk_mode_indexes()
         
-        # Get processed files
-        processed_files = self._get_processed_files()
+        try:
+            self._process_batch_files(self._pending_batch_files())
+        finally:
+            self._flush_processed()
+            if self.bulk_mode:
+                self._rebuild_bulk_mode_indexes()
         
-        # Find unprocessed batch files
-        batch_files = sorted(self.cdc_logs_dir.glob("changes_*.json"))
+        logger.info("CDC log processing completed")
+    
+    def _process_batch_files(self, batch_files: List[Path]) -> None:
+        """Apply each unprocessed batch file in its own transaction."""
+        if PROCESS_WORKERS > 1:
+            self._process_batch_files_parallel(batch_files)
+            return
         
         for batch_file in batch_files:
-            if batch_file.name in processed_files:
-                continue
-            
-            logger.info(f"Processing batch file: {batch_file}")
+            logger.info("Processing batch file: %s", batch_file)
             
             try:
-                with open(batch_file, 'r') as f:
-                    batch_data = json.load(f)
-                
-                changes = batch_data.get('changes', [])
-                processed_count = 0
-                
-                for change in changes:
-                    try:
-                        self._process_change_record(change)
-                        processed_count += 1
-                    except Exception as e:
-                        logger.error(f"Failed to process change: {e}")
-                        continue
-                
-                # Mark file as processed
-                self._mark_file_processed(batch_file.name)
-                logger.info(f"Processed {processed_count}/{len(changes)} changes from {batch_file}")
-                
+                changes = load_batch_changes(batch_file)
+                self._apply_batch_file(self.warehouse_connection, batch_file, changes)
+            except psycopg2.OperationalError as e:
+                # Connection lost; the file is retried on the next run
+                logger.error(f"Failed to process batch file {batch_file}: {e}")
+                self._reconnect()
             except Exception as e:
                 logger.error(f"Failed to process batch file {batch_file}: {e}")
                 continue
+    
+    def _apply_batch_file(self, connection, batch_file: Path, changes: List[Dict[str, Any]]) -> None:
+        """
+        Apply one batch file's changes in a single transaction.
         
-        logger.info("CDC log processing completed")
+        The file is only marked processed once its changes are committed.
+        """
+        try:
+            inserted = self._apply_changes(changes, connection)
+            connection.commit()
+            self._mark_file_processed(batch_file.name)
+        except psycopg2.OperationalError:
+            raise
+        except Exception:
+            connection.rollback()
+            raise
+        
+        logger.info("Processed %d changes (%d new versions) from %s", len(changes), inserted, batch_file)
+    
+    def _load_batch_file(self, batch_file: Path) -> Tuple[Path, Optional[List[Dict[str, Any]]]]:
+        """Load a batch file's changes, returning None for unreadable files."""
+        try:
+            return batch_file, load_batch_changes(batch_file)
+        except Exception as e:
+            logger.error(f"Failed to process batch file {batch_file}: {e}")
+            return batch_file, None
+    
+    def _apply_batch_file_pooled(self, batch: Tuple[Path, List[Dict[str, Any]]]) -> None:
+        """Apply one loaded batch file on a connection borrowed from the pool."""
+        batch_file, changes = batch
+        logger.info("Processing batch file: %s", batch_file)
+        
+        broken = False
+        connection = acquire_connection('warehouse')
+        try:
+            self._prepare_statements(connection)
+            self._apply_batch_file(connection, batch_file, changes)
+        except psycopg2.OperationalError as e:
+            broken = True
+            logger.error(f"Failed to process batch file {batch_file}: {e}")
+        except Exception as e:
+            logger.error(f"Failed to process batch file {batch_file}: {e}")
+        finally:
+            release_connection(connection, 'warehouse', discard=broken)
+    
+    def _process_batch_files_parallel(self, batch_files: List[Path]) -> None:
+        """
+        Apply batch files concurrently on pooled connections.
+        
+        Files are loaded PROCESS_WORKERS at a time and split into waves of
+        consecutive files with disjoint order_key sets. Files in a wave are
+        applied concurrently; waves run in file order, so changes to the
+        same order are still applied in extraction order.
+        """
+        # The processor's own connection holds one pool slot
+        workers = max(1, min(PROCESS_WORKERS, POOL_MAX_SIZE - 1))
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for start in range(0, len(batch_files), workers):
+                loaded = executor.map(self._load_batch_file, batch_files[start:start + workers])
+                
+                wave, wave_keys = [], set()
+                for batch_file, changes in loaded:
+                    if changes is None:
+                        continue
+                    
+                    keys = {change['id'] for change in changes}
+                    if not wave_keys.isdisjoint(keys):
+                        list(executor.map(self._apply_batch_file_pooled, wave))
+                        wave, wave_keys = [], set()
+                    
+                    wave.append((batch_file, changes))
+                    wave_keys |= keys
+                
+                list(executor.map(self._apply_batch_file_pooled, wave))
 
 def main():
     """Main entry point for change processor."""
+    setup_logging(__name__, log_level=os.getenv('LOG_LEVEL', 'INFO'))
     logger.info("Starting Change Data Processor")
     
     try:
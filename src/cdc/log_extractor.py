@@ -9,50 +9,158 @@ for changes using a high-watermark approach and writing change logs to JSON file
 import os
 import sys
 import time
-import random
-import json
+import queue
+import select
 import logging
+import itertools
+import threading
 from datetime import datetime, timedelta, timezone
-from typing import Optional, List, Dict, Any
+from decimal import Decimal
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Tuple, Union
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 import psycopg2
+import psycopg2.errors
 from psycopg2 import sql
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import LogicalReplicationConnection
 from dotenv import load_dotenv
 
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.utils.json_io import ZSTD_AVAILABLE, ZSTD_SUFFIX, dumps, is_batch_file, zstd_stream_writer
+from src.cdc.pgoutput import PgOutputDecoder, format_lsn, parse_timestamp
+from src.utils.db_pool import connection_kwargs
+from src.utils.logging_config import setup_logging
+
 # Load environment variables
 load_dotenv()
 
-# Configure structured logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('cdc_extractor.log')
-    ]
-)
+# Handlers are attached by setup_extractor_logging in main(), so importing
+# the module starts no logging thread and opens no log file
 logger = logging.getLogger(__name__)
 
+# Log file written by the extractor's entry points
+LOG_FILE = 'logs/cdc_extractor.log'
+
+# Rows fetched per round-trip from the server-side change cursor
+CDC_FETCH_SIZE = int(os.getenv('CDC_FETCH_SIZE', '5000'))
+
+# Column names of the change detection query, in SELECT order
+CHANGE_COLUMNS = (
+    'id', 'customer_id', 'product_id', 'quantity', 'unit_price', 'total_amount',
+    'order_status', 'order_date', 'last_updated', 'created_at', 'operation_type'
+)
+
+# Projection of the change detection query, matching CHANGE_COLUMNS
+SNAPSHOT_COLUMNS = """
+    id, customer_id, product_id, quantity, unit_price, total_amount,
+    order_status, order_date, last_updated, created_at,
+    CASE WHEN created_at > %(since)s THEN 'INSERT' ELSE 'UPDATE' END AS operation_type
+"""
+
+# fdatasync is not available on every platform (e.g. macOS)
+_fdatasync = getattr(os, 'fdatasync', os.fsync)
+
+# Poll batches that may wait for the background writer, and how many of
+# them the writer combines into one batch file
+WRITE_QUEUE_SIZE = 8
+WRITE_COALESCE_LIMIT = 4
+
+# Batch file compression: 'zstd' writes changes_*.json.zst (requires the
+# zstandard package), 'none' writes plain JSON
+CDC_COMPRESSION = os.getenv('CDC_COMPRESSION', 'none')
+CDC_ZSTD_LEVEL = int(os.getenv('CDC_ZSTD_LEVEL', '3'))
+
+# Extraction ticks between old log cleanups
+CLEANUP_EVERY_TICKS = 10
+
+# Change capture mode: 'polling' (default) scans orders by timestamp,
+# 'replication' streams the WAL through a pgoutput slot. Replication is
+# opt-in because the slot retains WAL on the source while the extractor is
+# down; it falls back to polling when the source is not configured for
+# logical decoding.
+CDC_MODE = os.getenv('CDC_MODE', 'polling')
+REPLICATION_SLOT = os.getenv('CDC_REPLICATION_SLOT', 'cdc_slot')
+PUBLICATION = os.getenv('CDC_PUBLICATION', 'cdc_pub')
+
+def chunk_by_timestamp(changes: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Split changes ordered by last_updated into chunks of about size changes.
+    
+    Chunks are only cut between different last_updated values, so each
+    chunk's last timestamp is a watermark no later chunk shares. Polling
+    resumes strictly after a watermark, so a cut inside a run of equal
+    timestamps would drop the rest of the run when extraction rewinds.
+    
+    Args:
+        changes: Change records ordered by last_updated
+        size: Changes per chunk; a chunk grows past it to finish a timestamp
+        
+    Yields:
+        Lists of consecutive changes
+    """
+    chunk = []
+    for change in changes:
+        if len(chunk) >= size and change['last_updated'] != chunk[-1]['last_updated']:
+            yield chunk
+            chunk = []
+        chunk.append(change)
+    if chunk:
+        yield chunk
+
+
 class CDCLogExtractor:
     """
-    Extracts change data from operational_db using timestamp-based CDC.
-    Implements high-watermark tracking for idempotent extraction.
+    Extracts change data from operational_db.
+    Uses timestamp-based CDC with high-watermark tracking, or streams the WAL
+    through a logical replication slot when CDC_MODE is 'replication' and the
+    source supports it.
     """
     
-    def __init__(self):
-        """Initialize database connection and watermark tracking."""
-        self.connection = None
+    def __init__(self, connection=None):
+        """
+        Initialize database connection and watermark tracking.
+        
+        Args:
+            connection: Open operational_db connection to extract with
+                instead of connecting; it stays owned by the caller
+        """
+        self.connection = connection
         self.watermark_file = Path("data/cdc_logs/.watermark")
         self.cdc_logs_dir = Path("data/cdc_logs")
+        self._watermark: Optional[datetime] = None
+        # Watermark to resume polling from after a failed background write;
+        # while the failure is set the writer discards queued batches
+        self._rewind_watermark: Optional[datetime] = None
+        self._write_failed = threading.Event()
+        self._write_queue: Optional[queue.Queue] = None
+        self._writer: Optional[threading.Thread] = None
+        # Batch file naming state, see _next_batch_id
+        self._batch_second: Optional[int] = None
+        self._batch_prefix = ''
+        self._batch_seq = 0
+        # Log cleanup cadence and the oldest log mtime seen by the last scan
+        self._ticks_since_cleanup = 0
+        self._oldest_log_mtime = 0.0
+        self._compress = CDC_COMPRESSION == 'zstd'
+        if self._compress and not ZSTD_AVAILABLE:
+            logger.warning("CDC_COMPRESSION=zstd but zstandard is not installed; writing uncompressed batch files")
+            self._compress = False
+        # Syncs the running log while the batch file is synced on the caller
+        self._sync_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cdc-sync')
         self._ensure_directories()
-        self._connect()
+        if self.connection is None:
+            self._connect()
         
     def _ensure_directories(self) -> None:
         """Ensure necessary directories exist."""
         self.cdc_logs_dir.mkdir(parents=True, exist_ok=True)
         
+    def _connection_params(self) -> Dict[str, str]:
+        """Connection settings for operational_db."""
+        return connection_kwargs('source')
+        
     def _connect(self) -> None:
         """Establish database connection with retry logic."""
         max_retries = 5
@@ -60,13 +168,7 @@ class CDCLogExtractor:
         
         for attempt in range(max_retries):
             try:
-                self.connection = psycopg2.connect(
-                    host=os.getenv('DB_HOST', 'localhost'),
-                    port=os.getenv('DB_PORT', '5432'),
-                    database=os.getenv('DB_NAME', 'operational_db'),
-                    user=os.getenv('DB_USER', 'postgres'),
-                    password=os.getenv('DB_PASSWORD', 'postgres')
-                )
+                self.connection = psycopg2.connect(**self._connection_params())
                 self.connection.autocommit = False
                 logger.info("Successfully connected to operational_db")
                 return
@@ -82,22 +184,36 @@ class CDCLogExtractor:
         """
         Get the current high-watermark timestamp.
         Returns the timestamp from file or 5 minutes ago if no watermark exists.
+        The file is only read once; later calls return the in-memory value.
         """
+        if self._watermark is not None:
+            return self._watermark
+        
         if self.watermark_file.exists():
             try:
                 with open(self.watermark_file, 'r') as f:
                     watermark_str = f.read().strip()
-                    return datetime.fromisoformat(watermark_str)
+                    self._watermark = datetime.fromisoformat(watermark_str)
+                    return self._watermark
             except (ValueError, IOError) as e:
                 logger.warning(f"Failed to read watermark file: {e}")
         
         # Default to 5 minutes ago for initial extraction
         default_watermark = datetime.now(timezone.utc) - timedelta(minutes=5)
         logger.info(f"Using default watermark: {default_watermark}")
+        self._watermark = default_watermark
         return default_watermark
     
     def _save_watermark(self, timestamp: datetime) -> None:
-        """Save the high-watermark timestamp to file."""
+        """Save the high-watermark timestamp to memory and file if it changed."""
+        if timestamp == self._watermark:
+            return
+        
+        self._watermark = timestamp
+        self._store_watermark(timestamp)
+    
+    def _store_watermark(self, timestamp: datetime) -> None:
+        """Write the high-watermark timestamp to file."""
         try:
             with open(self.watermark_file, 'w') as f:
                 f.write(timestamp.isoformat())
@@ -105,169 +221,583 @@ class CDCLogExtractor:
         except IOError as e:
             logger.error(f"Failed to save watermark: {e}")
     
-    def _detect_changes(self, since: datetime) -> List[Dict[str, Any]]:
+    def _detect_changes(self, since: datetime) -> Iterator[Dict[str, Any]]:
         """
-        Detect changes in the orders table since the given timestamp.
+        Stream changes in the orders table since the given timestamp.
+        
+        Rows are fetched through a server-side cursor in chunks of
+        CDC_FETCH_SIZE, so memory use does not grow with the size of the
+        change set.
         
         Args:
             since: Timestamp to detect changes from
             
-        Returns:
-            List of change records with operation type and data
+        Yields:
+            Change records with operation type and data, ordered by last_updated
         """
-        changes = []
+        since_naive = since.replace(tzinfo=None)
         
         try:
-            with self.connection.cursor(cursor_factory=RealDictCursor) as cursor:
-                # Use a transaction to ensure consistency
+            with self.connection.cursor(name='cdc_stream') as cursor:
+                cursor.itersize = CDC_FETCH_SIZE
                 
                 # Get current snapshot of all records modified since watermark
+                # Each arm of the UNION ALL is an index range scan on
+                # last_updated or created_at; the arms are disjoint
                 snapshot_query = sql.SQL("""
-                    SELECT 
-                        id,
-                        customer_id,
-                        product_id,
-                        quantity,
-                        unit_price,
-                        total_amount,
-                        order_status,
-                        order_date,
-                        last_updated,
-                        created_at,
-                        'UPSERT' as operation_type
-                    FROM orders 
-                    WHERE last_updated > %s OR created_at > %s
+                    SELECT {columns}
+                    FROM orders
+                    WHERE last_updated > %(since)s
+                    UNION ALL
+                    SELECT {columns}
+                    FROM orders
+                    WHERE created_at > %(since)s AND last_updated <= %(since)s
                     ORDER BY last_updated, id
-                """)
+                """).format(columns=sql.SQL(SNAPSHOT_COLUMNS))
                 
-                cursor.execute(snapshot_query, (since.replace(tzinfo=None), since.replace(tzinfo=None)))
-                current_snapshot = cursor.fetchall()
+                cursor.execute(snapshot_query, {'since': since_naive})
                 
-                # Get deleted records by comparing with previous snapshot
-                # For this demo, we'll use a soft delete approach or track deletions via triggers
-                # For now, we'll focus on INSERT/UPDATE operations
-                
-                self.connection.commit()
+                # One extraction timestamp for the whole scan
+                extracted_at = datetime.now(timezone.utc).isoformat()
                 
-                # Convert to list of dicts and determine operation types
-                for record in current_snapshot:
-                    record_dict = dict(record)
-                    
-                    # Determine if this is an INSERT or UPDATE
-                    if record_dict['created_at'] > since.replace(tzinfo=None):
-                        record_dict['operation_type'] = 'INSERT'
-                    else:
-                        record_dict['operation_type'] = 'UPDATE'
+                # Deleted records are tracked separately via audit triggers;
+                # this scan covers INSERT/UPDATE operations
+                for record in cursor:
+                    record_dict = dict(zip(CHANGE_COLUMNS, record))
                     
                     # Add metadata
-                    record_dict['cdc_timestamp'] = datetime.now(timezone.utc).isoformat()
-                    record_dict['extracted_at'] = datetime.now(timezone.utc).isoformat()
+                    record_dict['cdc_timestamp'] = record_dict['extracted_at'] = extracted_at
                     
-                    changes.append(record_dict)
-                
-                logger.info(f"Detected {len(changes)} changes since {since}")
-                return changes
+                    yield record_dict
+            
+            self.connection.commit()
                 
+        except GeneratorExit:
+            # The caller stopped reading; end the scan's transaction
+            self.connection.rollback()
+            raise
         except psycopg2.Error as e:
             self.connection.rollback()
             logger.error(f"Failed to detect changes: {e}")
-            return []
+            raise
     
-    def _write_change_logs(self, changes: List[Dict[str, Any]]) -> None:
+    def _write_change_logs(self, changes: Iterable[Dict[str, Any]],
+                           watermark: Optional[Union[datetime, str]] = None) -> Tuple[int, Optional[datetime]]:
         """
-        Write changes to JSON log files.
+        Stream changes into a JSON batch file and the running JSONL log.
+        
+        The batch file is written under a temporary name and renamed into
+        place once complete, so readers never see a partial batch.
         
         Args:
-            changes: List of change records to write
+            changes: Change records to write, ordered by last_updated
+            watermark: Watermark the changes were extracted from (timestamp,
+                or replication LSN); defaults to the current in-memory watermark
+            
+        Returns:
+            Tuple of (number of changes written, latest last_updated), or
+            (0, None) when there was nothing to write or detection failed
         """
-        if not changes:
-            return
+        changes = iter(changes)
+        try:
+            first = next(changes, None)
+        except psycopg2.Error:
+            return 0, None
+        
+        if first is None:
+            return 0, None
         
         # Create a log file for this batch
-        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S_%f")[:-3]
-        log_file = self.cdc_logs_dir / f"changes_{timestamp}.json"
+        suffix = '.json' + ZSTD_SUFFIX if self._compress else '.json'
+        log_file = self.cdc_logs_dir / f"changes_{self._next_batch_id()}{suffix}"
+        tmp_file = log_file.with_name(log_file.name + '.tmp')
+        # The running log rotates hourly; the hour comes from the batch id
+        running_log = self.cdc_logs_dir / f"running_changes_{self._batch_prefix[:11]}.jsonl"
+        
+        change_count = 0
         
         try:
-            with open(log_file, 'w') as f:
-                json.dump({
-                    "batch_metadata": {
-                        "extracted_at": datetime.now(timezone.utc).isoformat(),
-                        "change_count": len(changes),
-                        "watermark": self._get_watermark().isoformat()
-                    },
-                    "changes": changes
-                }, f, indent=2, default=str)
-            
-            logger.info(f"Wrote {len(changes)} changes to {log_file}")
+            # Unbuffered handles: records are encoded into one buffer per chunk
+            # of CDC_FETCH_SIZE and each chunk goes out in a single write()
+            with open(tmp_file, 'wb', buffering=0) as f, open(running_log, 'ab', buffering=0) as running:
+                batch = zstd_stream_writer(f, CDC_ZSTD_LEVEL) if self._compress else f
+                batch.write(b'{"changes":[\n')
+                lines = []
+                
+                for change in itertools.chain((first,), changes):
+                    lines.append(dumps(change))
+                    
+                    if len(lines) >= CDC_FETCH_SIZE:
+                        self._write_chunk(batch, running, lines, change_count)
+                        change_count += len(lines)
+                        lines = []
+                
+                if lines:
+                    self._write_chunk(batch, running, lines, change_count)
+                    change_count += len(lines)
+                
+                # Changes arrive ordered by last_updated, so the last one
+                # carries the batch maximum
+                latest_timestamp = change.get('last_updated')
+                
+                watermark = watermark or self._get_watermark()
+                batch_metadata = {
+                    "extracted_at": datetime.now(timezone.utc).isoformat(),
+                    "change_count": change_count,
+                    "watermark": watermark.isoformat() if isinstance(watermark, datetime) else watermark
+                }
+                batch.write(b'\n],"batch_metadata":' + dumps(batch_metadata) + b'}\n')
+                if batch is not f:
+                    # Ends the zstd frame; the file itself stays open for the sync
+                    batch.close()
+                
+                # One data sync per file per batch, issued concurrently
+                self._sync_files(f.fileno(), running.fileno())
             
-            # Also append to a running log file for easier processing
-            running_log = self.cdc_logs_dir / "running_changes.jsonl"
-            with open(running_log, 'a') as f:
-                for change in changes:
-                    f.write(json.dumps(change, default=str) + '\n')
+            tmp_file.replace(log_file)
+            logger.info(f"Wrote {change_count} changes to {log_file}")
+            return change_count, latest_timestamp
                     
+        except psycopg2.Error:
+            tmp_file.unlink(missing_ok=True)
+            return 0, None
         except IOError as e:
+            tmp_file.unlink(missing_ok=True)
             logger.error(f"Failed to write change logs: {e}")
+            return 0, None
+    
+    def _next_batch_id(self) -> str:
+        """
+        Build a unique, sortable batch file id.
+        
+        The id keeps the YYYYMMDD_HHMMSS prefix readers parse, followed by
+        microseconds and a per-process sequence number so batches written in
+        the same instant never collide. The date prefix is formatted at most
+        once per second.
+        """
+        now_ns = time.time_ns()
+        second, nanoseconds = divmod(now_ns, 1_000_000_000)
+        if second != self._batch_second:
+            self._batch_second = second
+            self._batch_prefix = datetime.fromtimestamp(second, timezone.utc).strftime("%Y%m%d_%H%M%S")
+        
+        self._batch_seq += 1
+        return f"{self._batch_prefix}_{nanoseconds // 1000:06d}_{self._batch_seq:06d}"
+    
+    @staticmethod
+    def _write_chunk(batch_file, running_log, lines: List[bytes], written: int) -> None:
+        """
+        Append a chunk of encoded records to the batch file and running log.
+        
+        Args:
+            batch_file: Unbuffered batch file handle
+            running_log: Unbuffered running_changes_<hour>.jsonl handle
+            lines: Encoded change records
+            written: Number of records already in the batch file
+        """
+        body = b',\n'.join(lines)
+        batch_file.write(b',\n' + body if written else body)
+        running_log.write(b'\n'.join(lines) + b'\n')
+    
+    def _sync_files(self, batch_fd: int, running_fd: int) -> None:
+        """
+        Flush the batch file and running log to disk in parallel.
+        
+        The running log is synced on the sync worker thread while the batch
+        file is synced here; both calls release the GIL, so the two syncs
+        overlap instead of paying their latency back to back.
+        
+        Args:
+            batch_fd: File descriptor of the batch file
+            running_fd: File descriptor of the running log
+        """
+        running_sync = self._sync_executor.submit(_fdatasync, running_fd)
+        try:
+            _fdatasync(batch_fd)
+        finally:
+            running_sync.result()
+    
+    def _tick_cleanup(self) -> None:
+        """Run old log cleanup every CLEANUP_EVERY_TICKS extraction ticks."""
+        self._ticks_since_cleanup += 1
+        if self._ticks_since_cleanup >= CLEANUP_EVERY_TICKS:
+            self._ticks_since_cleanup = 0
+            self._cleanup_old_logs()
     
     def _cleanup_old_logs(self, retention_hours: int = 24) -> None:
         """
         Clean up old change log files to prevent disk space issues.
         
+        New files are always newer than the files already there, so the
+        directory is only scanned once the cutoff passes the oldest file
+        the previous scan left behind.
+        
         Args:
             retention_hours: Number of hours to retain log files
         """
         try:
             cutoff_time = datetime.now(timezone.utc) - timedelta(hours=retention_hours)
+            cutoff = cutoff_time.timestamp()
+            if cutoff < self._oldest_log_mtime:
+                return
+            
+            oldest = time.time()
+            # Single directory read; DirEntry.stat() is cached per entry
+            with os.scandir(self.cdc_logs_dir) as entries:
+                for entry in entries:
+                    if not (is_batch_file(entry.name) or
+                            (entry.name.startswith('running_changes') and entry.name.endswith('.jsonl'))):
+                        continue
+                    
+                    mtime = entry.stat(follow_symlinks=False).st_mtime
+                    if mtime < cutoff:
+                        os.unlink(entry.path)
+                        logger.info(f"Cleaned up old log file: {entry.path}")
+                    else:
+                        oldest = min(oldest, mtime)
             
-            for log_file in self.cdc_logs_dir.glob("changes_*.json"):
-                if log_file.stat().st_mtime < cutoff_time.timestamp():
-                    log_file.unlink()
-                    logger.info(f"Cleaned up old log file: {log_file}")
+            self._oldest_log_mtime = oldest
         except OSError as e:
             logger.warning(f"Failed to cleanup old logs: {e}")
     
-    def extract_changes(self, interval_seconds: int = 10) -> None:
+    def _replication_available(self) -> bool:
+        """
+        Check that operational_db can serve a pgoutput stream.
+        Creates the orders publication on first use.
         """
-        Main extraction loop that periodically scans for changes.
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SHOW wal_level")
+                if cursor.fetchone()[0] != 'logical':
+                    self.connection.rollback()
+                    logger.warning("wal_level is not 'logical'; falling back to timestamp polling")
+                    return False
+                
+                cursor.execute("SELECT 1 FROM pg_publication WHERE pubname = %s", (PUBLICATION,))
+                if cursor.fetchone() is None:
+                    cursor.execute(sql.SQL("CREATE PUBLICATION {} FOR TABLE orders").format(
+                        sql.Identifier(PUBLICATION)
+                    ))
+                    logger.info(f"Created publication {PUBLICATION}")
+            
+            self.connection.commit()
+            return True
+            
+        except psycopg2.Error as e:
+            self.connection.rollback()
+            logger.warning(f"Logical replication unavailable ({e}); falling back to timestamp polling")
+            return False
+    
+    def _replicated_change(self, change: Dict[str, Any], cdc_timestamp: str, extracted_at: str) -> Dict[str, Any]:
+        """
+        Complete a decoded pgoutput row into a change record.
         
         Args:
-            interval_seconds: Time between extraction scans
+            change: Row decoded by PgOutputDecoder
+            cdc_timestamp: ISO commit time of the row's transaction
+            extracted_at: ISO time the transaction was received
+            
+        Returns:
+            Change record in the same shape as the polling path produces
         """
-        logger.info("Starting CDC extraction loop")
-        logger.info(f"Extraction interval: {interval_seconds} seconds")
+        table = change.pop('table')
+        unchanged = change.pop('unchanged_columns', None)
+        if unchanged:
+            change.update(self._fetch_unchanged_columns(table, change['id'], unchanged))
+        
+        # Generated columns are not part of the replication stream
+        if 'total_amount' not in change and 'quantity' in change and 'unit_price' in change:
+            change['total_amount'] = str(Decimal(change['unit_price']) * change['quantity'])
+        
+        change['cdc_timestamp'] = cdc_timestamp
+        change['extracted_at'] = extracted_at
+        return change
+    
+    def _fetch_unchanged_columns(self, table: str, row_id: int, columns: List[str]) -> Dict[str, Any]:
+        """
+        Read unchanged TOAST columns of an updated row from the source.
+        
+        pgoutput leaves these values out of an UPDATE unless the old row is
+        replicated too, so the row's current values stand in for them.
+        
+        Args:
+            table: Schema-qualified table name from the decoder
+            row_id: id of the updated row
+            columns: Names of the columns to read
+            
+        Returns:
+            Column values, integers as ints and the rest as text like
+            PgOutputDecoder produces them
+        """
+        schema, name = table.split('.', 1)
+        query = sql.SQL("SELECT {columns} FROM {table} WHERE id = %s").format(
+            columns=sql.SQL(', ').join(map(sql.Identifier, columns)),
+            table=sql.Identifier(schema, name)
+        )
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(query, (row_id,))
+                row = cursor.fetchone()
+        finally:
+            self.connection.rollback()
+        
+        if row is None:
+            # Deleted since; its DELETE follows in the stream
+            logger.warning(f"Row {row_id} of {table} is gone; unchanged columns {columns} left empty")
+            return {column: None for column in columns}
+        return {column: value if value is None or isinstance(value, int) else str(value)
+                for column, value in zip(columns, row)}
+    
+    def _flush_replicated(self, cursor, batch: List[Dict[str, Any]], last_updated: List[str],
+                          flush_lsn: Optional[int]) -> bool:
+        """
+        Write replicated changes and confirm them to the replication slot.
+        
+        The slot only advances once the batch file is on disk, so a crash
+        replays the unwritten transactions instead of losing them.
+        
+        Args:
+            cursor: Replication cursor
+            batch: Changes of the committed transactions, in commit order
+            last_updated: last_updated column of the batch's non-DELETE changes
+            flush_lsn: End LSN of the batch's last transaction
+            
+        Returns:
+            False if the batch could not be written and must be retried
+        """
+        if batch:
+            change_count, _ = self._write_change_logs(batch, format_lsn(flush_lsn))
+            if not change_count:
+                return False
+            
+            logger.info(f"Streamed {change_count} changes up to LSN {format_lsn(flush_lsn)}")
+            
+            # Keep the timestamp watermark current for the polling fallback.
+            # Commit order is not last_updated order, so reduce the whole
+            # column; PostgreSQL's ISO text timestamps sort chronologically
+            # as strings, but drop trailing fractional zeros, so they are
+            # parsed with parse_timestamp rather than fromisoformat.
+            if last_updated:
+                self._save_watermark(parse_timestamp(max(last_updated)))
+        
+        if flush_lsn is not None:
+            cursor.send_feedback(flush_lsn=flush_lsn)
+        return True
+    
+    def _stream_changes(self, interval_seconds: int) -> None:
+        """
+        Consume the pgoutput replication slot, writing one batch file per interval.
+        
+        Only whole transactions are written, and DELETEs are captured
+        directly from the WAL.
+        
+        Args:
+            interval_seconds: Time between batch files
+        """
+        replication = psycopg2.connect(
+            connection_factory=LogicalReplicationConnection, **self._connection_params()
+        )
+        
+        try:
+            cursor = replication.cursor()
+            try:
+                cursor.create_replication_slot(REPLICATION_SLOT, output_plugin='pgoutput')
+                logger.info(f"Created replication slot {REPLICATION_SLOT}")
+            except psycopg2.errors.DuplicateObject:
+                pass
+            
+            cursor.start_replication(
+                slot_name=REPLICATION_SLOT, decode=False,
+                options={'publication_names': PUBLICATION, 'proto_version': '1'}
+            )
+            logger.info(f"Streaming changes from replication slot {REPLICATION_SLOT}")
+            
+            decoder = PgOutputDecoder()
+            # Changes plus their last_updated column, for the open transaction
+            # and for the committed transactions awaiting the next batch file
+            transaction, transaction_last_updated = [], []
+            batch, batch_last_updated = [], []
+            flush_lsn = None
+            deadline = time.monotonic() + interval_seconds
+            
+            while True:
+                message = cursor.read_message()
+                if message is not None:
+                    change = decoder.decode(message.payload)
+                    if change is not None:
+                        transaction.append(self._replicated_change(change, cdc_timestamp, extracted_at))
+                        if 'last_updated' in change:
+                            transaction_last_updated.append(change['last_updated'])
+                    elif message.payload[:1] == b'B':
+                        # Timestamps are formatted once per transaction
+                        cdc_timestamp = decoder.commit_timestamp.isoformat()
+                        extracted_at = datetime.now(timezone.utc).isoformat()
+                    elif message.payload[:1] == b'C':
+                        batch.extend(transaction)
+                        batch_last_updated.extend(transaction_last_updated)
+                        transaction, transaction_last_updated = [], []
+                        flush_lsn = decoder.commit_end_lsn
+                
+                now = time.monotonic()
+                if now >= deadline:
+                    if self._flush_replicated(cursor, batch, batch_last_updated, flush_lsn):
+                        batch, batch_last_updated = [], []
+                    deadline = now + interval_seconds
+                    
+                    # Cleanup old logs periodically
+                    self._tick_cleanup()
+                elif message is None:
+                    select.select([cursor], [], [], deadline - now)
+                    
+        finally:
+            replication.close()
+    
+    def _start_writer(self) -> None:
+        """Start the background thread that writes polled batches."""
+        self._write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._writer = threading.Thread(target=self._writer_loop, name='cdc-writer', daemon=True)
+        self._writer.start()
+    
+    def _stop_writer(self) -> None:
+        """Write any queued batches and stop the writer thread."""
+        if self._writer is not None:
+            self._write_queue.put(None)
+            self._writer.join()
+            self._writer = None
+    
+    def _writer_loop(self) -> None:
+        """
+        Background writer: combine queued batches into one batch file.
+        
+        Up to WRITE_COALESCE_LIMIT batches that are already waiting are
+        written together, so a writer that falls behind catches up with one
+        file and one sync per file. After a failed write, batches are
+        discarded until polling has rewound. A None entry stops the loop.
+        """
+        while True:
+            batch = self._write_queue.get()
+            if batch is None:
+                self._write_queue.task_done()
+                return
+            
+            batches = [batch]
+            stopping = False
+            while len(batches) < WRITE_COALESCE_LIMIT:
+                try:
+                    batch = self._write_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if batch is None:
+                    stopping = True
+                    break
+                batches.append(batch)
+            
+            # Later batches continue from the failed one; they are extracted
+            # again after the rewind
+            if not self._write_failed.is_set():
+                self._write_batches(batches)
+            for _ in range(len(batches) + stopping):
+                self._write_queue.task_done()
+            if stopping:
+                return
+    
+    def _write_batches(self, batches: List[Tuple[List[Dict[str, Any]], datetime]]) -> None:
+        """
+        Write polled batches and persist the watermark they reach.
+        
+        The watermark file only advances once the changes are on disk. If
+        the write fails, polling rewinds to the first batch's watermark so
+        the changes are extracted again, and batches queued behind it are
+        discarded.
+        
+        Args:
+            batches: (changes, watermark they were extracted from) pairs
+        """
+        since = batches[0][1]
+        change_count, latest_timestamp = self._write_change_logs(
+            itertools.chain.from_iterable(changes for changes, _ in batches), since
+        )
+        
+        if change_count:
+            self._store_watermark(latest_timestamp)
+            logger.info(f"Updated watermark to: {latest_timestamp}")
+        else:
+            logger.error(f"Failed to write {len(batches)} polled batches; re-extracting from {since}")
+            self._rewind_watermark = since
+            self._write_failed.set()
+    
+    def _poll_changes(self, interval_seconds: int) -> None:
+        """
+        Timestamp-polling extraction loop.
+        
+        Detected changes are handed to the background writer in chunks of
+        about CDC_FETCH_SIZE as the scan streams them, so the next chunk is
+        read while the previous one is written, and memory is bounded by
+        the writer queue. The in-memory watermark advances with each queued
+        chunk.
         
+        Args:
+            interval_seconds: Time between extraction scans
+        """
+        self._start_writer()
         try:
             while True:
                 logger.info("=== Starting CDC extraction batch ===")
                 
-                # Get current watermark
+                # After a failed write, let the writer discard what was
+                # queued behind it, then resume from the failed batch
+                if self._write_failed.is_set():
+                    self._write_queue.join()
+                    self._watermark, self._rewind_watermark = self._rewind_watermark, None
+                    self._write_failed.clear()
                 watermark = self._get_watermark()
                 logger.info(f"Current watermark: {watermark}")
                 
-                # Detect changes
-                changes = self._detect_changes(watermark)
+                change_count = 0
+                detected = self._detect_changes(watermark)
+                try:
+                    for chunk in chunk_by_timestamp(detected, CDC_FETCH_SIZE):
+                        # Blocks while the writer is WRITE_QUEUE_SIZE chunks
+                        # behind; each chunk resumes from the previous one's
+                        # last last_updated
+                        self._write_queue.put((chunk, self._get_watermark()))
+                        self._watermark = chunk[-1]['last_updated']
+                        change_count += len(chunk)
+                        if self._write_failed.is_set():
+                            break
+                except psycopg2.Error:
+                    pass
+                finally:
+                    detected.close()
                 
-                if changes:
-                    # Write change logs
-                    self._write_change_logs(changes)
-                    
-                    # Update watermark to the latest change timestamp
-                    latest_timestamp = max(
-                        datetime.fromisoformat(change['last_updated'].replace('Z', '+00:00') if isinstance(change['last_updated'], str) else change['last_updated'].isoformat())
-                        for change in changes
-                    )
-                    self._save_watermark(latest_timestamp)
-                    
-                    logger.info(f"Updated watermark to: {latest_timestamp}")
+                if change_count:
+                    logger.info(f"Detected {change_count} changes since {watermark}")
                 else:
                     logger.info("No changes detected")
                 
                 # Cleanup old logs periodically
-                if random.randint(1, 10) == 1:  # 10% chance
-                    self._cleanup_old_logs()
+                self._tick_cleanup()
                 
                 logger.info("=== CDC extraction batch completed ===")
                 time.sleep(interval_seconds)
+        finally:
+            self._stop_writer()
+    
+    def extract_changes(self, interval_seconds: int = 10) -> None:
+        """
+        Main extraction loop that periodically emits change batches.
+        
+        Args:
+            interval_seconds: Time between extraction batches
+        """
+        logger.info("Starting CDC extraction loop")
+        logger.info(f"Extraction interval: {interval_seconds} seconds")
+        
+        try:
+            if CDC_MODE == 'replication' and self._replication_available():
+                self._stream_changes(interval_seconds)
+            else:
+                self._poll_changes(interval_seconds)
                 
         except KeyboardInterrupt:
             logger.info("CDC extraction stopped by user")
@@ -275,6 +805,7 @@ class CDCLogExtractor:
             logger.error(f"Unexpected error in extraction loop: {e}")
             raise
         finally:
+            self._sync_executor.shutdown()
             if self.connection:
                 self.connection.close()
                 logger.info("Database connection closed")
@@ -283,6 +814,8 @@ class CDCLogExtractor:
         """
         Create database triggers to track DELETE operations.
         This is optional but provides complete CDC coverage.
+        Also ensures the last_updated/created_at indexes used by
+        change detection exist.
         """
         try:
             with self.connection.cursor() as cursor:
@@ -333,6 +866,12 @@ class CDCLogExtractor:
                         EXECUTE FUNCTION log_order_deletion();
                 """))
                 
+                # Indexes for the two arms of the change detection query
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_orders_last_updated ON orders(last_updated);
+                    CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders(created_at);
+                """)
+                
                 self.connection.commit()
                 logger.info("Created audit triggers for DELETE tracking")
                 
@@ -340,10 +879,13 @@ class CDCLogExtractor:
             self.connection.rollback()
             logger.error(f"Failed to create audit triggers: {e}")
 
-import random
+def setup_extractor_logging() -> None:
+    """Attach the console and LOG_FILE handlers to the extractor's logger."""
+    setup_logging(__name__, log_level=os.getenv('LOG_LEVEL', 'INFO'), log_file=LOG_FILE)
 
 def main():
     """Main entry point for the CDC log extractor."""
+    setup_extractor_logging()
     logger.info("Starting CDC Log Extractor")
     
     try:
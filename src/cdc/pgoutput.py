@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+pgoutput Logical Replication Decoder
+
+Decodes the binary messages streamed from a PostgreSQL pgoutput replication
+slot (protocol version 1) into CDC change records:
+- Relation messages are cached to map column names and types
+- Insert/Update/Delete messages become INSERT/UPDATE/DELETE change records
+- Begin/Commit messages carry the transaction commit time and end LSN
+"""
+
+import re
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Tuple
+
+# PostgreSQL epoch used by replication timestamps (microseconds since 2000-01-01)
+PG_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+# Integer type OIDs (int8, int2, int4) whose text values are decoded to int
+INTEGER_TYPE_OIDS = frozenset((20, 21, 23))
+
+OPERATION_TYPES = {b'I': 'INSERT', b'U': 'UPDATE', b'D': 'DELETE'}
+
+# PostgreSQL's text output for timestamp/timestamptz values. Trailing zeros
+# of the fraction are dropped (e.g. '.12'), so it is not always ISO 8601 as
+# datetime.fromisoformat() accepts it before Python 3.11.
+_TIMESTAMP_TEXT = re.compile(
+    r'(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}:\d{2})(?:\.(\d{1,6}))?'
+    r'(?:([+-])(\d{2})(?::?(\d{2}))?)?'
+)
+
+_INT16 = struct.Struct('!h')
+_INT32 = struct.Struct('!i')
+_UINT32 = struct.Struct('!I')
+_INT64 = struct.Struct('!q')
+_UINT64 = struct.Struct('!Q')
+
+
+def format_lsn(lsn: int) -> str:
+    """Format an LSN as PostgreSQL's X/X text form."""
+    return f"{lsn >> 32:X}/{lsn & 0xFFFFFFFF:X}"
+
+
+def parse_timestamp(text: str) -> datetime:
+    """
+    Parse a timestamp in PostgreSQL's text output format.
+
+    Args:
+        text: Value such as '2026-10-15 21:59:00.12' or '2026-10-15 21:59:00+00'
+
+    Returns:
+        datetime, timezone-aware when the text carries a UTC offset
+
+    Raises:
+        ValueError: If text is not a PostgreSQL timestamp
+    """
+    match = _TIMESTAMP_TEXT.fullmatch(text)
+    if match is None:
+        raise ValueError(f"Invalid PostgreSQL timestamp: {text!r}")
+
+    date_part, time_part, fraction, sign, offset_hours, offset_minutes = match.groups()
+    value = datetime.strptime(f"{date_part} {time_part}", '%Y-%m-%d %H:%M:%S')
+    if fraction:
+        value = value.replace(microsecond=int(fraction.ljust(6, '0')))
+    if sign:
+        offset = timedelta(hours=int(offset_hours), minutes=int(offset_minutes or 0))
+        value = value.replace(tzinfo=timezone(-offset if sign == '-' else offset))
+    return value
+
+
+class PgOutputDecoder:
+    """
+    Stateful decoder for a single pgoutput replication stream.
+
+    Relation metadata is sent once per relation (and again after schema
+    changes), so one decoder instance must see every message of the stream.
+    """
+
+    def __init__(self):
+        """Initialize relation cache and transaction state."""
+        # relation id -> (schema.table, [(column name, type oid), ...])
+        self._relations: Dict[int, Tuple[str, List[Tuple[str, int]]]] = {}
+        self.commit_timestamp: Optional[datetime] = None
+        self.commit_end_lsn: Optional[int] = None
+
+    def decode(self, payload: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Decode one pgoutput message.
+
+        Args:
+            payload: Raw message payload from the replication stream
+
+        Returns:
+            Change record (table columns plus 'table' and 'operation_type')
+            for Insert/Update/Delete messages, None for everything else.
+            Columns sent as unchanged TOAST values are filled in from the
+            old row when the message carries it; any left are listed under
+            'unchanged_columns' for the caller to fetch.
+        """
+        kind = payload[:1]
+
+        if kind in OPERATION_TYPES:
+            return self._decode_change(kind, payload)
+        if kind == b'B':
+            # Begin: final LSN, commit timestamp, xid
+            self.commit_timestamp = PG_EPOCH + timedelta(microseconds=_INT64.unpack_from(payload, 9)[0])
+        elif kind == b'C':
+            # Commit: flags, commit LSN, end LSN, commit timestamp
+            self.commit_end_lsn = _UINT64.unpack_from(payload, 10)[0]
+        elif kind == b'R':
+            self._decode_relation(payload)
+
+        # Type, Origin and Truncate messages carry no row changes
+        return None
+
+    def _decode_relation(self, payload: bytes) -> None:
+        """Cache the column layout announced by a Relation message."""
+        relation_id = _UINT32.unpack_from(payload, 1)[0]
+        namespace, offset = self._read_string(payload, 5)
+        table, offset = self._read_string(payload, offset)
+
+        # Skip replica identity setting
+        offset += 1
+        column_count = _INT16.unpack_from(payload, offset)[0]
+        offset += 2
+
+        columns = []
+        for _ in range(column_count):
+            # Skip column flags (part of key)
+            name, offset = self._read_string(payload, offset + 1)
+            type_oid = _UINT32.unpack_from(payload, offset)[0]
+            # Skip type modifier
+            offset += 8
+            columns.append((name, type_oid))
+
+        self._relations[relation_id] = (f"{namespace}.{table}", columns)
+
+    def _decode_change(self, kind: bytes, payload: bytes) -> Dict[str, Any]:
+        """Decode an Insert, Update or Delete message into a change record."""
+        relation_id = _UINT32.unpack_from(payload, 1)[0]
+        table, columns = self._relations[relation_id]
+        offset = 5
+
+        # Updates may carry the old key/row ahead of the new tuple; the new
+        # tuple is kept and the old one only supplies unchanged TOAST values.
+        # Deletes only carry the old key/row.
+        old = {}
+        if kind == b'U' and payload[offset:offset + 1] in (b'K', b'O'):
+            old, _, offset = self._read_tuple(payload, offset + 1, columns)
+
+        record, unchanged, _ = self._read_tuple(payload, offset + 1, columns)
+        if unchanged:
+            for name in unchanged:
+                if name in old:
+                    record[name] = old[name]
+            unchanged = [name for name in unchanged if name not in old]
+            if unchanged:
+                record['unchanged_columns'] = unchanged
+        record['table'] = table
+        record['operation_type'] = OPERATION_TYPES[kind]
+        return record
+
+    @staticmethod
+    def _read_tuple(payload: bytes, offset: int,
+                    columns: List[Tuple[str, int]]) -> Tuple[Dict[str, Any], List[str], int]:
+        """
+        Read TupleData into a column dict.
+
+        Null and unchanged TOAST values are left out, so a key-only tuple
+        yields just the key columns. The names of the unchanged TOAST
+        columns are returned alongside the dict.
+        """
+        column_count = _INT16.unpack_from(payload, offset)[0]
+        offset += 2
+        record = {}
+        unchanged = []
+
+        for name, type_oid in columns[:column_count]:
+            value_kind = payload[offset:offset + 1]
+            offset += 1
+            if value_kind != b't':
+                if value_kind == b'u':
+                    unchanged.append(name)
+                continue
+
+            length = _INT32.unpack_from(payload, offset)[0]
+            offset += 4
+            value = payload[offset:offset + length].decode()
+            offset += length
+            record[name] = int(value) if type_oid in INTEGER_TYPE_OIDS else value
+
+        return record, unchanged, offset
+
+    @staticmethod
+    def _read_string(payload: bytes, offset: int) -> Tuple[str, int]:
+        """Read a null-terminated string, returning it and the next offset."""
+        end = payload.index(b'\0', offset)
+        return payload[offset:end].decode(), end + 1
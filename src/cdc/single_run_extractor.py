@@ -10,44 +10,58 @@ import sys
 import os
 from pathlib import Path
 
-# Add parent directory to path for imports
-sys.path.append(str(Path(__file__).parent.parent))
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
 
-from cdc.log_extractor import CDCLogExtractor
+from src.cdc.log_extractor import CDCLogExtractor, setup_extractor_logging
+from src.utils.logging_config import setup_logging
 import logging
 
 logger = logging.getLogger(__name__)
 
+def run(connection=None) -> int:
+    """
+    Run CDC extraction once.
+
+    Args:
+        connection: Open operational_db connection to extract with; a new
+            one is opened when omitted
+
+    Returns:
+        Number of changes written to the change logs
+    """
+    logger.info("Starting single CDC extraction run")
+
+    extractor = CDCLogExtractor(connection=connection)
+
+    # Get current watermark
+    watermark = extractor._get_watermark()
+    logger.info(f"Current watermark: {watermark}")
+
+    # Stream detected changes straight into the change logs
+    change_count, latest_timestamp = extractor._write_change_logs(
+        extractor._detect_changes(watermark), watermark
+    )
+
+    if change_count:
+        # Update watermark to the latest change timestamp
+        extractor._save_watermark(latest_timestamp)
+
+        logger.info(f"Processed {change_count} changes, updated watermark to: {latest_timestamp}")
+    else:
+        logger.info("No changes detected")
+
+    logger.info("Single CDC extraction completed successfully")
+    return change_count
+
 def main():
     """Run CDC extraction once and exit."""
-    logger.info("Starting single CDC extraction run")
+    setup_logging(__name__, log_level=os.getenv('LOG_LEVEL', 'INFO'))
+    setup_extractor_logging()
     
     try:
-        extractor = CDCLogExtractor()
-        
-        # Get current watermark
-        watermark = extractor._get_watermark()
-        logger.info(f"Current watermark: {watermark}")
-        
-        # Detect changes
-        changes = extractor._detect_changes(watermark)
-        
-        if changes:
-            # Write change logs
-            extractor._write_change_logs(changes)
-            
-            # Update watermark to the latest change timestamp
-            latest_timestamp = max(
-                change['last_updated'] for change in changes
-            )
-            extractor._save_watermark(latest_timestamp)
-            
-            logger.info(f"Processed {len(changes)} changes, updated watermark to: {latest_timestamp}")
-        else:
-            logger.info("No changes detected")
-        
-        logger.info("Single CDC extraction completed successfully")
-        
+        run()
+
     except Exception as e:
         logger.error(f"Single CDC extraction failed: {e}")
         sys.exit(1)
@@ -12,17 +12,22 @@ import time
 import random
 import signal
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from pathlib import Path
 
 import psycopg2
 from psycopg2 import sql
-from psycopg2.extras import RealDictCursor
 from faker import Faker
 from dotenv import load_dotenv
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 # Add src to path for imports
 sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.utils.db_pool import connection_kwargs
 from src.utils.logging_config import setup_logging
 from src.utils.signal_handler import GracefulShutdownHandler, DatabaseConnectionManager
 
@@ -32,6 +37,45 @@ load_dotenv()
 # Configure structured logging
 logger = setup_logging(__name__, log_level=os.getenv('LOG_LEVEL', 'INFO'))
 
+ORDER_STATUSES = ['pending', 'confirmed', 'shipped', 'completed', 'cancelled']
+
+# Value ranges for generated orders
+CUSTOMER_IDS = range(1, 1001)
+PRODUCT_IDS = range(100, 1000)
+QUANTITIES = range(1, 11)
+
+# Column names of the operation stats query, in SELECT order
+STATS_COLUMNS = (
+    'total_orders', 'pending_orders', 'completed_orders',
+    'cancelled_orders', 'latest_order', 'total_revenue'
+)
+
+# Mutation statements, prepared once per connection. Each takes whole
+# column arrays so a tick's batch of one operation type is a single EXECUTE.
+PREPARED_STATEMENTS = {
+    'mutator_insert': """
+        PREPARE mutator_insert (integer[], integer[], integer[], numeric[], text[]) AS
+        INSERT INTO orders (customer_id, product_id, quantity, unit_price, order_status)
+        SELECT * FROM unnest($1, $2, $3, $4, $5)
+        RETURNING id
+    """,
+    # Single update statement for every update shape; NULL status or
+    # quantity keeps the current column value
+    'mutator_update': """
+        PREPARE mutator_update (text[], integer[], integer[]) AS
+        UPDATE orders o
+        SET order_status = COALESCE(u.order_status, o.order_status),
+            quantity = COALESCE(u.quantity, o.quantity),
+            last_updated = CURRENT_TIMESTAMP
+        FROM unnest($1, $2, $3) AS u(order_status, quantity, id)
+        WHERE o.id = u.id
+    """,
+    'mutator_delete': """
+        PREPARE mutator_delete (integer[]) AS
+        DELETE FROM orders WHERE id = ANY($1)
+    """,
+}
+
 class DatabaseMutator:
     """
     Handles database mutations for CDC simulation.
@@ -42,12 +86,20 @@ class DatabaseMutator:
         """Initialize database connection and faker instance."""
         self.connection = None
         self.faker = Faker()
+        self._rng = np.random.default_rng() if np is not None else None
         
         # Initialize graceful shutdown
         self.shutdown_handler = GracefulShutdownHandler(__name__)
         self.conn_manager = DatabaseConnectionManager(self.shutdown_handler, __name__)
         
         self._connect()
+        
+        # In-process copy of the order IDs, seeded once and kept current
+        # from this mutator's own inserts and deletes. The list is what
+        # random.sample() draws from; the position map makes removal O(1).
+        self._order_ids: List[int] = []
+        self._order_positions: Dict[int, int] = {}
+        self._remember_orders(self._get_existing_order_ids())
         self.shutdown_handler.start_listening()
         
     def _connect(self) -> None:
@@ -57,14 +109,10 @@ class DatabaseMutator:
         
         for attempt in range(max_retries):
             try:
-                self.connection = psycopg2.connect(
-                    host=os.getenv('DB_HOST', 'localhost'),
-                    port=os.getenv('DB_PORT', '5432'),
-                    database=os.getenv('DB_NAME', 'operational_db'),
-                    user=os.getenv('DB_USER', 'postgres'),
-                    password=os.getenv('DB_PASSWORD', 'postgres')
-                )
+                self.connection = psycopg2.connect(**connection_kwargs('source'))
                 self.connection.autocommit = True
+                self._cursor = self.connection.cursor()
+                self._prepare_statements()
                 self.conn_manager.add_connection(self.connection)
                 logger.info("Successfully connected to operational_db")
                 return
@@ -76,132 +124,172 @@ class DatabaseMutator:
                     logger.error("Failed to connect to database after all retries")
                     raise
     
+    def _reset_cursor(self) -> None:
+        """Replace the long-lived cursor after an error."""
+        self._cursor.close()
+        if not self.connection.closed:
+            self._cursor = self.connection.cursor()
+    
+    def _prepare_statements(self) -> None:
+        """Prepare the mutation statements on the current connection."""
+        cursor = self._cursor
+        for statement in PREPARED_STATEMENTS.values():
+            cursor.execute(statement)
+    
     def _get_existing_order_ids(self) -> List[int]:
         """Get list of existing order IDs for update/delete operations."""
         try:
-            with self.connection.cursor(cursor_factory=RealDictCursor) as cursor:
-                cursor.execute("SELECT id FROM orders ORDER BY id")
-                return [row['id'] for row in cursor.fetchall()]
+            cursor = self._cursor
+            cursor.execute("SELECT id FROM orders ORDER BY id")
+            return [row[0] for row in cursor]
         except psycopg2.Error as e:
+            self._reset_cursor()
             logger.error(f"Failed to fetch existing order IDs: {e}")
             return []
     
-    def _insert_order(self) -> Optional[int]:
+    def _generate_orders(self, count: int) -> List[List[Any]]:
+        """
+        Generate column values for a batch of new orders.
+        
+        Each column is drawn as one vector (NumPy when installed, otherwise
+        random.choices) rather than value by value.
+        
+        Returns:
+            customer_id, product_id, quantity, unit_price and order_status
+            columns, each holding count values
+        """
+        if self._rng is not None:
+            return [
+                self._rng.integers(1, 1001, count).tolist(),
+                self._rng.integers(100, 1000, count).tolist(),
+                self._rng.integers(1, 11, count).tolist(),
+                np.round(self._rng.uniform(10.0, 500.0, count), 2).tolist(),
+                self._rng.choice(ORDER_STATUSES, count).tolist()
+            ]
+        
+        return [
+            random.choices(CUSTOMER_IDS, k=count),
+            random.choices(PRODUCT_IDS, k=count),
+            random.choices(QUANTITIES, k=count),
+            [round(random.uniform(10.0, 500.0), 2) for _ in range(count)],
+            random.choices(ORDER_STATUSES, k=count)
+        ]
+    
+    def _generate_update(self, order_id: int) -> Tuple[Optional[str], Optional[int], int]:
+        """
+        Generate a random update for an order.
+        Columns left unchanged are None and kept by mutator_update's COALESCE.
+        """
+        # Randomly choose what to update
+        update_type = random.choice(['status', 'quantity', 'both'])
+        new_status = random.choice(ORDER_STATUSES) if update_type != 'quantity' else None
+        new_quantity = random.randint(1, 15) if update_type != 'status' else None
+        return new_status, new_quantity, order_id
+    
+    def _insert_orders(self, count: int) -> List[int]:
         """
-        Insert a new order record.
-        Returns the ID of the inserted order or None if failed.
+        Insert a batch of new orders in a single statement.
+        Returns the IDs of the inserted orders (empty if failed).
         """
         try:
-            with self.connection.cursor() as cursor:
-                insert_query = sql.SQL("""
-                    INSERT INTO orders (customer_id, product_id, quantity, unit_price, order_status)
-                    VALUES (%s, %s, %s, %s, %s)
-                    RETURNING id
-                """)
-                
-                customer_id = random.randint(1, 1000)
-                product_id = random.randint(100, 999)
-                quantity = random.randint(1, 10)
-                unit_price = round(random.uniform(10.0, 500.0), 2)
-                status = random.choice(['pending', 'confirmed', 'shipped', 'completed', 'cancelled'])
-                
-                cursor.execute(insert_query, (
-                    customer_id, product_id, quantity, unit_price, status
-                ))
+            cursor = self._cursor
+            cursor.execute(
+                "EXECUTE mutator_insert (%s, %s, %s, %s, %s)",
+                self._generate_orders(count)
+            )
                 
-                order_id = cursor.fetchone()[0]
-                logger.info(f"Inserted new order {order_id}: customer={customer_id}, product={product_id}, amount={quantity * unit_price:.2f}")
-                return order_id
+            order_ids = [row[0] for row in cursor]
+            self._remember_orders(order_ids)
+            logger.info(f"Inserted {len(order_ids)} new orders: {order_ids}")
+            return order_ids
                 
         except psycopg2.Error as e:
-            logger.error(f"Failed to insert order: {e}")
-            return None
+            self._reset_cursor()
+            logger.error(f"Failed to insert orders: {e}")
+            return []
+    
+    def _remember_orders(self, order_ids: List[int]) -> None:
+        """Add order IDs to the in-process cache."""
+        for order_id in order_ids:
+            if order_id not in self._order_positions:
+                self._order_positions[order_id] = len(self._order_ids)
+                self._order_ids.append(order_id)
     
-    def _update_order(self, order_id: int) -> bool:
+    def _forget_orders(self, order_ids: List[int]) -> None:
+        """Drop order IDs from the cache, moving the last ID into each gap."""
+        for order_id in order_ids:
+            position = self._order_positions.pop(order_id, None)
+            if position is None:
+                continue
+            last_id = self._order_ids.pop()
+            if last_id != order_id:
+                self._order_ids[position] = last_id
+                self._order_positions[last_id] = position
+    
+    def _update_orders(self, order_ids: List[int]) -> bool:
         """
-        Update an existing order record.
+        Apply a random update to each of the given orders in one round trip.
         Returns True if successful, False otherwise.
         """
+        updates = [self._generate_update(order_id) for order_id in order_ids]
+        
         try:
-            with self.connection.cursor() as cursor:
-                # Randomly choose what to update
-                update_type = random.choice(['status', 'quantity', 'both'])
-                
-                if update_type == 'status':
-                    new_status = random.choice(['pending', 'confirmed', 'shipped', 'completed', 'cancelled'])
-                    update_query = sql.SQL("""
-                        UPDATE orders 
-                        SET order_status = %s, last_updated = CURRENT_TIMESTAMP
-                        WHERE id = %s
-                    """)
-                    cursor.execute(update_query, (new_status, order_id))
-                    logger.info(f"Updated order {order_id} status to {new_status}")
-                    
-                elif update_type == 'quantity':
-                    new_quantity = random.randint(1, 15)
-                    update_query = sql.SQL("""
-                        UPDATE orders 
-                        SET quantity = %s, last_updated = CURRENT_TIMESTAMP
-                        WHERE id = %s
-                    """)
-                    cursor.execute(update_query, (new_quantity, order_id))
-                    logger.info(f"Updated order {order_id} quantity to {new_quantity}")
-                    
-                else:  # both
-                    new_status = random.choice(['pending', 'confirmed', 'shipped', 'completed', 'cancelled'])
-                    new_quantity = random.randint(1, 15)
-                    update_query = sql.SQL("""
-                        UPDATE orders 
-                        SET order_status = %s, quantity = %s, last_updated = CURRENT_TIMESTAMP
-                        WHERE id = %s
-                    """)
-                    cursor.execute(update_query, (new_status, new_quantity, order_id))
-                    logger.info(f"Updated order {order_id}: status={new_status}, quantity={new_quantity}")
-                
-                return cursor.rowcount > 0
+            cursor = self._cursor
+            cursor.execute(
+                "EXECUTE mutator_update (%s, %s, %s)",
+                [list(column) for column in zip(*updates)]
+            )
+            
+            for new_status, new_quantity, order_id in updates:
+                logger.info(f"Updated order {order_id}: status={new_status}, quantity={new_quantity}")
+            return True
                 
         except psycopg2.Error as e:
-            logger.error(f"Failed to update order {order_id}: {e}")
+            self._reset_cursor()
+            logger.error(f"Failed to update orders {order_ids}: {e}")
             return False
     
-    def _delete_order(self, order_id: int) -> bool:
+    def _delete_orders(self, order_ids: List[int]) -> bool:
         """
-        Delete an order record.
+        Delete a batch of order records.
         Returns True if successful, False otherwise.
         """
         try:
-            with self.connection.cursor() as cursor:
-                delete_query = sql.SQL("DELETE FROM orders WHERE id = %s")
-                cursor.execute(delete_query, (order_id,))
+            cursor = self._cursor
+            cursor.execute("EXECUTE mutator_delete (%s)", (list(order_ids),))
                 
-                if cursor.rowcount > 0:
-                    logger.info(f"Deleted order {order_id}")
-                    return True
-                else:
-                    logger.warning(f"Order {order_id} not found for deletion")
-                    return False
+            self._forget_orders(order_ids)
+                
+            if cursor.rowcount > 0:
+                logger.info(f"Deleted {cursor.rowcount} orders: {order_ids}")
+                return True
+            else:
+                logger.warning(f"Orders {order_ids} not found for deletion")
+                return False
                     
         except psycopg2.Error as e:
-            logger.error(f"Failed to delete order {order_id}: {e}")
+            self._reset_cursor()
+            logger.error(f"Failed to delete orders {order_ids}: {e}")
             return False
     
     def _get_operation_stats(self) -> Dict[str, Any]:
         """Get current statistics of the orders table."""
         try:
-            with self.connection.cursor(cursor_factory=RealDictCursor) as cursor:
-                stats_query = sql.SQL("""
-                    SELECT 
-                        COUNT(*) as total_orders,
-                        COUNT(CASE WHEN order_status = 'pending' THEN 1 END) as pending_orders,
-                        COUNT(CASE WHEN order_status = 'completed' THEN 1 END) as completed_orders,
-                        COUNT(CASE WHEN order_status = 'cancelled' THEN 1 END) as cancelled_orders,
-                        MAX(order_date) as latest_order,
-                        SUM(total_amount) as total_revenue
-                    FROM orders
-                """)
-                cursor.execute(stats_query)
-                return dict(cursor.fetchone())
+            cursor = self._cursor
+            stats_query = sql.SQL("""
+                SELECT 
+                    COUNT(*) as total_orders,
+                    COUNT(CASE WHEN order_status = 'pending' THEN 1 END) as pending_orders,
+                    COUNT(CASE WHEN order_status = 'completed' THEN 1 END) as completed_orders,
+                    COUNT(CASE WHEN order_status = 'cancelled' THEN 1 END) as cancelled_orders,
+                    MAX(order_date) as latest_order,
+                    SUM(total_amount) as total_revenue
+                FROM orders
+            """)
+            cursor.execute(stats_query)
+            return dict(zip(STATS_COLUMNS, cursor.fetchone()))
         except psycopg2.Error as e:
+            self._reset_cursor()
             logger.error(f"Failed to get operation stats: {e}")
             return {}
     
@@ -224,8 +312,8 @@ class DatabaseMutator:
                 if stats:
                     logger.info(f"Current stats: {stats}")
                 
-                # Get existing orders for potential updates/deletes
-                existing_orders = self._get_existing_order_ids()
+                # Existing orders for potential updates/deletes
+                existing_orders = self._order_ids
                 
                 # Determine operation mix based on current data state
                 total_orders = len(existing_orders)
@@ -233,40 +321,23 @@ class DatabaseMutator:
                 if total_orders == 0:
                     # If no orders, create some initial data
                     logger.info("No existing orders found, creating initial data")
-                    for _ in range(5):
-                        self._insert_order()
+                    self._insert_orders(5)
                 else:
-                    # Normal operation mix
-                    operations = []
+                    # Normal operation mix, applied as one batch per operation type
                     
                     # Always include some inserts (30% chance)
                     if random.random() < 0.3:
-                        operations.extend(['insert'] * random.randint(1, 3))
+                        self._insert_orders(random.randint(1, 3))
                     
                     # Include updates if we have orders (40% chance)
                     if existing_orders and random.random() < 0.4:
                         update_count = min(random.randint(1, 3), len(existing_orders))
-                        orders_to_update = random.sample(existing_orders, update_count)
-                        for order_id in orders_to_update:
-                            operations.append(('update', order_id))
+                        self._update_orders(random.sample(existing_orders, update_count))
                     
                     # Include deletes if we have enough orders (20% chance)
                     if len(existing_orders) > 10 and random.random() < 0.2:
                         delete_count = min(random.randint(1, 2), len(existing_orders) // 2)
-                        orders_to_delete = random.sample(existing_orders, delete_count)
-                        for order_id in orders_to_delete:
-                            operations.append(('delete', order_id))
-                    
-                    # Execute operations
-                    for operation in operations:
-                        if isinstance(operation, str) and operation == 'insert':
-                            self._insert_order()
-                        elif isinstance(operation, tuple):
-                            op_type, order_id = operation
-                            if op_type == 'update':
-                                self._update_order(order_id)
-                            elif op_type == 'delete':
-                                self._delete_order(order_id)
+                        self._delete_orders(random.sample(existing_orders, delete_count))
                 
                 logger.info("=== Mutation batch completed ===")
                 
@@ -0,0 +1,191 @@
+"""
+Shared PostgreSQL connection pools for the CDC platform.
+
+Provides process-wide psycopg2 connection pools so components reuse
+connections instead of opening a new one per operation:
+- One lazily created pool per database (warehouse, source)
+- Connection settings read from WAREHOUSE_DB_* / DB_* environment variables
+- Retry with backoff on transient OperationalError or an exhausted pool when
+  acquiring a connection
+- Dedicated unpooled connections with the same settings
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+import psycopg2
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Environment variable prefix and defaults for each known database
+DATABASES = {
+    'warehouse': ('WAREHOUSE_DB', '5433', 'warehouse_db'),
+    'source': ('DB', '5434', 'operational_db'),
+}
+
+POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '4'))
+
+_pools: Dict[str, ThreadedConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def connection_kwargs(database: str) -> Dict[str, str]:
+    """
+    Build psycopg2 connection arguments for a known database.
+
+    Components connecting without the pool use these too, so pooled and
+    direct connections share the same environment defaults.
+
+    Args:
+        database: Database name key ('warehouse' or 'source')
+
+    Returns:
+        Keyword arguments for psycopg2.connect
+    """
+    prefix, default_port, default_name = DATABASES[database]
+    return {
+        'host': os.getenv(f'{prefix}_HOST', 'localhost'),
+        'port': os.getenv(f'{prefix}_PORT', default_port),
+        'database': os.getenv(f'{prefix}_NAME', default_name),
+        'user': os.getenv(f'{prefix}_USER', 'postgres'),
+        'password': os.getenv(f'{prefix}_PASSWORD', 'postgres'),
+    }
+
+
+def get_pool(database: str = 'warehouse') -> ThreadedConnectionPool:
+    """
+    Get the process-wide connection pool for a database, creating it on first use.
+
+    Args:
+        database: Database name key ('warehouse' or 'source')
+
+    Returns:
+        Shared ThreadedConnectionPool
+    """
+    pool = _pools.get(database)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(database)
+            if pool is None:
+                pool = ThreadedConnectionPool(
+                    POOL_MIN_SIZE, POOL_MAX_SIZE, **connection_kwargs(database)
+                )
+                _pools[database] = pool
+                logger.info(f"Created {database} connection pool (max {POOL_MAX_SIZE})")
+    return pool
+
+
+def open_connection(database: str = 'warehouse'):
+    """
+    Open a dedicated connection outside the pool.
+
+    For callers that need sessions of their own on top of what the pool
+    allows, such as concurrency tests. The caller closes the connection.
+
+    Args:
+        database: Database name key ('warehouse' or 'source')
+
+    Returns:
+        psycopg2 connection with autocommit disabled
+    """
+    conn = psycopg2.connect(**connection_kwargs(database))
+    conn.autocommit = False
+    return conn
+
+
+def free_connections(database: str = 'warehouse') -> int:
+    """
+    Count the connections the shared pool can still hand out.
+
+    Args:
+        database: Database name key ('warehouse' or 'source')
+
+    Returns:
+        Pool size minus the connections currently checked out
+    """
+    pool = get_pool(database)
+    # ThreadedConnectionPool keeps checked out connections in _used
+    return max(0, pool.maxconn - len(pool._used))
+
+
+def acquire_connection(database: str = 'warehouse', retries: int = 3, backoff: float = 1.0):
+    """
+    Take a connection from the shared pool, retrying transient failures.
+
+    An exhausted pool is retried like a failed connection, giving other
+    holders the backoff time to return theirs.
+
+    Args:
+        database: Database name key ('warehouse' or 'source')
+        retries: Number of attempts before giving up
+        backoff: Initial delay in seconds, doubled after each failure
+
+    Returns:
+        psycopg2 connection with autocommit disabled
+    """
+    for attempt in range(1, retries + 1):
+        try:
+            conn = get_pool(database).getconn()
+            if conn.closed:
+                release_connection(conn, database, discard=True)
+                raise psycopg2.OperationalError("pooled connection is closed")
+            conn.autocommit = False
+            return conn
+        except (psycopg2.OperationalError, PoolError) as e:
+            if attempt == retries:
+                raise
+            logger.warning(f"Connection to {database} failed (attempt {attempt}/{retries}): {e}")
+            time.sleep(backoff)
+            backoff *= 2
+
+
+def release_connection(conn, database: str = 'warehouse', discard: bool = False) -> None:
+    """
+    Return a connection to the shared pool.
+
+    Args:
+        conn: Connection obtained from acquire_connection
+        database: Database name key the connection came from
+        discard: Close the connection instead of keeping it for reuse
+    """
+    pool = _pools.get(database)
+    if pool is None or pool.closed:
+        conn.close()
+        return
+    pool.putconn(conn, close=discard or bool(conn.closed))
+
+
+@contextmanager
+def pooled_connection(database: str = 'warehouse') -> Iterator:
+    """
+    Borrow a pooled connection for the duration of a with-block.
+
+    Rolls back any open transaction on error and returns the connection
+    to the pool; broken connections are discarded.
+    """
+    conn = acquire_connection(database)
+    try:
+        yield conn
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        release_connection(conn, database, discard=bool(conn.closed))
+
+
+def close_pools() -> None:
+    """Close all pooled connections."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.closeall()
+        _pools.clear()
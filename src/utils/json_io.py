@@ -0,0 +1,186 @@
+"""
+Fast JSON file I/O for CDC batch files.
+
+Provides shared helpers for reading and writing CDC batch files:
+- orjson encoding/decoding when installed, stdlib json otherwise
+- 64KB buffered reads with a single read() per file
+- Optional ijson streaming for very large batch files, as a list or one
+  change at a time
+- Optional zstd-compressed batch files (.json.zst)
+"""
+
+import json
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Read buffer size for batch files
+READ_BUFFER_SIZE = 1 << 16
+
+# Files at least this large are streamed with ijson when it is available
+STREAMING_THRESHOLD_BYTES = 50 * 1024 * 1024
+
+# Suffix added to zstd-compressed batch files, and the batch file suffixes
+# readers accept
+ZSTD_SUFFIX = '.zst'
+BATCH_FILE_SUFFIXES = ('.json', '.json' + ZSTD_SUFFIX)
+
+ZSTD_AVAILABLE = zstandard is not None
+
+
+def is_batch_file(name: str) -> bool:
+    """Check whether a file name is a CDC batch file (plain or compressed)."""
+    return name.startswith('changes_') and name.endswith(BATCH_FILE_SUFFIXES)
+
+
+def _require_zstd() -> None:
+    """Fail clearly when a compressed file is used without zstandard."""
+    if zstandard is None:
+        raise ImportError("zstandard is required for compressed (.zst) batch files")
+
+
+def zstd_stream_writer(f: BinaryIO, level: int = 3):
+    """
+    Wrap a binary file in a zstd compressing writer.
+
+    Closing the writer ends the zstd frame but leaves the file open.
+
+    Args:
+        f: Binary file opened for writing
+        level: zstd compression level
+
+    Returns:
+        Writable stream that compresses into f
+    """
+    _require_zstd()
+    return zstandard.ZstdCompressor(level=level, threads=-1).stream_writer(f, closefd=False)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decode a JSON document."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _default(obj: Any) -> str:
+    """Serialize values stdlib json cannot handle, matching orjson's output."""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    return str(obj)
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """
+    Encode a JSON document to UTF-8 bytes.
+
+    datetime/date values are written in ISO 8601 format and any other
+    non-JSON type (e.g. Decimal) as its string form.
+
+    Args:
+        obj: Object to encode
+        indent: Pretty-print with a two-space indent
+
+    Returns:
+        Encoded JSON document
+    """
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj, default=_default, option=option)
+    return json.dumps(obj, indent=2 if indent else None, default=_default).encode()
+
+
+def write_json_file(path: Union[str, Path], obj: Any, indent: bool = False) -> None:
+    """
+    Encode a JSON document and write it with a single write().
+
+    Args:
+        path: Destination file path
+        obj: Object to encode
+        indent: Pretty-print with a two-space indent
+    """
+    with open(path, 'wb') as f:
+        f.write(dumps(obj, indent=indent))
+
+
+def load_json_file(path: Union[str, Path]) -> Any:
+    """
+    Read and decode a JSON file with a single buffered read.
+
+    Args:
+        path: Path to the JSON file
+
+    Returns:
+        Decoded JSON document
+    """
+    with open(path, 'rb', buffering=READ_BUFFER_SIZE) as f:
+        if str(path).endswith(ZSTD_SUFFIX):
+            _require_zstd()
+            with zstandard.ZstdDecompressor().stream_reader(f) as reader:
+                return loads(reader.readall())
+        return loads(f.read())
+
+
+def load_batch_changes(path: Union[str, Path]) -> List[Dict[str, Any]]:
+    """
+    Read the change records from a CDC batch file.
+
+    Compressed (.zst) files are decompressed transparently. Batch files of
+    STREAMING_THRESHOLD_BYTES or more (on disk) are parsed
+    incrementally with ijson (when installed) so the raw file and the full
+    document tree are never held in memory at once.
+
+    Args:
+        path: Path to a {batch_metadata, changes} batch file
+
+    Returns:
+        List of change records
+    """
+    path = Path(path)
+    if ijson is not None and path.stat().st_size >= STREAMING_THRESHOLD_BYTES:
+        return list(iter_batch_changes(path))
+
+    return load_json_file(path).get('changes', [])
+
+
+def iter_batch_changes(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the change records of a CDC batch file one at a time.
+
+    Like load_batch_changes, but files of STREAMING_THRESHOLD_BYTES or more
+    are never materialized as a list, so a caller that reduces the changes
+    as they arrive only holds what it keeps.
+
+    Args:
+        path: Path to a {batch_metadata, changes} batch file
+
+    Yields:
+        Change records in file order
+    """
+    path = Path(path)
+    if ijson is None or path.stat().st_size < STREAMING_THRESHOLD_BYTES:
+        yield from load_json_file(path).get('changes', [])
+        return
+
+    with open(path, 'rb', buffering=READ_BUFFER_SIZE) as f:
+        if path.name.endswith(ZSTD_SUFFIX):
+            _require_zstd()
+            with zstandard.ZstdDecompressor().stream_reader(f) as reader:
+                yield from ijson.items(reader, 'changes.item')
+        else:
+            yield from ijson.items(f, 'changes.item')
@@ -6,13 +6,265 @@ Provides consistent structured logging across all components with:
 - Multiple handlers (console + file)
 - Log rotation and cleanup
 - Component-specific loggers
+- Non-blocking emit: records are queued and written by a listener thread
 """
 
+import atexit
 import logging
 import logging.handlers
 import os
+import queue
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from datetime import datetime
+from typing import Dict, Iterator, List, Optional, TextIO
+
+
+class _RoutingHandler(logging.Handler):
+    """
+    Dispatch queued records to the console/file handlers of their logger.
+
+    One listener thread serves every component logger, so records are
+    routed by logger name to the handlers setup_logging built for it.
+    Records from unconfigured child loggers (e.g. "pkg.mod.sub" under a
+    configured "pkg.mod") propagate to the nearest configured ancestor and
+    are routed to its handlers.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._routes: Dict[str, List[logging.Handler]] = {}
+        # logger name -> handlers of its nearest configured ancestor
+        self._resolved: Dict[str, List[logging.Handler]] = {}
+        # Handlers that also receive every routed record; replaced rather
+        # than mutated so the listener thread can iterate without a lock
+        self._capture: List[logging.Handler] = []
+
+    def set_handlers(self, logger_name: str, handlers: List[logging.Handler]) -> None:
+        """Replace the handlers for a logger, closing the previous ones."""
+        for handler in self._routes.get(logger_name, ()):
+            handler.close()
+        self._routes[logger_name] = handlers
+        self._resolved = {}
+
+    def _handlers_for(self, name: str) -> List[logging.Handler]:
+        """Find the handlers of a logger or its nearest configured ancestor."""
+        handlers = self._resolved.get(name)
+        if handlers is None:
+            key = name
+            while key not in self._routes and '.' in key:
+                key = key.rpartition('.')[0]
+            handlers = self._resolved[name] = self._routes.get(key, [])
+        return handlers
+
+    def add_capture_handler(self, handler: logging.Handler) -> None:
+        """Also send every routed record to handler."""
+        self._capture = self._capture + [handler]
+
+    def remove_capture_handler(self, handler: logging.Handler) -> None:
+        """Stop sending routed records to handler."""
+        self._capture = [h for h in self._capture if h is not handler]
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        for handler in self._handlers_for(record.name):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        for handler in self._capture:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.handle(record)
+
+    def flush(self) -> None:
+        for handlers in self._routes.values():
+            for handler in handlers:
+                handler.flush()
+
+
+class FastRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler that tracks the file size in-process.
+
+    The stock handler checks the file type and seeks to the end of the
+    stream for every record; this one counts the bytes it writes and only
+    falls back to that check when a record could cross maxBytes.
+
+    With autoflush disabled the stream is only flushed by flush(), so a
+    batch of records handed over by a _BatchingMemoryHandler reaches the
+    file in buffered block writes.
+    """
+
+    autoflush = True
+
+    def _open(self):
+        try:
+            self._written = os.path.getsize(self.baseFilename)
+        except OSError:
+            self._written = 0
+        return super()._open()
+
+    def _byte_length(self, msg: str) -> int:
+        """Length of msg in bytes once encoded for the log file."""
+        if msg.isascii():
+            return len(msg)
+        return len(msg.encode(self.encoding or 'utf-8'))
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        return self._should_rollover(record, self._byte_length(self.format(record) + self.terminator))
+
+    def _should_rollover(self, record: logging.LogRecord, msg_len: int) -> bool:
+        """Check for rollover given the byte length of the formatted record."""
+        if self.maxBytes <= 0:
+            return False
+        if self.stream is not None and self._written + msg_len < self.maxBytes:
+            return False
+        return super().shouldRollover(record)
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self._written = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            msg = self.format(record) + self.terminator
+            msg_len = self._byte_length(msg)
+            if self._should_rollover(record, msg_len):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(msg)
+            if self.autoflush:
+                self.flush()
+            self._written += msg_len
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Shared by every console and file handler
+_FORMATTER = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+
+class _BatchingMemoryHandler(logging.handlers.MemoryHandler):
+    """
+    MemoryHandler that flushes its target once per batch of records.
+
+    Besides a full buffer or an ERROR record, a record arriving
+    LOG_FLUSH_SECONDS after the oldest buffered one flushes the batch, so
+    slow streams reach the file with bounded delay.
+    """
+
+    def shouldFlush(self, record: logging.LogRecord) -> bool:
+        return (super().shouldFlush(record)
+                or record.created - self.buffer[0].created >= LOG_FLUSH_SECONDS)
+
+    def flush(self) -> None:
+        super().flush()
+        if self.target is not None:
+            self.target.flush()
+
+    def close(self) -> None:
+        target = self.target
+        super().close()
+        if target is not None:
+            target.close()
+
+
+# Records buffered per log file before they are written; ERROR and above
+# are written immediately
+LOG_MEM_CAPACITY = int(os.getenv('LOG_MEM_CAPACITY', '512'))
+
+# Longest a buffered record waits before it is written: batches are flushed
+# once they span this many seconds, and whenever no record has been logged
+# for this long
+LOG_FLUSH_SECONDS = float(os.getenv('LOG_FLUSH_SECONDS', '5'))
+
+
+class _FlushingQueueListener(logging.handlers.QueueListener):
+    """QueueListener that flushes the buffered log files when the queue goes idle."""
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        while True:
+            try:
+                return self.queue.get(block, LOG_FLUSH_SECONDS)
+            except queue.Empty:
+                if not block:
+                    raise
+                for handler in self.handlers:
+                    handler.flush()
+
+# SimpleQueue.put is reentrant, so logging from a signal handler that
+# interrupts another log call cannot deadlock
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_router = _RoutingHandler()
+_listener: Optional[logging.handlers.QueueListener] = None
+_listener_lock = threading.Lock()
+
+# Arguments each logger was last configured with, and log directories known
+# to exist, so repeated setup_logging calls skip rebuilding handlers
+_CONFIGURED: Dict[str, tuple] = {}
+_LOG_DIRS = set()
+
+
+def _ensure_listener() -> None:
+    """Start the process-wide log listener thread on first use."""
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            _listener = _FlushingQueueListener(_log_queue, _router)
+            _listener.start()
+            atexit.register(stop_logging)
+
+
+def flush_logging() -> None:
+    """Write out every queued and buffered log record, keeping the listener running."""
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _router.flush()
+            _listener.start()
+
+
+@contextmanager
+def capture_logging(stream: TextIO) -> Iterator[None]:
+    """
+    Copy log records emitted inside the block to stream.
+    
+    Covers loggers configured by setup_logging, whose console handlers are
+    bound to the sys.stdout/sys.stderr of the time they were set up, and
+    loggers propagating to the root logger. Queued records are written out
+    before the block exits.
+    
+    Args:
+        stream: Text stream the formatted records are written to
+    """
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(_FORMATTER)
+    root = logging.getLogger()
+    root.addHandler(handler)
+    _router.add_capture_handler(handler)
+    try:
+        yield
+    finally:
+        flush_logging()
+        _router.remove_capture_handler(handler)
+        root.removeHandler(handler)
+
+
+def stop_logging() -> None:
+    """Write out every queued and buffered log record and stop the listener thread."""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _router.flush()
+            _listener = None
+
 
 def setup_logging(
     logger_name: str,
@@ -37,6 +289,11 @@ def setup_logging(
     # Create logger
     logger = logging.getLogger(logger_name)
     
+    # Already configured with the same settings
+    settings = (log_level.upper(), log_file, max_bytes, backup_count)
+    if _CONFIGURED.get(logger_name) == settings and logger.handlers:
+        return logger
+    
     # Clear existing handlers to avoid duplicates
     logger.handlers.clear()
     
@@ -44,17 +301,10 @@ def setup_logging(
     level = getattr(logging, log_level.upper(), logging.INFO)
     logger.setLevel(level)
     
-    # Create formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
     # Console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(level)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    console_handler.setFormatter(_FORMATTER)
     
     # File handler with rotation
     if log_file is None:
@@ -63,28 +313,49 @@ def setup_logging(
         log_file = f"logs/{safe_name}.log"
     
     # Ensure logs directory exists
-    log_path = Path(log_file)
-    log_path.parent.mkdir(parents=True, exist_ok=True)
+    log_dir = Path(log_file).parent
+    if log_dir not in _LOG_DIRS:
+        log_dir.mkdir(parents=True, exist_ok=True)
+        _LOG_DIRS.add(log_dir)
     
-    file_handler = logging.handlers.RotatingFileHandler(
+    file_handler = FastRotatingFileHandler(
         log_file,
         maxBytes=max_bytes,
         backupCount=backup_count,
         encoding='utf-8'
     )
     file_handler.setLevel(level)
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    file_handler.setFormatter(_FORMATTER)
+    file_handler.autoflush = False
+    
+    # Buffer file writes; the console handler stays unbuffered
+    mem_handler = _BatchingMemoryHandler(
+        capacity=LOG_MEM_CAPACITY,
+        flushLevel=logging.ERROR,
+        target=file_handler,
+        flushOnClose=True
+    )
+    mem_handler.setLevel(level)
+    
+    # The logger itself only enqueues; the listener thread formats and
+    # writes to the console and file handlers
+    _router.set_handlers(logger_name, [console_handler, mem_handler])
+    _ensure_listener()
+    logger.addHandler(logging.handlers.QueueHandler(_log_queue))
     
     # Prevent propagation to root logger to avoid duplicate logs
     logger.propagate = False
     
+    _CONFIGURED[logger_name] = settings
     return logger
 
 def get_logger(logger_name: str) -> logging.Logger:
     """
     Get an existing logger or create a new one with default settings.
     
+    Loggers already configured by setup_logging are returned as-is; new
+    ones are set up at the LOG_LEVEL environment level (default INFO).
+    
     Args:
         logger_name: Name of the logger
         
@@ -93,8 +364,8 @@ def get_logger(logger_name: str) -> logging.Logger:
     """
     logger = logging.getLogger(logger_name)
     
-    # If logger has no handlers, set up with defaults
-    if not logger.handlers:
-        return setup_logging(logger_name)
+    # If logger is not configured yet, set up with defaults
+    if logger_name not in _CONFIGURED or not logger.handlers:
+        return setup_logging(logger_name, log_level=os.getenv('LOG_LEVEL', 'INFO'))
     
     return logger
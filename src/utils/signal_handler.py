@@ -11,8 +11,15 @@ Provides signal handling for SIGTERM and SIGINT to ensure:
 import signal
 import sys
 import logging
+import threading
+import weakref
+from pathlib import Path
 from typing import Callable, Optional
 
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.utils.logging_config import flush_logging
+
 class GracefulShutdownHandler:
     """
     Handles graceful shutdown signals for long-running processes.
@@ -39,10 +46,12 @@ class GracefulShutdownHandler:
         """Initialize the shutdown handler."""
         self.should_shutdown = False
         self.cleanup_functions = []
+        self.received_signal = None
+        self._shutdown_event = threading.Event()
+        self._signame = {int(signal.SIGTERM): "SIGTERM", int(signal.SIGINT): "SIGINT"}
         self.logger = logger_name or __name__
         
         if isinstance(self.logger, str):
-            import logging
             self.logger = logging.getLogger(self.logger)
     
     def register_cleanup(self, cleanup_func: Callable[[], None]) -> None:
@@ -53,19 +62,28 @@ class GracefulShutdownHandler:
             cleanup_func: Function to call during cleanup
         """
         self.cleanup_functions.append(cleanup_func)
-        self.logger.debug(f"Registered cleanup function: {cleanup_func.__name__}")
+        self.logger.debug("Registered cleanup function: %s", cleanup_func.__name__)
     
     def _signal_handler(self, signum: int, frame) -> None:
         """
         Internal signal handler.
         
+        Only records the signal; it is logged later from cleanup() or
+        wait_for_shutdown() rather than inside the handler.
+        
         Args:
             signum: Signal number
             frame: Current stack frame
         """
-        signal_name = signal.Signals(signum).name
-        self.logger.info(f"Received {signal_name} signal, initiating graceful shutdown...")
+        self.received_signal = self._signame.get(signum, str(signum))
         self.should_shutdown = True
+        self._shutdown_event.set()
+    
+    def _log_received_signal(self) -> None:
+        """Log the shutdown signal once, outside the signal handler."""
+        if self.received_signal is not None:
+            self.logger.info("Received %s signal, initiating graceful shutdown...", self.received_signal)
+            self.received_signal = None
     
     def start_listening(self) -> None:
         """Start listening for shutdown signals."""
@@ -75,30 +93,35 @@ class GracefulShutdownHandler:
     
     def cleanup(self) -> None:
         """Execute all registered cleanup functions."""
+        self._log_received_signal()
         self.logger.info("Starting graceful shutdown cleanup...")
         
-        for i, cleanup_func in enumerate(self.cleanup_functions, 1):
+        # Snapshot, so functions registered during cleanup do not run
+        funcs = tuple(self.cleanup_functions)
+        n = len(funcs)
+        for i, cleanup_func in enumerate(funcs, 1):
             try:
-                self.logger.debug(f"Executing cleanup function {i}/{len(self.cleanup_functions)}: {cleanup_func.__name__}")
+                self.logger.debug("Executing cleanup function %d/%d: %s", i, n, cleanup_func.__name__)
                 cleanup_func()
-                self.logger.debug(f"Successfully executed cleanup function: {cleanup_func.__name__}")
+                self.logger.debug("Successfully executed cleanup function: %s", cleanup_func.__name__)
             except Exception as e:
                 self.logger.error(f"Error in cleanup function {cleanup_func.__name__}: {e}")
         
         self.logger.info("Graceful shutdown cleanup completed")
+        
+        # Make sure queued log records reach their files before exit
+        flush_logging()
     
     def wait_for_shutdown(self, check_interval: float = 1.0) -> None:
         """
         Wait for shutdown signal in a blocking manner.
         
         Args:
-            check_interval: How often to check for shutdown (seconds)
+            check_interval: Unused; kept for backward compatibility
         """
-        import time
-        
         self.logger.info("Waiting for shutdown signal...")
-        while not self.should_shutdown:
-            time.sleep(check_interval)
+        self._shutdown_event.wait()
+        self._log_received_signal()
         
         self.cleanup()
 
@@ -111,16 +134,19 @@ class DatabaseConnectionManager:
         conn = conn_manager.get_connection()
         # Use connection...
         # Connection will be automatically closed on shutdown
+    
+    Connections are held by weak reference, so ones the caller drops are
+    forgotten instead of kept alive; they must support weak references
+    (psycopg2 connections do).
     """
     
     def __init__(self, shutdown_handler: GracefulShutdownHandler, logger_name: str = None):
         """Initialize the connection manager."""
         self.shutdown_handler = shutdown_handler
-        self.connections = []
+        self.connections = weakref.WeakSet()
         self.logger = logger_name or __name__
         
         if isinstance(self.logger, str):
-            import logging
             self.logger = logging.getLogger(self.logger)
         
         # Register cleanup function
@@ -133,18 +159,19 @@ class DatabaseConnectionManager:
         Args:
             connection: Database connection object
         """
-        self.connections.append(connection)
-        self.logger.debug(f"Added database connection to manager (total: {len(self.connections)})")
+        self.connections.add(connection)
+        self.logger.debug("Added database connection to manager (total: %d)", len(self.connections))
     
     def close_all_connections(self) -> None:
         """Close all managed database connections."""
-        self.logger.info(f"Closing {len(self.connections)} database connections...")
+        conns = list(self.connections)
+        self.logger.info("Closing %d database connections...", len(conns))
         
-        for i, conn in enumerate(self.connections, 1):
+        for i, conn in enumerate(conns, 1):
             try:
                 if hasattr(conn, 'close'):
                     conn.close()
-                    self.logger.debug(f"Closed connection {i}/{len(self.connections)}")
+                    self.logger.debug("Closed connection %d/%d", i, len(conns))
                 else:
                     self.logger.warning(f"Connection {i} does not have close() method")
             except Exception as e:
@@ -7,22 +7,121 @@ in the warehouse database for monitoring and debugging.
 
 import os
 import sys
-import json
+import time
+import threading
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 from pathlib import Path
 
 import psycopg2
-from psycopg2 import sql
+from psycopg2.extras import Json, register_default_jsonb
 from dotenv import load_dotenv
 
 # Add src to path for imports
 sys.path.append(str(Path(__file__).parent.parent.parent))
-from src.utils.logging_config import setup_logging
+from src.utils.logging_config import get_logger
+from src.utils.db_pool import acquire_connection, close_pools, release_connection
+from src.utils.signal_handler import GracefulShutdownHandler
+from src.utils.json_io import dumps, loads
 
 load_dotenv()
 
-logger = setup_logging(__name__, log_level=os.getenv('LOG_LEVEL', 'INFO'))
+logger = get_logger(__name__)
+
+# The metadata schema is verified once per process
+_SCHEMA_READY = False
+_SCHEMA_LOCK = threading.Lock()
+
+# Non-terminal run updates are buffered and committed together once this many
+# are pending or the oldest has waited this long
+METADATA_BATCH_SIZE = int(os.getenv('METADATA_BATCH_SIZE', '50'))
+METADATA_FLUSH_SECONDS = float(os.getenv('METADATA_FLUSH_SECONDS', '2'))
+
+# Statuses a run can have; every status but 'running' ends the run, and
+# updates setting one are committed immediately
+RUN_STATUSES = ('running', 'completed', 'completed_with_errors', 'failed', 'cancelled')
+
+# Widens the status column and CHECK constraint of tables created before
+# 'completed_with_errors' was allowed
+STATUS_CHECK_MIGRATION = """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_constraint
+            WHERE conrelid = 'pipeline_metadata'::regclass
+              AND conname = 'pipeline_metadata_status_check'
+              AND pg_get_constraintdef(oid) LIKE '%completed_with_errors%'
+        ) THEN
+            ALTER TABLE pipeline_metadata
+                ALTER COLUMN status TYPE VARCHAR(30),
+                DROP CONSTRAINT IF EXISTS pipeline_metadata_status_check,
+                ADD CONSTRAINT pipeline_metadata_status_check
+                    CHECK (status IN ({statuses}));
+        END IF;
+    END $$;
+""".format(statuses=', '.join(f"'{status}'" for status in RUN_STATUSES))
+
+# Result columns of the pm_last and pm_stats statements
+LAST_RUN_COLUMNS = (
+    'id', 'run_id', 'start_time', 'end_time', 'status',
+    'records_processed', 'records_successful', 'records_failed',
+    'error_message', 'performance_metrics', 'created_at', 'updated_at'
+)
+STATS_COLUMNS = (
+    'total_runs', 'successful_runs', 'failed_runs', 'avg_duration_seconds',
+    'total_records_processed', 'total_records_successful',
+    'total_records_failed', 'last_run_time'
+)
+
+# Statements prepared once per (pooled) connection
+PREPARED_STATEMENTS = {
+    'pm_start': """
+        PREPARE pm_start (varchar, varchar, timestamptz, varchar, jsonb) AS
+        INSERT INTO pipeline_metadata (
+            pipeline_name, run_id, start_time, status, performance_metrics
+        ) VALUES ($1, $2, $3, $4, $5)
+        RETURNING id
+    """,
+    # Single update statement for every update shape; NULL arguments keep
+    # the current column value
+    'pm_update': """
+        PREPARE pm_update (varchar, integer, integer, integer, text, jsonb, timestamptz, bigint) AS
+        UPDATE pipeline_metadata
+        SET status = COALESCE($1, status),
+            records_processed = COALESCE($2, records_processed),
+            records_successful = COALESCE($3, records_successful),
+            records_failed = COALESCE($4, records_failed),
+            error_message = COALESCE($5, error_message),
+            performance_metrics = COALESCE($6, performance_metrics),
+            updated_at = $7,
+            end_time = CASE WHEN $1 <> 'running' THEN $7 ELSE end_time END
+        WHERE id = $8
+    """,
+    'pm_last': """
+        PREPARE pm_last (varchar) AS
+        SELECT {columns}
+        FROM pipeline_metadata 
+        WHERE pipeline_name = $1
+        ORDER BY start_time DESC
+        LIMIT 1
+    """.format(columns=', '.join(LAST_RUN_COLUMNS)),
+    'pm_stats': """
+        PREPARE pm_stats (varchar, integer) AS
+        SELECT 
+            COUNT(*) as total_runs,
+            COUNT(CASE WHEN status = 'completed' THEN 1 END) as successful_runs,
+            COUNT(CASE WHEN status = 'failed' THEN 1 END) as failed_runs,
+            AVG(CASE WHEN end_time IS NOT NULL THEN 
+                EXTRACT(EPOCH FROM (end_time - start_time)) END) as avg_duration_seconds,
+            SUM(records_processed) as total_records_processed,
+            SUM(records_successful) as total_records_successful,
+            SUM(records_failed) as total_records_failed,
+            MAX(start_time) as last_run_time
+        FROM pipeline_metadata 
+        WHERE pipeline_name = $1 
+            AND start_time >= CURRENT_TIMESTAMP - make_interval(days => $2)
+    """,
+}
 
 class PipelineMetadataManager:
     """
@@ -36,40 +135,104 @@ class PipelineMetadataManager:
     - Error details
     """
     
-    def __init__(self):
-        """Initialize database connection and create metadata table."""
+    def __init__(self, shutdown_handler: Optional[GracefulShutdownHandler] = None):
+        """
+        Initialize database connection and create metadata table.
+        
+        Args:
+            shutdown_handler: Optional shutdown handler; when given, the
+                connection is returned and the pools closed on shutdown
+        """
         self.connection = None
+        self._pending: List[Tuple] = []
+        self._last_flush = time.monotonic()
         self._connect()
-        self._create_metadata_table()
+        self._ensure_schema()
+        self._prepare_statements()
+        
+        if shutdown_handler is not None:
+            shutdown_handler.register_cleanup(self.close)
+            shutdown_handler.register_cleanup(self.shutdown_pool)
     
     def _connect(self) -> None:
-        """Connect to warehouse database."""
+        """Take a warehouse connection from the shared pool."""
         try:
-            self.connection = psycopg2.connect(
-                host=os.getenv('WAREHOUSE_DB_HOST', 'localhost'),
-                port=os.getenv('WAREHOUSE_DB_PORT', '5433'),
-                database=os.getenv('WAREHOUSE_DB_NAME', 'warehouse_db'),
-                user=os.getenv('WAREHOUSE_DB_USER', 'postgres'),
-                password=os.getenv('WAREHOUSE_DB_PASSWORD', 'postgres')
-            )
-            self.connection.autocommit = False
-            logger.info("Successfully connected to warehouse_db for metadata management")
+            self.connection = acquire_connection('warehouse')
+            # Encode and decode performance_metrics with the shared (orjson
+            # when installed) JSON helpers
+            register_default_jsonb(self.connection, loads=loads)
+            logger.info("Acquired pooled warehouse_db connection for metadata management")
         except psycopg2.OperationalError as e:
             logger.error(f"Failed to connect to warehouse for metadata: {e}")
             raise
     
+    def _ensure_schema(self) -> None:
+        """Create the metadata table on first use in this process if it is missing."""
+        global _SCHEMA_READY
+        if _SCHEMA_READY:
+            return
+        
+        with _SCHEMA_LOCK:
+            if _SCHEMA_READY:
+                return
+            
+            try:
+                with self.connection.cursor() as cursor:
+                    cursor.execute("SELECT to_regclass('pipeline_metadata')")
+                    exists = cursor.fetchone()[0] is not None
+                self.connection.commit()
+            except psycopg2.Error as e:
+                self.connection.rollback()
+                logger.error(f"Failed to check for pipeline_metadata table: {e}")
+                raise
+            
+            if not exists:
+                self._create_metadata_table()
+            else:
+                self._migrate_status_check()
+            _SCHEMA_READY = True
+    
+    def _migrate_status_check(self) -> None:
+        """Allow every RUN_STATUSES value on an existing pipeline_metadata table."""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(STATUS_CHECK_MIGRATION)
+            self.connection.commit()
+        except psycopg2.Error as e:
+            self.connection.rollback()
+            logger.error(f"Failed to migrate pipeline_metadata status check: {e}")
+            raise
+    
+    def _prepare_statements(self) -> None:
+        """Prepare the metadata statements on this connection if not done yet."""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT name FROM pg_prepared_statements WHERE name = ANY(%s)",
+                    (list(PREPARED_STATEMENTS),)
+                )
+                prepared = {row[0] for row in cursor}
+                for name, statement in PREPARED_STATEMENTS.items():
+                    if name not in prepared:
+                        cursor.execute(statement)
+            self.connection.commit()
+        except psycopg2.Error as e:
+            self.connection.rollback()
+            logger.error(f"Failed to prepare pipeline metadata statements: {e}")
+            raise
+    
     def _create_metadata_table(self) -> None:
         """Create the pipeline_metadata table if it doesn't exist."""
         try:
             with self.connection.cursor() as cursor:
-                cursor.execute(sql.SQL("""
+                cursor.execute("""
                     CREATE TABLE IF NOT EXISTS pipeline_metadata (
                         id BIGSERIAL PRIMARY KEY,
                         pipeline_name VARCHAR(100) NOT NULL,
                         run_id VARCHAR(100) NOT NULL,
                         start_time TIMESTAMP NOT NULL,
                         end_time TIMESTAMP,
-                        status VARCHAR(20) NOT NULL DEFAULT 'running',
+                        status VARCHAR(30) NOT NULL DEFAULT 'running',
                         records_processed INTEGER DEFAULT 0,
                         records_successful INTEGER DEFAULT 0,
                         records_failed INTEGER DEFAULT 0,
@@ -80,7 +243,7 @@ class PipelineMetadataManager:
                         
                         -- Indexes for performance
                         CONSTRAINT pipeline_metadata_status_check 
-                            CHECK (status IN ('running', 'completed', 'failed', 'cancelled'))
+                            CHECK (status IN ('running', 'completed', 'completed_with_errors', 'failed', 'cancelled'))
                     );
                     
                     -- Create indexes
@@ -97,9 +260,9 @@ class PipelineMetadataManager:
                     COMMENT ON TABLE pipeline_metadata IS 'Pipeline execution metadata and metrics';
                     COMMENT ON COLUMN pipeline_metadata.pipeline_name IS 'Name of the pipeline (e.g., scd2_loader, cdc_extractor)';
                     COMMENT ON COLUMN pipeline_metadata.run_id IS 'Unique identifier for this pipeline run';
-                    COMMENT ON COLUMN pipeline_metadata.status IS 'Current status: running, completed, failed, cancelled';
+                    COMMENT ON COLUMN pipeline_metadata.status IS 'Current status: running, completed, completed_with_errors, failed, cancelled';
                     COMMENT ON COLUMN pipeline_metadata.performance_metrics IS 'JSON with timing, memory, and other metrics';
-                """))
+                """)
                 
                 self.connection.commit()
                 logger.info("Created/verified pipeline_metadata table")
@@ -131,23 +294,18 @@ class PipelineMetadataManager:
         
         try:
             with self.connection.cursor() as cursor:
-                cursor.execute(sql.SQL("""
-                    INSERT INTO pipeline_metadata (
-                        pipeline_name, run_id, start_time, status, performance_metrics
-                    ) VALUES (%s, %s, %s, %s, %s)
-                    RETURNING id
-                """), (
+                cursor.execute("EXECUTE pm_start (%s, %s, %s, %s, %s)", (
                     pipeline_name,
                     run_id,
                     datetime.now(timezone.utc),
                     'running',
-                    json.dumps(performance_metrics or {}) if performance_metrics else None
+                    Json(performance_metrics, dumps=dumps) if performance_metrics else None
                 ))
                 
                 pipeline_id = cursor.fetchone()[0]
                 self.connection.commit()
                 
-                logger.info(f"Started pipeline run: {pipeline_name} (ID: {pipeline_id}, Run ID: {run_id})")
+                logger.info("Started pipeline run: %s (ID: %s, Run ID: %s)", pipeline_name, pipeline_id, run_id)
                 return pipeline_id
                 
         except psycopg2.Error as e:
@@ -177,79 +335,55 @@ class PipelineMetadataManager:
             error_message: Error message if failed
             performance_metrics: Additional performance metrics
             
+        Updates are buffered and committed in batches of METADATA_BATCH_SIZE
+        or every METADATA_FLUSH_SECONDS; updates to any status other than
+        'running' end the run and are committed immediately.
+        
         Returns:
-            True if successful, False otherwise
+            True if the update was buffered or committed, False otherwise
+        """
+        self._pending.append((
+            status,
+            records_processed,
+            records_successful,
+            records_failed,
+            error_message,
+            Json(performance_metrics, dumps=dumps) if performance_metrics is not None else None,
+            datetime.now(timezone.utc),
+            pipeline_id
+        ))
+        
+        if ((status is not None and status != 'running')
+                or len(self._pending) >= METADATA_BATCH_SIZE
+                or time.monotonic() - self._last_flush > METADATA_FLUSH_SECONDS):
+            return self.flush()
+        
+        logger.debug("Buffered update for pipeline run %s (status: %s)", pipeline_id, status)
+        return True
+    
+    def flush(self) -> bool:
         """
+        Commit all buffered pipeline run updates in one transaction.
+        
+        Returns:
+            True if successful (or nothing was pending), False otherwise
+        """
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return True
+        
+        pending, self._pending = self._pending, []
         try:
             with self.connection.cursor() as cursor:
-                # Build dynamic update query
-                updates = []
-                params = []
-                param_count = 1
-                
-                if status is not None:
-                    updates.append(f"status = ${param_count}")
-                    params.append(status)
-                    param_count += 1
-                
-                if records_processed is not None:
-                    updates.append(f"records_processed = ${param_count}")
-                    params.append(records_processed)
-                    param_count += 1
-                
-                if records_successful is not None:
-                    updates.append(f"records_successful = ${param_count}")
-                    params.append(records_successful)
-                    param_count += 1
-                
-                if records_failed is not None:
-                    updates.append(f"records_failed = ${param_count}")
-                    params.append(records_failed)
-                    param_count += 1
-                
-                if error_message is not None:
-                    updates.append(f"error_message = ${param_count}")
-                    params.append(error_message)
-                    param_count += 1
-                
-                if performance_metrics is not None:
-                    updates.append(f"performance_metrics = ${param_count}")
-                    params.append(performance_metrics)
-                    param_count += 1
-                
-                # Always update the updated_at timestamp
-                updates.append(f"updated_at = ${param_count}")
-                params.append(datetime.now(timezone.utc))
-                param_count += 1
-                
-                # Set end_time if status is completed/failed/cancelled
-                if status in ['completed', 'failed', 'cancelled']:
-                    updates.append(f"end_time = ${param_count}")
-                    params.append(datetime.now(timezone.utc))
-                    param_count += 1
-                
-                # Add pipeline_id to params
-                params.append(pipeline_id)
-                
-                if updates:
-                    query = f"""
-                        UPDATE pipeline_metadata 
-                        SET {', '.join(updates)}
-                        WHERE id = ${param_count}
-                    """
-                    
-                    cursor.execute(query, params)
-                    self.connection.commit()
-                    
-                    logger.debug(f"Updated pipeline run {pipeline_id}: {', '.join(updates)}")
-                    return True
-                else:
-                    logger.warning(f"No updates provided for pipeline run {pipeline_id}")
-                    return False
+                cursor.executemany("EXECUTE pm_update (%s, %s, %s, %s, %s, %s, %s, %s)", pending)
+            self.connection.commit()
+            
+            logger.debug("Committed %d pipeline run updates", len(pending))
+            return True
                     
         except psycopg2.Error as e:
             self.connection.rollback()
-            logger.error(f"Failed to update pipeline run {pipeline_id}: {e}")
+            logger.error(f"Failed to update pipeline runs {sorted({p[-1] for p in pending})}: {e}")
             return False
     
     def get_last_run_info(self, pipeline_name: str) -> Optional[Dict[str, Any]]:
@@ -262,24 +396,13 @@ class PipelineMetadataManager:
         Returns:
             Dictionary with last run info or None if no runs found
         """
+        self.flush()
         try:
             with self.connection.cursor() as cursor:
-                cursor.execute(sql.SQL("""
-                    SELECT id, run_id, start_time, end_time, status,
-                           records_processed, records_successful, records_failed,
-                           error_message, performance_metrics, created_at, updated_at
-                    FROM pipeline_metadata 
-                    WHERE pipeline_name = %s
-                    ORDER BY start_time DESC
-                    LIMIT 1
-                """), (pipeline_name,))
+                cursor.execute("EXECUTE pm_last (%s)", (pipeline_name,))
                 
                 result = cursor.fetchone()
-                if result:
-                    columns = [desc[0] for desc in cursor.description]
-                    return dict(zip(columns, result))
-                else:
-                    return None
+                return dict(zip(LAST_RUN_COLUMNS, result)) if result else None
                     
         except psycopg2.Error as e:
             logger.error(f"Failed to get last run info for {pipeline_name}: {e}")
@@ -296,37 +419,28 @@ class PipelineMetadataManager:
         Returns:
             Dictionary with pipeline statistics
         """
+        self.flush()
         try:
             with self.connection.cursor() as cursor:
-                cursor.execute(sql.SQL("""
-                    SELECT 
-                        COUNT(*) as total_runs,
-                        COUNT(CASE WHEN status = 'completed' THEN 1 END) as successful_runs,
-                        COUNT(CASE WHEN status = 'failed' THEN 1 END) as failed_runs,
-                        AVG(CASE WHEN end_time IS NOT NULL THEN 
-                            EXTRACT(EPOCH FROM (end_time - start_time)) END) as avg_duration_seconds,
-                        SUM(records_processed) as total_records_processed,
-                        SUM(records_successful) as total_records_successful,
-                        SUM(records_failed) as total_records_failed,
-                        MAX(start_time) as last_run_time
-                    FROM pipeline_metadata 
-                    WHERE pipeline_name = %s 
-                        AND start_time >= CURRENT_TIMESTAMP - INTERVAL '%s days'
-                """), (pipeline_name, days))
+                cursor.execute("EXECUTE pm_stats (%s, %s)", (pipeline_name, int(days)))
                 
                 result = cursor.fetchone()
-                if result:
-                    columns = [desc[0] for desc in cursor.description]
-                    return dict(zip(columns, result))
-                else:
-                    return {}
+                return dict(zip(STATS_COLUMNS, result)) if result else {}
                     
         except psycopg2.Error as e:
             logger.error(f"Failed to get pipeline stats for {pipeline_name}: {e}")
             return {}
     
     def close(self) -> None:
-        """Close database connection."""
+        """Commit buffered updates and return the database connection to the shared pool."""
         if self.connection:
-            self.connection.close()
-            logger.info("Pipeline metadata database connection closed")
+            self.flush()
+            release_connection(self.connection, 'warehouse')
+            self.connection = None
+            logger.info("Pipeline metadata database connection released")
+    
+    @classmethod
+    def shutdown_pool(cls) -> None:
+        """Close the shared connection pools."""
+        close_pools()
+        logger.info("Closed shared database connection pools")
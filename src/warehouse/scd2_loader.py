@@ -8,23 +8,27 @@ Ensures idempotent operations with proper record expiration.
 """
 
 import os
+import io
 import sys
-import json
-import logging
+import csv
+import threading
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional, Set
+from typing import List, Dict, Any, Optional, Set, Tuple, Iterable, Iterator
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import hashlib
+from array import array
 
 import psycopg2
-from psycopg2 import sql
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
 
 # Add src to path for imports
 sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.utils.db_pool import acquire_connection, connection_kwargs, free_connections, release_connection
 from src.utils.logging_config import setup_logging
 from src.utils.signal_handler import GracefulShutdownHandler, DatabaseConnectionManager
+from src.utils.json_io import is_batch_file, iter_batch_changes
 
 # Load environment variables
 load_dotenv()
@@ -32,22 +36,327 @@ load_dotenv()
 # Logger will be set up in main() after imports are resolved
 logger = None
 
+# Batches with at least this many orders are staged with COPY, smaller
+# ones with multi-row INSERTs
+COPY_THRESHOLD = int(os.getenv('SCD2_COPY_THRESHOLD', '5000'))
+
+# Commit batch transactions without waiting for the WAL flush; a crash can
+# lose the last few batches, which are reapplied from the batch files
+ASYNC_COMMIT = os.getenv('SCD2_ASYNC_COMMIT', 'true').lower() == 'true'
+
+# Batch files applied concurrently on pooled connections; 1 keeps loading
+# sequential on the loader's own connection
+LOAD_WORKERS = int(os.getenv('SCD2_LOAD_WORKERS', '1'))
+
+# Rows per multi-row INSERT statement; matches COPY_THRESHOLD so a batch
+# below the COPY threshold is staged in a single statement
+STAGE_PAGE_SIZE = COPY_THRESHOLD
+
+# dim_orders_history with its indexes and the stats row, created if missing
+CREATE_HISTORY_SQL = """
+    CREATE TABLE IF NOT EXISTS dim_orders_history (
+        surrogate_key BIGSERIAL PRIMARY KEY,
+        order_key INTEGER NOT NULL,
+        customer_id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL,
+        quantity INTEGER NOT NULL,
+        unit_price DECIMAL(10,2) NOT NULL,
+        total_amount DECIMAL(10,2) NOT NULL,
+        order_status VARCHAR(50) NOT NULL,
+        order_date TIMESTAMP NOT NULL,
+        valid_from TIMESTAMP NOT NULL,
+        valid_to TIMESTAMP,
+        is_current BOOLEAN DEFAULT TRUE,
+        cdc_operation VARCHAR(10) NOT NULL,
+        cdc_timestamp TIMESTAMP NOT NULL,
+        batch_id VARCHAR(64),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+        -- Constraints for data integrity
+        CONSTRAINT dim_orders_history_valid_time_check
+            CHECK (valid_to IS NULL OR valid_to > valid_from),
+        CONSTRAINT dim_orders_history_current_check
+            CHECK (is_current = TRUE OR valid_to IS NOT NULL)
+    );
+
+    -- At most one current version per order; only current rows are indexed
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_dim_orders_history_current
+        ON dim_orders_history(order_key) WHERE is_current;
+
+    -- Replaced by ux_dim_orders_history_current on existing tables
+    ALTER TABLE dim_orders_history
+        DROP CONSTRAINT IF EXISTS dim_orders_history_current_unique;
+    DROP INDEX IF EXISTS idx_dim_orders_history_is_current;
+
+    -- Create indexes for optimal performance
+    CREATE INDEX IF NOT EXISTS idx_dim_orders_history_order_key
+        ON dim_orders_history(order_key);
+    CREATE INDEX IF NOT EXISTS idx_dim_orders_history_valid_from
+        ON dim_orders_history(valid_from);
+    CREATE INDEX IF NOT EXISTS idx_dim_orders_history_valid_to
+        ON dim_orders_history(valid_to);
+    CREATE INDEX IF NOT EXISTS idx_dim_orders_history_cdc_timestamp
+        ON dim_orders_history(cdc_timestamp);
+    CREATE INDEX IF NOT EXISTS idx_dim_orders_history_batch_id
+        ON dim_orders_history(batch_id);
+
+    -- Add comments for documentation
+    COMMENT ON TABLE dim_orders_history IS 'SCD Type 2 dimension table for orders history';
+    COMMENT ON COLUMN dim_orders_history.surrogate_key IS 'Surrogate key for each version';
+    COMMENT ON COLUMN dim_orders_history.order_key IS 'Natural key from source system';
+    COMMENT ON COLUMN dim_orders_history.valid_from IS 'Start of validity period';
+    COMMENT ON COLUMN dim_orders_history.valid_to IS 'End of validity period (NULL for current)';
+    COMMENT ON COLUMN dim_orders_history.is_current IS 'Flag indicating current record';
+    COMMENT ON COLUMN dim_orders_history.cdc_operation IS 'CDC operation: INSERT/UPDATE/DELETE';
+    COMMENT ON COLUMN dim_orders_history.batch_id IS 'Unique identifier for processing batch';
+
+    -- Single-row summary; the loader folds its per-batch deltas into it
+    CREATE TABLE IF NOT EXISTS dim_orders_history_stats (
+        id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+        total_records BIGINT NOT NULL,
+        current_records BIGINT NOT NULL,
+        historical_records BIGINT NOT NULL,
+        unique_orders BIGINT NOT NULL,
+        earliest_record TIMESTAMP,
+        latest_record TIMESTAMP
+    );
+
+    -- Seed it from the existing history on first use
+    INSERT INTO dim_orders_history_stats (
+        total_records, current_records, historical_records,
+        unique_orders, earliest_record, latest_record
+    )
+    SELECT
+        COUNT(*),
+        COUNT(CASE WHEN is_current = TRUE THEN 1 END),
+        COUNT(CASE WHEN is_current = FALSE THEN 1 END),
+        COUNT(DISTINCT order_key),
+        MIN(valid_from),
+        MAX(valid_from)
+    FROM dim_orders_history
+    WHERE NOT EXISTS (SELECT 1 FROM dim_orders_history_stats)
+    ON CONFLICT (id) DO NOTHING;
+
+    -- Per-batch changes to the summary, written by APPLY_STAGED_SQL. Batch
+    -- transactions only insert here, so concurrent loads never wait on the
+    -- summary row; SUMMARY_SQL folds the deltas into it.
+    CREATE TABLE IF NOT EXISTS dim_orders_history_stats_delta (
+        total_records BIGINT NOT NULL,
+        current_records BIGINT NOT NULL,
+        historical_records BIGINT NOT NULL,
+        unique_orders BIGINT NOT NULL,
+        earliest_record TIMESTAMP,
+        latest_record TIMESTAMP
+    );
+"""
+
+# Folds the pending deltas into the summary row and reads it back. Runs once
+# per load, after the batch transactions have committed.
+SUMMARY_SQL = """
+    WITH folded AS (
+        DELETE FROM dim_orders_history_stats_delta
+        RETURNING *
+    ),
+    delta AS (
+        SELECT
+            COALESCE(sum(total_records), 0) AS total_records,
+            COALESCE(sum(current_records), 0) AS current_records,
+            COALESCE(sum(historical_records), 0) AS historical_records,
+            COALESCE(sum(unique_orders), 0) AS unique_orders,
+            min(earliest_record) AS earliest_record,
+            max(latest_record) AS latest_record
+        FROM folded
+    )
+    UPDATE dim_orders_history_stats AS s
+    SET total_records = s.total_records + d.total_records,
+        current_records = s.current_records + d.current_records,
+        historical_records = s.historical_records + d.historical_records,
+        unique_orders = s.unique_orders + d.unique_orders,
+        earliest_record = LEAST(s.earliest_record, d.earliest_record),
+        latest_record = GREATEST(s.latest_record, d.latest_record)
+    FROM delta AS d
+    RETURNING s.total_records, s.current_records, s.historical_records,
+              s.unique_orders, s.earliest_record, s.latest_record
+"""
+
+# Non-unique indexes dropped while bulk mode loads and rebuilt afterwards.
+# The order_key index and the current-version unique index are kept because
+# the apply statement looks orders up through them.
+BULK_MODE_INDEXES = {
+    'idx_dim_orders_history_valid_from': 'dim_orders_history(valid_from)',
+    'idx_dim_orders_history_valid_to': 'dim_orders_history(valid_to)',
+    'idx_dim_orders_history_cdc_timestamp': 'dim_orders_history(cdc_timestamp)',
+    'idx_dim_orders_history_batch_id': 'dim_orders_history(batch_id)',
+}
+
+# Memory for rebuilding indexes after a bulk load
+BULK_MAINTENANCE_WORK_MEM = os.getenv('SCD2_BULK_MAINTENANCE_WORK_MEM', '1GB')
+
+# Columns of the stage table, one row per order (latest change) of the
+# batch being applied
+STAGE_COLUMNS = (
+    'order_key', 'customer_id', 'product_id', 'quantity',
+    'unit_price', 'total_amount', 'order_status', 'order_date',
+    'cdc_operation', 'cdc_timestamp'
+)
+
+# Stage column types match dim_orders_history, so text values from the batch
+# files are converted once on staging and the apply statement compares
+# prices as numeric and dates as timestamp, never as floats or strings
+STAGE_TYPES = (
+    'integer', 'integer', 'integer', 'integer',
+    'numeric(10,2)', 'numeric(10,2)', 'varchar(50)', 'timestamp',
+    'varchar(10)', 'timestamp'
+)
+
+# Change record keys for STAGE_COLUMNS; DELETE records may only carry the
+# id, operation and timestamp
+CHANGE_KEYS = (
+    'id', 'customer_id', 'product_id', 'quantity',
+    'unit_price', 'total_amount', 'order_status', 'order_date',
+    'operation_type', 'cdc_timestamp'
+)
+
+# Order keys are hashed into this many advisory lock buckets. Advisory
+# locks live in the shared lock table (max_locks_per_transaction x
+# max_connections entries), so a batch holds at most this many of them
+# however many orders it touches.
+ORDER_LOCK_BUCKETS = int(os.getenv('SCD2_ORDER_LOCK_BUCKETS', '16'))
+
+# Takes a transaction-scoped advisory lock per order_key bucket of a batch,
+# so concurrent loaders touching the same orders queue up instead of
+# deadlocking on the join order of the expire UPDATE. Unlike row locks these
+# also cover orders with no current version yet and need no heap access.
+# Buckets are locked in ascending order, so two batches never wait on each
+# other in opposite orders. The first key namespaces the locks to this table.
+LOCK_ORDERS_SQL = """
+    SELECT pg_advisory_xact_lock(hashtext('dim_orders_history'), bucket)
+    FROM (
+        SELECT DISTINCT abs(mod(order_key, {buckets})) AS bucket
+        FROM unnest(%s::integer[]) AS order_key
+        ORDER BY bucket
+    ) AS buckets
+""".format(buckets=ORDER_LOCK_BUCKETS)
+
+# Applies the staged changes in a single statement: expires the current
+# version of every staged order that was deleted or whose tracked
+# attributes changed (a repeated INSERT of the current version is left
+# alone), then inserts a new current version for every staged
+# INSERT/UPDATE that was just expired or has no current version. Both
+# sub-statements see the pre-statement snapshot, so expired orders are
+# matched through the "expired" CTE, and inserted orders with no earlier row
+# are new orders. The same statement records the counts as a
+# dim_orders_history_stats_delta row. Returns the expired and inserted
+# counts.
+# MERGE is not used: it takes at most one action per source row, so a
+# changed order could be expired or given its new version, not both.
+APPLY_STAGED_SQL = """
+    WITH expired AS (
+        UPDATE dim_orders_history AS d
+        SET valid_to = s.cdc_timestamp, is_current = FALSE, updated_at = CURRENT_TIMESTAMP
+        FROM stage_changes AS s
+        WHERE d.order_key = s.order_key
+          AND d.is_current = TRUE
+          AND (
+              s.cdc_operation = 'DELETE'
+              OR (
+                  NOT (s.cdc_operation = 'INSERT' AND d.cdc_operation = 'INSERT'
+                       AND d.cdc_timestamp = s.cdc_timestamp)
+                  AND (d.customer_id, d.product_id, d.quantity, d.unit_price, d.order_status, d.order_date)
+                      IS DISTINCT FROM
+                      (s.customer_id, s.product_id, s.quantity, s.unit_price, s.order_status, s.order_date)
+              )
+          )
+        RETURNING d.order_key
+    ),
+    inserted AS (
+        INSERT INTO dim_orders_history (
+            order_key, customer_id, product_id, quantity,
+            unit_price, total_amount, order_status, order_date,
+            valid_from, cdc_operation, cdc_timestamp, batch_id
+        )
+        SELECT s.order_key, s.customer_id, s.product_id, s.quantity,
+               s.unit_price, s.total_amount, s.order_status, s.order_date,
+               s.cdc_timestamp, s.cdc_operation, s.cdc_timestamp, %s
+        FROM stage_changes AS s
+        WHERE s.cdc_operation IN ('INSERT', 'UPDATE')
+          AND (
+              s.order_key IN (SELECT order_key FROM expired)
+              OR NOT EXISTS (
+                  SELECT 1 FROM dim_orders_history AS d
+                  WHERE d.order_key = s.order_key AND d.is_current = TRUE
+              )
+          )
+        RETURNING order_key, valid_from
+    ),
+    counts AS (
+        SELECT
+            (SELECT count(*) FROM expired) AS expired,
+            (SELECT count(*) FROM inserted) AS inserted,
+            (SELECT count(*) FROM inserted AS i
+             WHERE NOT EXISTS (
+                 SELECT 1 FROM dim_orders_history AS d WHERE d.order_key = i.order_key
+             )) AS new_orders,
+            (SELECT min(valid_from) FROM inserted) AS earliest,
+            (SELECT max(valid_from) FROM inserted) AS latest
+    ),
+    stats AS (
+        INSERT INTO dim_orders_history_stats_delta (
+            total_records, current_records, historical_records,
+            unique_orders, earliest_record, latest_record
+        )
+        SELECT inserted, inserted - expired, expired, new_orders, earliest, latest
+        FROM counts
+        WHERE inserted > 0 OR expired > 0
+    )
+    SELECT expired, inserted FROM counts
+"""
+
+# Session-scoped stage table, created once per connection. Its rows are
+# removed at every commit, so each batch transaction starts with it empty.
+CREATE_STAGE_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS stage_changes ({columns}) ON COMMIT DELETE ROWS
+""".format(columns=', '.join(f'{c} {t}' for c, t in zip(STAGE_COLUMNS, STAGE_TYPES)))
+
+# APPLY_STAGED_SQL prepared once per connection, taking the batch ID
+APPLY_STAGED_STATEMENT = 'scd2_apply_staged'
+APPLY_STAGED_PREPARE = "PREPARE {name} (varchar) AS {body}".format(
+    name=APPLY_STAGED_STATEMENT,
+    body=APPLY_STAGED_SQL.replace('%s', '$1')
+)
+APPLY_STAGED_EXECUTE = f"EXECUTE {APPLY_STAGED_STATEMENT} (%s)"
+
 class SCD2Loader:
     """
     Implements SCD Type 2 loading logic for warehouse dimensions.
     Provides idempotent operations with proper record expiration.
     """
     
-    def __init__(self):
-        """Initialize warehouse connection and prepare schema."""
+    def __init__(self, bulk_mode: Optional[bool] = None, connection=None):
+        """
+        Initialize warehouse connection and prepare schema.
+        
+        Args:
+            bulk_mode: Drop non-unique indexes while loading and rebuild them
+                afterwards. Defaults to the SCD2_BULK_MODE env variable.
+            connection: Open warehouse connection to load with instead of
+                connecting; it stays owned by the caller and is not closed
+                on shutdown
+        """
         global logger
         if logger is None:
-            import os
             logger = setup_logging(__name__, log_level=os.getenv('LOG_LEVEL', 'INFO'))
         
-        self.warehouse_connection = None
+        if bulk_mode is None:
+            bulk_mode = os.getenv('SCD2_BULK_MODE', 'false').lower() == 'true'
+        self.bulk_mode = bulk_mode
+        self.warehouse_connection = connection
         self.cdc_logs_dir = Path("data/cdc_logs")
         self.processed_log = Path("data/cdc_logs/.processed_files")
+        self._processed_set: Set[Tuple[str, str]] = set()
+        self._pending_processed: List[str] = []
+        self._processed_lock = threading.Lock()
         
         # Initialize graceful shutdown
         self.shutdown_handler = GracefulShutdownHandler(__name__)
@@ -55,11 +364,13 @@ class SCD2Loader:
         
         # Initialize pipeline metadata
         from src.warehouse.pipeline_metadata import PipelineMetadataManager
-        self.metadata_manager = PipelineMetadataManager()
+        self.metadata_manager = PipelineMetadataManager(self.shutdown_handler)
         
         self._ensure_directories()
-        self._connect()
+        if self.warehouse_connection is None:
+            self._connect()
         self._create_dim_orders_history()
+        self._prepare_session()
         self.shutdown_handler.start_listening()
         
     def _ensure_directories(self) -> None:
@@ -73,13 +384,7 @@ class SCD2Loader:
         
         for attempt in range(max_retries):
             try:
-                self.warehouse_connection = psycopg2.connect(
-                    host=os.getenv('WAREHOUSE_DB_HOST', 'localhost'),
-                    port=os.getenv('WAREHOUSE_DB_PORT', '5433'),
-                    database=os.getenv('WAREHOUSE_DB_NAME', 'warehouse_db'),
-                    user=os.getenv('WAREHOUSE_DB_USER', 'postgres'),
-                    password=os.getenv('WAREHOUSE_DB_PASSWORD', 'postgres')
-                )
+                self.warehouse_connection = psycopg2.connect(**connection_kwargs('warehouse'))
                 self.warehouse_connection.autocommit = False
                 self.conn_manager.add_connection(self.warehouse_connection)
                 logger.info("Successfully connected to warehouse_db")
@@ -99,60 +404,7 @@ class SCD2Loader:
         """
         try:
             with self.warehouse_connection.cursor() as cursor:
-                cursor.execute(sql.SQL("""
-                    CREATE TABLE IF NOT EXISTS dim_orders_history (
-                        surrogate_key BIGSERIAL PRIMARY KEY,
-                        order_key INTEGER NOT NULL,
-                        customer_id INTEGER NOT NULL,
-                        product_id INTEGER NOT NULL,
-                        quantity INTEGER NOT NULL,
-                        unit_price DECIMAL(10,2) NOT NULL,
-                        total_amount DECIMAL(10,2) NOT NULL,
-                        order_status VARCHAR(50) NOT NULL,
-                        order_date TIMESTAMP NOT NULL,
-                        valid_from TIMESTAMP NOT NULL,
-                        valid_to TIMESTAMP,
-                        is_current BOOLEAN DEFAULT TRUE,
-                        cdc_operation VARCHAR(10) NOT NULL,
-                        cdc_timestamp TIMESTAMP NOT NULL,
-                        batch_id VARCHAR(64),
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        
-                        -- Constraints for data integrity
-                        CONSTRAINT dim_orders_history_current_unique 
-                            UNIQUE (order_key, is_current) 
-                            DEFERRABLE INITIALLY DEFERRED,
-                        CONSTRAINT dim_orders_history_valid_time_check 
-                            CHECK (valid_to IS NULL OR valid_to > valid_from),
-                        CONSTRAINT dim_orders_history_current_check 
-                            CHECK (is_current = TRUE OR valid_to IS NOT NULL)
-                    );
-                    
-                    -- Create indexes for optimal performance
-                    CREATE INDEX IF NOT EXISTS idx_dim_orders_history_order_key 
-                        ON dim_orders_history(order_key);
-                    CREATE INDEX IF NOT EXISTS idx_dim_orders_history_is_current 
-                        ON dim_orders_history(is_current);
-                    CREATE INDEX IF NOT EXISTS idx_dim_orders_history_valid_from 
-                        ON dim_orders_history(valid_from);
-                    CREATE INDEX IF NOT EXISTS idx_dim_orders_history_valid_to 
-                        ON dim_orders_history(valid_to);
-                    CREATE INDEX IF NOT EXISTS idx_dim_orders_history_cdc_timestamp 
-                        ON dim_orders_history(cdc_timestamp);
-                    CREATE INDEX IF NOT EXISTS idx_dim_orders_history_batch_id 
-                        ON dim_orders_history(batch_id);
-                    
-                    -- Add comments for documentation
-                    COMMENT ON TABLE dim_orders_history IS 'SCD Type 2 dimension table for orders history';
-                    COMMENT ON COLUMN dim_orders_history.surrogate_key IS 'Surrogate key for each version';
-                    COMMENT ON COLUMN dim_orders_history.order_key IS 'Natural key from source system';
-                    COMMENT ON COLUMN dim_orders_history.valid_from IS 'Start of validity period';
-                    COMMENT ON COLUMN dim_orders_history.valid_to IS 'End of validity period (NULL for current)';
-                    COMMENT ON COLUMN dim_orders_history.is_current IS 'Flag indicating current record';
-                    COMMENT ON COLUMN dim_orders_history.cdc_operation IS 'CDC operation: INSERT/UPDATE/DELETE';
-                    COMMENT ON COLUMN dim_orders_history.batch_id IS 'Unique identifier for processing batch';
-                """))
+                cursor.execute(CREATE_HISTORY_SQL)
                 
                 self.warehouse_connection.commit()
                 logger.info("Created dim_orders_history table with indexes")
@@ -162,326 +414,204 @@ class SCD2Loader:
             logger.error(f"Failed to create dim_orders_history table: {e}")
             raise
     
-    def _get_processed_files(self) -> Set[str]:
-        """Get set of already processed CDC log files."""
+    def _drop_bulk_mode_indexes(self) -> None:
+        """Drop indexes that only slow down a bulk load."""
+        try:
+            with self.warehouse_connection.cursor() as cursor:
+                cursor.execute(f"DROP INDEX IF EXISTS {', '.join(BULK_MODE_INDEXES)}")
+            self.warehouse_connection.commit()
+            logger.info(f"Bulk mode: dropped indexes {', '.join(BULK_MODE_INDEXES)}")
+        except psycopg2.Error as e:
+            self.warehouse_connection.rollback()
+            logger.error(f"Failed to drop indexes for bulk mode: {e}")
+            raise
+    
+    def _rebuild_bulk_mode_indexes(self) -> None:
+        """
+        Recreate the indexes dropped for bulk mode.
+        
+        dim_orders_history is not partitioned, so the indexes are built
+        CONCURRENTLY and writers are not blocked while they build.
+        """
+        connection = self.warehouse_connection
+        connection.rollback()
+        connection.autocommit = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SET maintenance_work_mem = %s", (BULK_MAINTENANCE_WORK_MEM,))
+                for name, target in BULK_MODE_INDEXES.items():
+                    cursor.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {target}")
+                cursor.execute("RESET maintenance_work_mem")
+            logger.info(f"Bulk mode: rebuilt indexes {', '.join(BULK_MODE_INDEXES)}")
+        except psycopg2.Error as e:
+            logger.error(f"Failed to rebuild bulk mode indexes: {e}")
+            raise
+        finally:
+            connection.autocommit = False
+    
+    def _prepare_session(self, connection=None) -> None:
+        """Create the stage table and prepare the apply statement on a connection if not done yet."""
+        connection = connection or self.warehouse_connection
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(CREATE_STAGE_SQL)
+                cursor.execute(
+                    "SELECT 1 FROM pg_prepared_statements WHERE name = %s",
+                    (APPLY_STAGED_STATEMENT,)
+                )
+                if cursor.fetchone() is None:
+                    cursor.execute(APPLY_STAGED_PREPARE)
+            connection.commit()
+        except psycopg2.Error as e:
+            connection.rollback()
+            logger.error(f"Failed to prepare SCD2 statements: {e}")
+            raise
+    
+    def _get_processed_files(self) -> Set[Tuple[str, str]]:
+        """Get set of already processed (filename, batch ID) pairs."""
         if not self.processed_log.exists():
             return set()
         
         try:
             with open(self.processed_log, 'r') as f:
-                return set(line.strip() for line in f if line.strip())
+                return {
+                    tuple(line.strip().split('|', 1))
+                    for line in f if '|' in line
+                }
         except IOError:
             return set()
     
     def _mark_file_processed(self, filename: str, batch_id: str) -> None:
-        """Mark a CDC log file as processed with batch ID."""
-        try:
-            with open(self.processed_log, 'a') as f:
-                f.write(f"{filename}|{batch_id}\n")
-        except IOError as e:
-            logger.error(f"Failed to mark file as processed: {e}")
-    
-    def _generate_batch_id(self, changes: List[Dict[str, Any]]) -> str:
-        """Generate unique batch ID based on changes content."""
-        content = json.dumps(sorted([c['id'] for c in changes]), sort_keys=True)
-        return hashlib.md5(content.encode()).hexdigest()
-    
-    def _get_current_record(self, order_key: int) -> Optional[Dict[str, Any]]:
-        """Get current record for an order key."""
-        try:
-            with self.warehouse_connection.cursor(cursor_factory=RealDictCursor) as cursor:
-                cursor.execute(sql.SQL("""
-                    SELECT surrogate_key, order_key, customer_id, product_id, quantity,
-                           unit_price, total_amount, order_status, order_date,
-                           valid_from, valid_to, is_current, cdc_operation, cdc_timestamp
-                    FROM dim_orders_history 
-                    WHERE order_key = %s AND is_current = TRUE
-                    FOR UPDATE
-                """), (order_key,))
-                
-                result = cursor.fetchone()
-                return dict(result) if result else None
-                
-        except psycopg2.Error as e:
-            logger.error(f"Failed to get current record for order {order_key}: {e}")
-            return None
-    
-    def _expire_current_record(self, order_key: int, expire_timestamp: datetime) -> bool:
         """
-        Expire the current record for an order key.
+        Mark a CDC log file as processed with batch ID.
         
-        Args:
-            order_key: The order key to expire
-            expire_timestamp: Timestamp to set as valid_to
-            
-        Returns:
-            True if a record was expired, False if no current record found
+        The entry is buffered and written by _flush_processed_log.
         """
-        try:
-            with self.warehouse_connection.cursor() as cursor:
-                cursor.execute(sql.SQL("""
-                    UPDATE dim_orders_history 
-                    SET valid_to = %s, is_current = FALSE, updated_at = CURRENT_TIMESTAMP
-                    WHERE order_key = %s AND is_current = TRUE
-                    RETURNING surrogate_key
-                """), (expire_timestamp, order_key))
-                
-                result = cursor.fetchone()
-                if result:
-                    logger.debug(f"Expired record {result[0]} for order {order_key}")
-                    return True
-                else:
-                    logger.debug(f"No current record found to expire for order {order_key}")
-                    return False
-                    
-        except psycopg2.Error as e:
-            logger.error(f"Failed to expire current record for order {order_key}: {e}")
-            return False
+        with self._processed_lock:
+            self._processed_set.add((filename, batch_id))
+            self._pending_processed.append(f"{filename}|{batch_id}\n")
     
-    def _insert_new_record(self, change: Dict[str, Any], batch_id: str) -> Optional[int]:
-        """
-        Insert a new record for an order.
+    def _flush_processed_log(self) -> None:
+        """Append all buffered processed-file entries to the log in one write."""
+        if not self._pending_processed:
+            return
         
-        Args:
-            change: Change record from CDC log
-            batch_id: Unique batch identifier
-            
-        Returns:
-            Surrogate key of inserted record or None if failed
-        """
         try:
-            with self.warehouse_connection.cursor() as cursor:
-                cursor.execute(sql.SQL("""
-                    INSERT INTO dim_orders_history (
-                        order_key, customer_id, product_id, quantity,
-                        unit_price, total_amount, order_status, order_date,
-                        valid_from, cdc_operation, cdc_timestamp, batch_id
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                    )
-                    RETURNING surrogate_key
-                """), (
-                    change['id'],
-                    change['customer_id'],
-                    change['product_id'],
-                    change['quantity'],
-                    change['unit_price'],
-                    change['total_amount'],
-                    change['order_status'],
-                    change['order_date'],
-                    change['cdc_timestamp'],
-                    change['operation_type'],
-                    change['cdc_timestamp'],
-                    batch_id
-                ))
-                
-                surrogate_key = cursor.fetchone()[0]
-                logger.debug(f"Inserted new record {surrogate_key} for order {change['id']}")
-                return surrogate_key
-                
-        except psycopg2.Error as e:
-            logger.error(f"Failed to insert new record for order {change['id']}: {e}")
-            return None
+            with open(self.processed_log, 'a') as f:
+                f.writelines(self._pending_processed)
+            self._pending_processed.clear()
+        except IOError as e:
+            logger.error(f"Failed to mark files as processed: {e}")
+    
+    def _generate_batch_id(self, ids: Iterable[int]) -> str:
+        """Generate unique batch ID based on the order ids of a batch's changes."""
+        ids = array('q', sorted(ids))
+        return hashlib.blake2b(ids.tobytes(), digest_size=16).hexdigest()
     
-    def _process_insert_change(self, change: Dict[str, Any], batch_id: str) -> bool:
+    def _read_batch_file(self, batch_file: Path) -> Tuple[Dict[int, Dict[str, Any]], int, str]:
         """
-        Process an INSERT change using SCD Type 2 logic.
+        Read a batch file, keeping only the latest change for each order.
+        
+        Changes are consumed as they are parsed (streamed with ijson for
+        large files), so only one change per order is held in memory. Ties
+        on cdc_timestamp keep file order. cdc_timestamp values are ISO 8601
+        strings in one fixed UTC offset, so they order correctly as text and
+        are never parsed in Python; PostgreSQL parses them once when they
+        are staged into timestamp columns.
         
-        Args:
-            change: Change record from CDC log
-            batch_id: Unique batch identifier
-            
         Returns:
-            True if processed successfully, False otherwise
+            Latest change per order_key, number of change records and batch ID
         """
-        order_key = change['id']
-        cdc_timestamp = datetime.fromisoformat(change['cdc_timestamp'].replace('Z', '+00:00'))
+        latest_by_order: Dict[int, Dict[str, Any]] = {}
+        ids = array('q')
+        for change in iter_batch_changes(batch_file):
+            order_key = change['id']
+            ids.append(order_key)
+            latest = latest_by_order.get(order_key)
+            if latest is None or change['cdc_timestamp'] >= latest['cdc_timestamp']:
+                latest_by_order[order_key] = change
         
-        # Check if current record already exists (idempotency check)
-        current_record = self._get_current_record(order_key)
-        if current_record:
-            # Record already exists, check if this is a duplicate
-            if (current_record['cdc_timestamp'] == cdc_timestamp and 
-                current_record['cdc_operation'] == 'INSERT'):
-                logger.debug(f"Duplicate INSERT detected for order {order_key}, skipping")
-                return True
-            else:
-                # Treat as UPDATE since record already exists
-                logger.info(f"INSERT for existing order {order_key}, treating as UPDATE")
-                return self._process_update_change(change, batch_id)
-        
-        # Insert new record
-        surrogate_key = self._insert_new_record(change, batch_id)
-        if surrogate_key:
-            logger.info(f"Processed INSERT for order {order_key} (surrogate_key: {surrogate_key})")
-            return True
-        else:
-            return False
+        return latest_by_order, len(ids), self._generate_batch_id(ids)
+    
+    def _session_settings(self) -> str:
+        """Transaction-local settings sent ahead of each batch's statements."""
+        return "SET LOCAL synchronous_commit = off;" if ASYNC_COMMIT else ""
     
-    def _process_update_change(self, change: Dict[str, Any], batch_id: str) -> bool:
+    def _stage_changes(self, cursor, changes: Iterable[Dict[str, Any]]) -> None:
         """
-        Process an UPDATE change using SCD Type 2 logic.
+        Load one change per order into the session's stage table.
         
-        Args:
-            change: Change record from CDC log
-            batch_id: Unique batch identifier
-            
-        Returns:
-            True if processed successfully, False otherwise
+        Batches of COPY_THRESHOLD orders or more are streamed with
+        COPY ... FROM STDIN (CSV); smaller ones are sent as one multi-row
+        INSERT, which avoids building the CSV buffer.
         """
-        order_key = change['id']
-        cdc_timestamp = datetime.fromisoformat(change['cdc_timestamp'].replace('Z', '+00:00'))
-        
-        # Get current record
-        current_record = self._get_current_record(order_key)
-        if not current_record:
-            # No current record exists, treat as INSERT
-            logger.info(f"UPDATE for non-existent order {order_key}, treating as INSERT")
-            return self._process_insert_change(change, batch_id)
+        rows = [[change.get(key) for key in CHANGE_KEYS] for change in changes]
+        if len(rows) < COPY_THRESHOLD:
+            execute_values(
+                cursor,
+                f"INSERT INTO stage_changes ({', '.join(STAGE_COLUMNS)}) VALUES %s",
+                rows,
+                page_size=STAGE_PAGE_SIZE
+            )
+            return
         
-        # Check if data has actually changed
-        has_changes = (
-            current_record['customer_id'] != change['customer_id'] or
-            current_record['product_id'] != change['product_id'] or
-            current_record['quantity'] != change['quantity'] or
-            float(current_record['unit_price']) != float(change['unit_price']) or
-            current_record['order_status'] != change['order_status'] or
-            str(current_record['order_date']) != str(change['order_date'])
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor.copy_expert(
+            f"COPY stage_changes ({', '.join(STAGE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
         )
-        
-        if not has_changes:
-            logger.debug(f"No actual changes detected for order {order_key}, skipping")
-            return True
-        
-        # Perform expire and insert in a single transaction
-        try:
-            with self.warehouse_connection:
-                with self.warehouse_connection.cursor() as cursor:
-                    # Expire current record
-                    cursor.execute(sql.SQL("""
-                        UPDATE dim_orders_history 
-                        SET valid_to = %s, is_current = FALSE, updated_at = CURRENT_TIMESTAMP
-                        WHERE order_key = %s AND is_current = TRUE
-                        RETURNING surrogate_key
-                    """), (cdc_timestamp, order_key))
-                    
-                    expired_result = cursor.fetchone()
-                    if not expired_result:
-                        logger.warning(f"No current record found to expire for order {order_key}")
-                        return False
-                    
-                    logger.debug(f"Expired record {expired_result[0]} for order {order_key}")
-                    
-                    # Insert new record
-                    cursor.execute(sql.SQL("""
-                        INSERT INTO dim_orders_history (
-                            order_key, customer_id, product_id, quantity,
-                            unit_price, total_amount, order_status, order_date,
-                            valid_from, cdc_operation, cdc_timestamp, batch_id
-                        ) VALUES (
-                            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                        )
-                        RETURNING surrogate_key
-                    """), (
-                        change['id'],
-                        change['customer_id'],
-                        change['product_id'],
-                        change['quantity'],
-                        change['unit_price'],
-                        change['total_amount'],
-                        change['order_status'],
-                        change['order_date'],
-                        cdc_timestamp,
-                        change['operation_type'],
-                        cdc_timestamp,
-                        batch_id
-                    ))
-                    
-                    surrogate_key = cursor.fetchone()[0]
-                    logger.info(f"Processed UPDATE for order {order_key} (surrogate_key: {surrogate_key})")
-                    return True
-                    
-        except psycopg2.Error as e:
-            logger.error(f"Failed to process UPDATE for order {order_key}: {e}")
-            self.warehouse_connection.rollback()
-            return False
     
-    def _process_delete_change(self, change: Dict[str, Any], batch_id: str) -> bool:
+    def _apply_staged_changes(self, cursor, batch_id: str) -> Tuple[int, int]:
         """
-        Process a DELETE change using SCD Type 2 logic.
+        Apply the staged changes with SCD Type 2 logic.
+        
+        Current versions of deleted or changed orders are expired and new
+        versions are inserted for orders left without a current version, in
+        one round-trip of the statement prepared by _prepare_session.
         
-        Args:
-            change: Change record from CDC log
-            batch_id: Unique batch identifier
-            
         Returns:
-            True if processed successfully, False otherwise
+            Number of expired and inserted versions
         """
-        order_key = change['id']
-        cdc_timestamp = datetime.fromisoformat(change['cdc_timestamp'].replace('Z', '+00:00'))
-        
-        # Perform expire in a single transaction for consistency
-        try:
-            with self.warehouse_connection:
-                with self.warehouse_connection.cursor() as cursor:
-                    # Expire current record
-                    cursor.execute(sql.SQL("""
-                        UPDATE dim_orders_history 
-                        SET valid_to = %s, is_current = FALSE, updated_at = CURRENT_TIMESTAMP
-                        WHERE order_key = %s AND is_current = TRUE
-                        RETURNING surrogate_key
-                    """), (cdc_timestamp, order_key))
-                    
-                    expired_result = cursor.fetchone()
-                    if expired_result:
-                        logger.info(f"Processed DELETE for order {order_key}")
-                        return True
-                    else:
-                        logger.warning(f"No current record found to delete for order {order_key}")
-                        return True  # Consider this successful as the end state is correct
-                        
-        except psycopg2.Error as e:
-            logger.error(f"Failed to process DELETE for order {order_key}: {e}")
-            self.warehouse_connection.rollback()
-            return False
+        cursor.execute(APPLY_STAGED_EXECUTE, (batch_id,))
+        return cursor.fetchone()
     
-    def _process_change_record(self, change: Dict[str, Any], batch_id: str) -> bool:
+    def _read_batch_files(self, batch_files: List[Path]) -> Iterator[Tuple[Path, Optional[Tuple]]]:
         """
-        Process a single change record using appropriate SCD Type 2 logic.
+        Yield each batch file with the result of _read_batch_file.
         
-        Args:
-            change: Change record from CDC log
-            batch_id: Unique batch identifier
-            
-        Returns:
-            True if processed successfully, False otherwise
+        The next file is read and decoded on a background thread while the
+        caller applies the current one. A file that fails to read is
+        yielded with None so the caller reports the error.
         """
-        operation = change['operation_type']
+        if not batch_files:
+            return
         
-        try:
-            if operation == 'INSERT':
-                return self._process_insert_change(change, batch_id)
-            elif operation == 'UPDATE':
-                return self._process_update_change(change, batch_id)
-            elif operation == 'DELETE':
-                return self._process_delete_change(change, batch_id)
-            else:
-                logger.warning(f"Unknown operation type: {operation}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"Failed to process change record: {e}")
-            return False
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='scd2-reader') as reader:
+            future = reader.submit(self._read_batch_file, batch_files[0])
+            for index, batch_file in enumerate(batch_files):
+                current = future
+                if index + 1 < len(batch_files):
+                    future = reader.submit(self._read_batch_file, batch_files[index + 1])
+                try:
+                    yield batch_file, current.result()
+                except Exception:
+                    yield batch_file, None
     
-    def _process_batch_file(self, batch_file: Path) -> bool:
+    def _process_batch_file(self, batch_file: Path, batch: Optional[Tuple] = None,
+                            connection=None) -> Tuple[bool, int]:
         """
         Process a single CDC batch file.
         
         Args:
             batch_file: Path to the batch file
+            batch: Result of _read_batch_file; read from batch_file if None
+            connection: Connection to apply the file on; defaults to the loader's own
             
         Returns:
-            True if processed successfully, False otherwise
+            Whether the file was processed successfully, and its number of
+            change records (0 if the file could not be read)
         """
         logger.info(f"Processing batch file: {batch_file}")
         
@@ -490,62 +620,106 @@ class SCD2Loader:
             batch_file = Path(batch_file)
         
         try:
-            with open(batch_file, 'r') as f:
-                batch_data = json.load(f)
+            if batch is None:
+                batch = self._read_batch_file(batch_file)
+            latest_by_order, record_count, batch_id = batch
             
-            changes = batch_data.get('changes', [])
-            if not changes:
+            if not record_count:
                 logger.info(f"No changes found in {batch_file}")
-                return True
-            
-            # Generate batch ID for idempotency
-            batch_id = self._generate_batch_id(changes)
+                return True, 0
             
             # Check if already processed
-            processed_files = self._get_processed_files()
-            for line in processed_files:
-                filename, processed_batch_id = line.split('|', 1)
-                if filename == batch_file.name and processed_batch_id == batch_id:
-                    logger.info(f"Batch {batch_file.name} with ID {batch_id} already processed")
-                    return True
-            
-            # Group changes by order_key to handle rapid updates
-            changes_by_order = {}
-            for change in changes:
-                order_key = change['id']
-                if order_key not in changes_by_order:
-                    changes_by_order[order_key] = []
-                changes_by_order[order_key].append(change)
+            if (batch_file.name, batch_id) in self._processed_set:
+                logger.info(f"Batch {batch_file.name} with ID {batch_id} already processed")
+                return True, record_count
             
-            # Process changes in a transaction
-            success_count = 0
+            # Stage and apply all changes in one transaction
             try:
-                with self.warehouse_connection:
-                    # Process each order's changes, keeping only the latest
-                    for order_key, order_changes in changes_by_order.items():
-                        # Sort by cdc_timestamp to get the latest change
-                        order_changes.sort(key=lambda x: x['cdc_timestamp'])
-                        latest_change = order_changes[-1]
-                        
-                        # Process only the latest change for each order
-                        if self._process_change_record(latest_change, batch_id):
-                            success_count += 1
-                        else:
-                            logger.error(f"Failed to process change for order {order_key}")
-                            raise Exception("Failed to process change")
+                connection = connection or self.warehouse_connection
+                with connection:
+                    with connection.cursor() as cursor:
+                        cursor.execute(self._session_settings() + LOCK_ORDERS_SQL, (list(latest_by_order),))
+                        self._stage_changes(cursor, latest_by_order.values())
+                        expired, inserted = self._apply_staged_changes(cursor, batch_id)
                 
                 # Mark as processed
                 self._mark_file_processed(batch_file.name, batch_id)
-                logger.info(f"Successfully processed {success_count}/{len(changes_by_order)} unique orders from {batch_file}")
-                return True
+                logger.info(f"Successfully processed {len(latest_by_order)} unique orders from {batch_file} "
+                            f"({inserted} versions inserted, {expired} expired)")
+                return True, record_count
                 
-            except Exception as e:
+            except psycopg2.Error as e:
                 logger.error(f"Transaction failed for batch {batch_file}: {e}")
-                return False
+                return False, record_count
                 
         except Exception as e:
             logger.error(f"Failed to process batch file {batch_file}: {e}")
-            return False
+            return False, 0
+    
+    def _process_batch_file_pooled(self, read_batch: Tuple[Path, Optional[Tuple]]) -> Tuple[bool, int]:
+        """Process one read batch file on a connection borrowed from the pool."""
+        batch_file, batch = read_batch
+        connection = acquire_connection('warehouse')
+        try:
+            self._prepare_session(connection)
+            return self._process_batch_file(batch_file, batch, connection)
+        except psycopg2.Error as e:
+            logger.error(f"Failed to process batch file {batch_file}: {e}")
+            return False, 0
+        finally:
+            release_connection(connection, 'warehouse', discard=bool(connection.closed))
+    
+    def _process_batch_files(self, batch_files: List[Path]) -> Iterator[Tuple[bool, int]]:
+        """
+        Apply batch files in order, yielding (success, record count) per file.
+        
+        Stops early when a shutdown is requested. Files are only applied in
+        parallel when the pool has at least two connections to spare; the
+        caller may hold pooled connections of its own.
+        """
+        workers = min(LOAD_WORKERS, free_connections('warehouse')) if LOAD_WORKERS > 1 else 1
+        if workers > 1:
+            yield from self._process_batch_files_parallel(batch_files, workers)
+            return
+        if LOAD_WORKERS > 1:
+            logger.warning("Fewer than two pooled warehouse connections free; loading sequentially")
+        
+        for batch_file, batch in self._read_batch_files(batch_files):
+            if self.shutdown_handler.should_shutdown:
+                logger.info("Shutdown signal received, stopping batch processing")
+                return
+            yield self._process_batch_file(batch_file, batch)
+    
+    def _process_batch_files_parallel(self, batch_files: List[Path], workers: int) -> Iterator[Tuple[bool, int]]:
+        """
+        Apply batch files concurrently on pooled connections.
+        
+        Read files are grouped into waves of consecutive files with disjoint
+        order_key sets, at most one file per worker. Files in a wave are
+        applied concurrently; waves run in file order, so changes to the
+        same order are still applied in extraction order.
+        
+        Args:
+            batch_files: Batch files in file order
+            workers: Concurrent workers, each holding one pooled connection
+        """
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scd2-loader') as executor:
+            wave, wave_keys = [], set()
+            for batch_file, batch in self._read_batch_files(batch_files):
+                if self.shutdown_handler.should_shutdown:
+                    logger.info("Shutdown signal received, stopping batch processing")
+                    return
+                
+                # Unreadable files touch no orders; they only report their error
+                keys = batch[0].keys() if batch else set()
+                if len(wave) == workers or not wave_keys.isdisjoint(keys):
+                    yield from executor.map(self._process_batch_file_pooled, wave)
+                    wave, wave_keys = [], set()
+                
+                wave.append((batch_file, batch))
+                wave_keys |= keys
+            
+            yield from executor.map(self._process_batch_file_pooled, wave)
     
     def load_change_logs(self) -> None:
         """
@@ -566,12 +740,12 @@ class SCD2Loader:
         )
         
         try:
-            # Get processed files
-            processed_files = self._get_processed_files()
-            processed_filenames = {line.split('|', 1)[0] for line in processed_files}
+            # Get processed files, read once per run and kept up to date in memory
+            self._processed_set = self._get_processed_files()
+            processed_filenames = {filename for filename, _ in self._processed_set}
             
             # Find unprocessed batch files
-            batch_files = sorted(self.cdc_logs_dir.glob("changes_*.json"))
+            batch_files = sorted(f for f in self.cdc_logs_dir.glob("changes_*.json*") if is_batch_file(f.name))
             unprocessed_files = [f for f in batch_files if f.name not in processed_filenames]
             
             if not unprocessed_files:
@@ -593,28 +767,20 @@ class SCD2Loader:
             
             logger.info(f"Found {len(unprocessed_files)} unprocessed batch files")
             
+            if self.bulk_mode:
+                self._drop_bulk_mode_indexes()
+            
             # Process each batch file
             successful_batches = 0
             failed_batches = 0
             total_records = 0
             successful_records = 0
             
-            for batch_file in unprocessed_files:
-                if self.shutdown_handler.should_shutdown:
-                    logger.info("Shutdown signal received, stopping batch processing")
-                    break
-                    
-                if self._process_batch_file(batch_file):
+            for success, batch_records in self._process_batch_files(unprocessed_files):
+                total_records += batch_records
+                if success:
                     successful_batches += 1
-                    # Count records in this batch
-                    try:
-                        with open(batch_file, 'r') as f:
-                            batch_data = json.load(f)
-                            batch_records = len(batch_data.get('changes', []))
-                            total_records += batch_records
-                            successful_records += batch_records
-                    except Exception as e:
-                        logger.warning(f"Could not count records in {batch_file}: {e}")
+                    successful_records += batch_records
                 else:
                     failed_batches += 1
             
@@ -656,32 +822,44 @@ class SCD2Loader:
             )
             raise
         finally:
+            self._flush_processed_log()
+            if self.bulk_mode:
+                self._rebuild_bulk_mode_indexes()
+            # Commit any run update still buffered by the metadata manager
+            self.metadata_manager.flush()
             logger.info("SCD Type 2 loading process finished")
     
     def _log_summary_statistics(self) -> None:
-        """Log summary statistics of the dim_orders_history table."""
+        """Fold the batch deltas into the summary row and log it."""
         try:
             with self.warehouse_connection.cursor() as cursor:
-                cursor.execute(sql.SQL("""
-                    SELECT 
-                        COUNT(*) as total_records,
-                        COUNT(CASE WHEN is_current = TRUE THEN 1 END) as current_records,
-                        COUNT(CASE WHEN is_current = FALSE THEN 1 END) as historical_records,
-                        COUNT(DISTINCT order_key) as unique_orders,
-                        MIN(valid_from) as earliest_record,
-                        MAX(valid_from) as latest_record
-                    FROM dim_orders_history
-                """))
+                cursor.execute(SUMMARY_SQL)
                 
                 stats = cursor.fetchone()
-                logger.info(f"dim_orders_history summary: "
-                           f"total={stats[0]}, current={stats[1]}, "
-                           f"historical={stats[2]}, unique_orders={stats[3]}, "
-                           f"earliest={stats[4]}, latest={stats[5]}")
+            self.warehouse_connection.commit()
+            logger.info(f"dim_orders_history summary: "
+                       f"total={stats[0]}, current={stats[1]}, "
+                       f"historical={stats[2]}, unique_orders={stats[3]}, "
+                       f"earliest={stats[4]}, latest={stats[5]}")
                 
         except psycopg2.Error as e:
+            self.warehouse_connection.rollback()
             logger.error(f"Failed to get summary statistics: {e}")
 
+def run(connection=None) -> None:
+    """
+    Load the pending change logs once.
+    
+    Args:
+        connection: Open warehouse connection to load with; a new one is
+            opened when omitted
+    """
+    loader = SCD2Loader(connection=connection)
+    try:
+        loader.load_change_logs()
+    finally:
+        loader.metadata_manager.close()
+
 def main():
     """Main entry point for the SCD Type 2 loader."""
     global logger
@@ -689,8 +867,7 @@ def main():
     logger.info("Starting SCD Type 2 Loader")
     
     try:
-        loader = SCD2Loader()
-        loader.load_change_logs()
+        run()
         
     except Exception as e:
         logger.error(f"Fatal error in main: {e}")
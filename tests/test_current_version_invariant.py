@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test that orders_dim keeps one current version per order across partitions.
+
+orders_dim is range partitioned by valid_from month and its unique
+current-version indexes are per partition, so the change processor's apply
+statement has to close the current version even when the new version lands
+in another month.
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+
+from src.cdc.change_processor import ChangeProcessor
+from src.utils.db_pool import acquire_connection, release_connection
+
+load_dotenv()
+
+# Order used by the test; its versions are never committed
+TEST_ORDER_KEY = 900001
+
+# Changes applied one batch at a time, each in a different month: an insert,
+# a replayed insert of the same order and an update
+TEST_BATCHES = (
+    ('INSERT', 'pending', '2026-01-31T23:00:00'),
+    ('INSERT', 'pending', '2026-02-01T01:00:00'),
+    ('UPDATE', 'shipped', '2026-03-01T09:30:00'),
+)
+
+
+def _change(operation_type, order_status, cdc_timestamp):
+    """Build a CDC change record for TEST_ORDER_KEY."""
+    return {
+        'id': TEST_ORDER_KEY, 'customer_id': 1, 'product_id': 1, 'quantity': 1,
+        'unit_price': '10.00', 'total_amount': '10.00', 'order_status': order_status,
+        'order_date': '2026-01-31T23:00:00', 'cdc_timestamp': cdc_timestamp,
+        'operation_type': operation_type,
+    }
+
+
+def check_current_version_invariant():
+    """
+    Apply TEST_BATCHES and check each leaves exactly one current version.
+    
+    Returns:
+        True if the invariant held after every batch
+    """
+    print("🔧 Testing orders_dim current-version invariant")
+    print("=" * 50)
+
+    # The processor creates the schema and the month partitions on its own
+    # connection, ahead of the test transaction: creating a partition waits
+    # for transactions using the default partition. Partitions are
+    # committed; they are shared by all loads.
+    Path("data/cdc_logs").mkdir(parents=True, exist_ok=True)
+    processor = ChangeProcessor()
+    if not processor._schema_is_current():
+        processor._create_warehouse_schema()
+    processor._ensure_partitions([cdc_timestamp for _, _, cdc_timestamp in TEST_BATCHES])
+
+    conn = acquire_connection('warehouse')
+
+    # The test's versions are written in one transaction that is rolled back
+    try:
+        processor._prepare_statements(conn)
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM orders_dim WHERE order_key = %s", (TEST_ORDER_KEY,))
+
+            for operation_type, order_status, cdc_timestamp in TEST_BATCHES:
+                processor._apply_changes([_change(operation_type, order_status, cdc_timestamp)], conn)
+
+                cursor.execute("""
+                    SELECT count(*) FILTER (WHERE is_current),
+                           count(DISTINCT tableoid)
+                    FROM orders_dim
+                    WHERE order_key = %s
+                """, (TEST_ORDER_KEY,))
+                current, partitions = cursor.fetchone()
+                print(f"{operation_type} at {cdc_timestamp}: {current} current version(s) "
+                      f"across {partitions} partition(s)")
+
+                if current != 1:
+                    print(f"\n❌ INVARIANT FAILED: {current} current versions for order {TEST_ORDER_KEY}")
+                    return False
+
+            # Every superseded version ends where its successor starts
+            cursor.execute("""
+                SELECT count(*)
+                FROM (
+                    SELECT valid_to, lead(valid_from) OVER (ORDER BY valid_from) AS next_from
+                    FROM orders_dim
+                    WHERE order_key = %s
+                ) AS versions
+                WHERE valid_to IS DISTINCT FROM next_from
+            """, (TEST_ORDER_KEY,))
+            gaps = cursor.fetchone()[0]
+
+            if gaps:
+                print(f"\n❌ INVARIANT FAILED: {gaps} version(s) not closed at their successor's valid_from")
+                return False
+
+            print("\n✅ ONE CURRENT VERSION: Kept across month partitions")
+            return True
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        return False
+    finally:
+        # Discard everything the test wrote
+        conn.rollback()
+        release_connection(conn, 'warehouse')
+        release_connection(processor.warehouse_connection, 'warehouse')
+
+def test_current_version_invariant():
+    """pytest entry point; needs the warehouse database."""
+    assert check_current_version_invariant()
+
+if __name__ == "__main__":
+    success = check_current_version_invariant()
+    print(f"\n🎯 Current Version Invariant Test: {'PASSED' if success else 'FAILED'}")
+    sys.exit(0 if success else 1)
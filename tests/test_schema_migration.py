@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Test the change processor's orders_dim schema migrations.
+
+Each earlier orders_dim layout is built in a scratch schema and migrated
+with ChangeProcessor._create_warehouse_schema, which must leave the
+partitioned table with VARCHAR order_status/cdc_operation columns, every
+row kept with its public values, and the cdc_meta sentinel current.
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+
+from src.cdc.change_processor import SCHEMA_COMPONENT, SCHEMA_VERSION, ChangeProcessor
+from src.utils.db_pool import open_connection
+
+load_dotenv()
+
+# Scratch schema the old layouts are built in; dropped after each layout
+TEST_SCHEMA = 'cdc_migration_test'
+
+# Earlier orders_dim layouts by schema version: 1 is unpartitioned with
+# VARCHAR columns, 2 adds the order_status_t enum and single-letter
+# cdc_operation, 3 partitions the version 2 table by month
+ORDER_STATUS_ENUM = """
+    CREATE TYPE order_status_t AS ENUM ('pending', 'processing', 'shipped', 'delivered', 'cancelled');
+"""
+
+OLD_LAYOUTS = {
+    1: ('VARCHAR(50)', 'VARCHAR(10)', '', ''),
+    2: ('order_status_t', 'CHAR(1)', '', ''),
+    3: ('order_status_t', 'CHAR(1)', 'PARTITION BY RANGE (valid_from)', """
+        CREATE TABLE orders_dim_default PARTITION OF orders_dim DEFAULT;
+    """),
+}
+
+OLD_TABLE = """
+    CREATE TABLE orders_dim (
+        surrogate_key SERIAL,
+        order_key INTEGER NOT NULL,
+        customer_id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL,
+        quantity INTEGER NOT NULL,
+        unit_price DECIMAL(10,2) NOT NULL,
+        total_amount DECIMAL(10,2) NOT NULL,
+        order_status {order_status} NOT NULL,
+        order_date TIMESTAMP NOT NULL,
+        valid_from TIMESTAMP NOT NULL,
+        valid_to TIMESTAMP,
+        is_current BOOLEAN DEFAULT TRUE,
+        cdc_operation {cdc_operation} NOT NULL,
+        cdc_timestamp TIMESTAMP NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (surrogate_key, valid_from),
+        UNIQUE(order_key, valid_from)
+    ) {partitioning};
+    {partitions}
+    CREATE TABLE cdc_meta (
+        component VARCHAR(50) PRIMARY KEY,
+        schema_version INTEGER NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+# Two versions of one order, in different months
+OLD_ROWS = """
+    INSERT INTO orders_dim (order_key, customer_id, product_id, quantity, unit_price,
+                            total_amount, order_status, order_date, valid_from, valid_to,
+                            is_current, cdc_operation, cdc_timestamp)
+    VALUES (1, 1, 1, 1, 10, 10, 'pending', '2026-01-31', '2026-01-31', '2026-02-01', FALSE, %s, '2026-01-31'),
+           (1, 1, 1, 1, 10, 10, 'shipped', '2026-01-31', '2026-02-01', NULL, TRUE, %s, '2026-02-01')
+"""
+
+
+def migrate_layout(version):
+    """
+    Build one old layout, migrate it and check the result.
+
+    Args:
+        version: Key of OLD_LAYOUTS to migrate from
+
+    Returns:
+        True if the migrated table matched the current schema
+    """
+    order_status, cdc_operation, partitioning, partitions = OLD_LAYOUTS[version]
+    conn = open_connection('warehouse')
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE")
+            cursor.execute(f"CREATE SCHEMA {TEST_SCHEMA}")
+            cursor.execute(f"SET search_path TO {TEST_SCHEMA}")
+            if order_status == 'order_status_t':
+                cursor.execute(ORDER_STATUS_ENUM)
+            cursor.execute(OLD_TABLE.format(order_status=order_status, cdc_operation=cdc_operation,
+                                            partitioning=partitioning, partitions=partitions))
+            operations = ('I', 'U') if cdc_operation == 'CHAR(1)' else ('INSERT', 'UPDATE')
+            cursor.execute(OLD_ROWS, operations)
+            cursor.execute("INSERT INTO cdc_meta VALUES (%s, %s)", (SCHEMA_COMPONENT, version))
+        conn.commit()
+
+        # Migrate on the scratch schema's connection
+        processor = object.__new__(ChangeProcessor)
+        processor.warehouse_connection = conn
+        processor._create_warehouse_schema()
+
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT relkind FROM pg_class WHERE oid = to_regclass('orders_dim')
+            """)
+            relkind = cursor.fetchone()[0]
+            cursor.execute("""
+                SELECT column_name, data_type FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = 'orders_dim'
+                  AND column_name IN ('order_status', 'cdc_operation')
+            """)
+            types = dict(cursor.fetchall())
+            cursor.execute("""
+                SELECT order_status, cdc_operation, is_current, tableoid::regclass::text
+                FROM orders_dim ORDER BY valid_from
+            """)
+            rows = cursor.fetchall()
+            cursor.execute("SELECT schema_version FROM cdc_meta WHERE component = %s", (SCHEMA_COMPONENT,))
+            schema_version = cursor.fetchone()[0]
+            cursor.execute("SELECT to_regtype('order_status_t')")
+            leftover_enum = cursor.fetchone()[0]
+
+        # Rows copied out of an unpartitioned table land in month
+        # partitions; a partitioned table keeps its rows where they are
+        if partitioning:
+            expected_partitions = ('orders_dim_default', 'orders_dim_default')
+        else:
+            expected_partitions = ('orders_dim_2026_01', 'orders_dim_2026_02')
+        expected_rows = [('pending', 'INSERT', False, expected_partitions[0]),
+                         ('shipped', 'UPDATE', True, expected_partitions[1])]
+        checks = {
+            'partitioned': relkind == 'p',
+            'varchar columns': types == {'order_status': 'character varying',
+                                         'cdc_operation': 'character varying'},
+            'rows kept': rows == expected_rows,
+            'schema version current': schema_version == SCHEMA_VERSION,
+            'enum dropped': leftover_enum is None,
+        }
+        for name, passed in checks.items():
+            print(f"  version {version} -> {SCHEMA_VERSION}: {name}: {'✅' if passed else '❌'}")
+        return all(checks.values())
+
+    except Exception as e:
+        print(f"❌ Migration from version {version} failed: {e}")
+        return False
+    finally:
+        conn.rollback()
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE")
+        conn.commit()
+        conn.close()
+
+def check_schema_migrations():
+    """
+    Migrate every old layout in OLD_LAYOUTS.
+
+    Returns:
+        True if every migration produced the current schema
+    """
+    print("🔧 Testing orders_dim schema migrations")
+    print("=" * 50)
+    return all([migrate_layout(version) for version in OLD_LAYOUTS])
+
+def test_schema_migrations():
+    """pytest entry point; needs the warehouse database."""
+    assert check_schema_migrations()
+
+if __name__ == "__main__":
+    success = check_schema_migrations()
+    print(f"\n🎯 Schema Migration Test: {'PASSED' if success else 'FAILED'}")
+    sys.exit(0 if success else 1)
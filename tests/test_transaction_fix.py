@@ -3,6 +3,8 @@
 Simple test to verify the transaction integrity fix.
 """
 
+import io
+import csv
 import sys
 import os
 from datetime import datetime, timezone
@@ -11,117 +13,146 @@ from pathlib import Path
 # Add src to path
 sys.path.append(str(Path(__file__).parent.parent / "src"))
 
-import psycopg2
 from dotenv import load_dotenv
 
+from utils.db_pool import acquire_connection, release_connection
+
 load_dotenv()
 
+# Orders expired and re-inserted by the test, starting at FIRST_ORDER_KEY;
+# raise to measure the batched path at realistic batch sizes
+FIRST_ORDER_KEY = 12345
+ORDER_COUNT = int(os.getenv('TXN_FIX_ORDER_COUNT', '1'))
+ORDER_KEYS = list(range(FIRST_ORDER_KEY, FIRST_ORDER_KEY + ORDER_COUNT))
+
+# Columns of the seeded initial versions, in row order
+SEED_COLUMNS = (
+    'order_key', 'customer_id', 'product_id', 'quantity',
+    'unit_price', 'total_amount', 'order_status', 'order_date',
+    'valid_from', 'cdc_operation', 'cdc_timestamp', 'batch_id'
+)
+
+# Expire the current versions and insert their successors in one statement;
+# the insert reads the expired rows, so only orders that had a current
+# version get a new one
+EXPIRE_INSERT_SQL = """
+    WITH expired AS (
+        UPDATE dim_orders_history
+        SET valid_to = %(update_timestamp)s, is_current = FALSE
+        WHERE order_key = ANY(%(order_keys)s) AND is_current = TRUE
+        RETURNING order_key
+    )
+    INSERT INTO dim_orders_history (
+        order_key, customer_id, product_id, quantity,
+        unit_price, total_amount, order_status, order_date,
+        valid_from, cdc_operation, cdc_timestamp, batch_id
+    )
+    SELECT order_key, 1, 1, 2, 10.00, 20.00, 'confirmed', '2026-02-01T10:00:00Z',
+           %(update_timestamp)s, 'UPDATE', %(update_timestamp)s, 'test_txn'
+    FROM expired
+"""
+
+def _bulk_seed(cursor, rows):
+    """
+    Load initial dim_orders_history versions with COPY FROM STDIN.
+    
+    Args:
+        cursor: Cursor of the test's connection
+        rows: Tuples of SEED_COLUMNS values
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY dim_orders_history ({', '.join(SEED_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+
 def test_transaction_fix():
     """Test that the transaction fix works correctly."""
     print("🔧 Testing Transaction Integrity Fix")
     print("=" * 50)
     
-    # Connect to warehouse
-    conn = psycopg2.connect(
-        host=os.getenv('WAREHOUSE_DB_HOST', 'localhost'),
-        port=os.getenv('WAREHOUSE_DB_PORT', '5433'),
-        database=os.getenv('WAREHOUSE_DB_NAME', 'warehouse_db'),
-        user=os.getenv('WAREHOUSE_DB_USER', 'postgres'),
-        password=os.getenv('WAREHOUSE_DB_PASSWORD', 'postgres')
-    )
-    conn.autocommit = False
+    # Borrow a warehouse connection from the shared pool
+    conn = acquire_connection('warehouse')
     
+    # The whole test runs in one transaction that is rolled back at the end,
+    # so test rows are never committed and need no cleanup
     try:
         with conn.cursor() as cursor:
-            # Clean up test data
-            cursor.execute("DELETE FROM dim_orders_history WHERE order_key = 12345")
-            conn.commit()
+            # Clear any warehouse versions of the test orders for this run
+            cursor.execute("DELETE FROM dim_orders_history WHERE order_key = ANY(%s)", (ORDER_KEYS,))
             
-            # Insert initial record
-            cursor.execute("""
-                INSERT INTO dim_orders_history (
-                    order_key, customer_id, product_id, quantity,
-                    unit_price, total_amount, order_status, order_date,
-                    valid_from, cdc_operation, cdc_timestamp, batch_id
-                ) VALUES (
-                    12345, 1, 1, 1, 10.00, 10.00, 'pending', '2026-02-01T10:00:00Z',
-                    '2026-02-01T10:00:00Z', 'INSERT', '2026-02-01T10:00:00Z', 'test_txn'
-                )
-            """)
-            conn.commit()
+            # Insert initial records
+            _bulk_seed(cursor, (
+                (order_key, 1, 1, 1, 10.00, 10.00, 'pending', '2026-02-01T10:00:00Z',
+                 '2026-02-01T10:00:00Z', 'INSERT', '2026-02-01T10:00:00Z', 'test_txn')
+                for order_key in ORDER_KEYS
+            ))
             
-            print("✅ Initial record inserted")
+            print(f"✅ Initial records inserted for {ORDER_COUNT} order(s)")
             
             # Test the fixed transaction pattern
             update_timestamp = datetime(2026, 2, 1, 10, 5, 30, 123456, timezone.utc)
             
             print("🔄 Testing atomic transaction...")
             
-            # Single transaction - both operations atomic
-            with conn:
-                with conn.cursor() as cursor:
-                    # Expire old record
-                    cursor.execute("""
-                        UPDATE dim_orders_history 
-                        SET valid_to = %s, is_current = FALSE
-                        WHERE order_key = %s AND is_current = TRUE
-                    """, (update_timestamp, 12345))
-                    
-                    # Insert new record
-                    cursor.execute("""
-                        INSERT INTO dim_orders_history (
-                            order_key, customer_id, product_id, quantity,
-                            unit_price, total_amount, order_status, order_date,
-                            valid_from, cdc_operation, cdc_timestamp, batch_id
-                        ) VALUES (
-                            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                        )
-                    """, (
-                        12345, 1, 1, 2, 10.00, 20.00, 'confirmed', '2026-02-01T10:00:00Z',
-                        update_timestamp, 'UPDATE', update_timestamp, 'test_txn'
-                    ))
-                
-                print("✅ ATOMIC TRANSACTION: Both operations committed together")
+            # Single statement - both operations atomic and sent in one
+            # round-trip. It runs in its own subtransaction, nested in the
+            # outer rolled-back test transaction.
+            cursor.execute("SAVEPOINT atomic_update")
+            cursor.execute(EXPIRE_INSERT_SQL, {
+                'order_keys': ORDER_KEYS,
+                'update_timestamp': update_timestamp,
+            })
+            cursor.execute("RELEASE SAVEPOINT atomic_update")
+            
+            print("✅ ATOMIC TRANSACTION: Both operations applied together")
             
             # Verify results
             cursor.execute("""
                 SELECT surrogate_key, is_current, valid_from, valid_to
                 FROM dim_orders_history 
-                WHERE order_key = 12345
+                WHERE order_key = %s
                 ORDER BY surrogate_key
-            """)
+            """, (FIRST_ORDER_KEY,))
             
             results = cursor.fetchall()
-            print(f"\n📊 Results:")
+            print(f"\n📊 Results for order {FIRST_ORDER_KEY}:")
             for result in results:
                 print(f"  Record {result[0]}: current={result[1]}, valid_from={result[2]}, valid_to={result[3]}")
             
-            # Verify atomicity
-            current_records = [r for r in results if r[1]]  # is_current = True
-            expired_records = [r for r in results if not r[1]]  # is_current = False
+            # Verify atomicity: one current and one expired record per order
+            cursor.execute("""
+                SELECT count(*)
+                FROM (
+                    SELECT order_key
+                    FROM dim_orders_history
+                    WHERE order_key = ANY(%s)
+                    GROUP BY order_key
+                    HAVING count(*) FILTER (WHERE is_current) = 1
+                       AND count(*) FILTER (WHERE NOT is_current) = 1
+                ) AS verified
+            """, (ORDER_KEYS,))
+            verified_orders = cursor.fetchone()[0]
             
-            if len(current_records) == 1 and len(expired_records) == 1:
+            if verified_orders == ORDER_COUNT:
                 print("\n✅ ATOMICITY VERIFIED: One current and one expired record")
                 print("✅ NO RACE CONDITION: No intermediate state with no current record")
                 print("✅ TRANSACTION INTEGRITY CONFIRMED!")
                 return True
             else:
-                print(f"\n❌ ATOMICITY FAILED: {len(current_records)} current, {len(expired_records)} expired")
+                print(f"\n❌ ATOMICITY FAILED: {ORDER_COUNT - verified_orders} of {ORDER_COUNT} order(s) "
+                      f"lack exactly one current and one expired record")
                 return False
                 
     except Exception as e:
         print(f"❌ Test failed: {e}")
-        conn.rollback()
         return False
     finally:
-        # Clean up
-        try:
-            with conn.cursor() as cursor:
-                cursor.execute("DELETE FROM dim_orders_history WHERE order_key = 12345")
-                conn.commit()
-        except:
-            pass
-        conn.close()
+        # Discard everything the test wrote
+        conn.rollback()
+        release_connection(conn, 'warehouse')
 
 if __name__ == "__main__":
     success = test_transaction_fix()
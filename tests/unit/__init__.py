@@ -0,0 +1,6 @@
+"""
+Unit Tests
+
+Database-free pytest tests for the pipeline's pure functions. Run with
+`python -m pytest tests/unit`.
+"""
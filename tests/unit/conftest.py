@@ -0,0 +1,7 @@
+"""Shared pytest setup for the unit tests."""
+
+import sys
+from pathlib import Path
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
@@ -0,0 +1,72 @@
+"""Unit tests for the change processor's batch compaction and planning."""
+
+import pytest
+
+from src.cdc.change_processor import DELETE_PAYLOAD, VERSION_COLUMNS, ChangeProcessor
+
+
+def _change(order_id, operation_type, cdc_timestamp, order_status='pending'):
+    return {
+        'id': order_id, 'customer_id': 1, 'product_id': 2, 'quantity': 3,
+        'unit_price': '10.00', 'total_amount': '30.00', 'order_status': order_status,
+        'order_date': '2026-01-01T00:00:00', 'cdc_timestamp': cdc_timestamp,
+        'operation_type': operation_type,
+    }
+
+
+@pytest.fixture
+def processor():
+    # Compaction and planning don't touch the database
+    return object.__new__(ChangeProcessor)
+
+
+class TestCompactChanges:
+    def test_keeps_latest_change_per_order(self, processor):
+        changes = [
+            _change(1, 'INSERT', '2026-01-01T00:00:01'),
+            _change(2, 'INSERT', '2026-01-01T00:00:02'),
+            _change(1, 'UPDATE', '2026-01-01T00:00:03', 'shipped'),
+        ]
+        compacted = {c['id']: c for c in processor._compact_changes(changes)}
+        assert compacted[1]['operation_type'] == 'UPDATE'
+        assert compacted[1]['order_status'] == 'shipped'
+        assert compacted[2]['operation_type'] == 'INSERT'
+
+    def test_out_of_order_changes(self, processor):
+        changes = [
+            _change(1, 'DELETE', '2026-01-01T00:00:05'),
+            _change(1, 'UPDATE', '2026-01-01T00:00:03'),
+        ]
+        assert [c['operation_type'] for c in processor._compact_changes(changes)] == ['DELETE']
+
+    def test_timestamp_tie_keeps_file_order(self, processor):
+        changes = [
+            _change(1, 'UPDATE', '2026-01-01T00:00:03', 'paid'),
+            _change(1, 'UPDATE', '2026-01-01T00:00:03', 'shipped'),
+        ]
+        assert processor._compact_changes(changes)[0]['order_status'] == 'shipped'
+
+    def test_skips_unknown_operations(self, processor):
+        changes = [_change(1, 'TRUNCATE', '2026-01-01T00:00:01')]
+        assert processor._compact_changes(changes) == []
+
+
+class TestPlanBatch:
+    def test_columns_per_version_column(self, processor):
+        columns = processor._plan_batch([
+            _change(1, 'INSERT', '2026-01-01T00:00:01'),
+            _change(2, 'UPDATE', '2026-01-01T00:00:02', 'shipped'),
+        ])
+        assert len(columns) == len(VERSION_COLUMNS)
+        by_name = dict(zip(VERSION_COLUMNS, columns))
+        assert by_name['order_key'] == (1, 2)
+        assert by_name['order_status'] == ('pending', 'shipped')
+        assert by_name['valid_from'] == by_name['cdc_timestamp']
+        assert by_name['cdc_operation'] == ('INSERT', 'UPDATE')
+
+    def test_delete_carries_key_and_timestamps_only(self, processor):
+        row = next(zip(*processor._plan_batch([_change(1, 'DELETE', '2026-01-01T00:00:01')])))
+        assert row == (1, *DELETE_PAYLOAD, '2026-01-01T00:00:01', 'DELETE', '2026-01-01T00:00:01')
+
+    def test_empty_batch(self, processor):
+        assert processor._plan_batch([]) == []
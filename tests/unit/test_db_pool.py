@@ -0,0 +1,90 @@
+"""Unit tests for the shared connection pool's retry path."""
+
+import psycopg2
+from psycopg2.pool import PoolError
+import pytest
+
+from src.utils import db_pool
+
+
+class FakeConnection:
+    def __init__(self, closed=0):
+        self.closed = closed
+        self.autocommit = True
+
+
+class FakePool:
+    """Hands out the queued connections, raising queued exceptions."""
+
+    closed = False
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.returned = []
+
+    def getconn(self):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def putconn(self, conn, close=False):
+        self.returned.append((conn, close))
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(db_pool.time, 'sleep', delays.append)
+    return delays
+
+
+def _use_pool(monkeypatch, pool):
+    monkeypatch.setitem(db_pool._pools, 'warehouse', pool)
+
+
+def test_returns_connection_with_autocommit_off(monkeypatch, sleeps):
+    conn = FakeConnection()
+    _use_pool(monkeypatch, FakePool(conn))
+    assert db_pool.acquire_connection() is conn
+    assert conn.autocommit is False
+    assert sleeps == []
+
+
+def test_retries_with_doubling_backoff(monkeypatch, sleeps):
+    conn = FakeConnection()
+    error = psycopg2.OperationalError("server closed the connection")
+    _use_pool(monkeypatch, FakePool(error, error, conn))
+    assert db_pool.acquire_connection(retries=3, backoff=0.5) is conn
+    assert sleeps == [0.5, 1.0]
+
+
+def test_gives_up_after_retries(monkeypatch, sleeps):
+    error = psycopg2.OperationalError("could not connect")
+    _use_pool(monkeypatch, FakePool(error, error))
+    with pytest.raises(psycopg2.OperationalError):
+        db_pool.acquire_connection(retries=2)
+    assert len(sleeps) == 1
+
+
+def test_discards_closed_pooled_connection(monkeypatch, sleeps):
+    stale, fresh = FakeConnection(closed=1), FakeConnection()
+    pool = FakePool(stale, fresh)
+    _use_pool(monkeypatch, pool)
+    assert db_pool.acquire_connection() is fresh
+    assert pool.returned == [(stale, True)]
+
+
+def test_retries_exhausted_pool(monkeypatch, sleeps):
+    conn = FakeConnection()
+    _use_pool(monkeypatch, FakePool(PoolError("connection pool exhausted"), conn))
+    assert db_pool.acquire_connection(backoff=0.5) is conn
+    assert sleeps == [0.5]
+
+
+def test_free_connections(monkeypatch):
+    pool = FakePool()
+    pool.maxconn = 4
+    pool._used = {1: FakeConnection(), 2: FakeConnection()}
+    _use_pool(monkeypatch, pool)
+    assert db_pool.free_connections() == 2
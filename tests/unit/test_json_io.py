@@ -0,0 +1,107 @@
+"""Unit tests for the CDC batch file JSON helpers."""
+
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from src.utils import json_io
+
+BATCH = {
+    'batch_metadata': {'batch_id': '20260101_000000_000000_000001', 'record_count': 2},
+    'changes': [
+        {'id': 1, 'order_status': 'pending', 'operation_type': 'INSERT'},
+        {'id': 2, 'order_status': 'shipped', 'operation_type': 'UPDATE'},
+    ],
+}
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    """Run a test with orjson (when installed) and with the stdlib fallback."""
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    else:
+        monkeypatch.setattr(json_io, 'orjson', None)
+    return request.param
+
+
+def _write_zstd(path, obj):
+    with open(path, 'wb') as f:
+        with json_io.zstd_stream_writer(f) as writer:
+            writer.write(json_io.dumps(obj))
+
+
+class TestDumpsLoads:
+    def test_round_trip(self, encoder):
+        assert json_io.loads(json_io.dumps(BATCH)) == BATCH
+
+    def test_non_json_types(self, encoder):
+        encoded = json_io.dumps({
+            'at': datetime(2026, 1, 2, 3, 4, 5, 600000),
+            'on': date(2026, 1, 2),
+            'price': Decimal('9.50'),
+        })
+        assert json_io.loads(encoded) == {
+            'at': '2026-01-02T03:04:05.600000', 'on': '2026-01-02', 'price': '9.50',
+        }
+
+    def test_indent(self, encoder):
+        assert b'\n  "id": 1' in json_io.dumps({'id': 1}, indent=True)
+
+
+class TestBatchFiles:
+    def test_file_round_trip(self, encoder, tmp_path):
+        path = tmp_path / 'changes_1.json'
+        json_io.write_json_file(path, BATCH)
+        assert json_io.load_json_file(path) == BATCH
+
+    def test_load_and_iter_changes(self, tmp_path):
+        path = tmp_path / 'changes_1.json'
+        json_io.write_json_file(path, BATCH)
+        assert json_io.load_batch_changes(path) == BATCH['changes']
+        assert list(json_io.iter_batch_changes(path)) == BATCH['changes']
+
+    def test_missing_changes(self, tmp_path):
+        path = tmp_path / 'changes_1.json'
+        json_io.write_json_file(path, {'batch_metadata': {}})
+        assert json_io.load_batch_changes(path) == []
+
+    def test_zstd_round_trip(self, tmp_path):
+        pytest.importorskip('zstandard')
+        path = tmp_path / ('changes_1.json' + json_io.ZSTD_SUFFIX)
+        _write_zstd(path, BATCH)
+        assert json_io.load_json_file(path) == BATCH
+        assert json_io.load_batch_changes(path) == BATCH['changes']
+
+    def test_zstd_without_zstandard(self, tmp_path, monkeypatch):
+        path = tmp_path / ('changes_1.json' + json_io.ZSTD_SUFFIX)
+        path.write_bytes(b'')
+        monkeypatch.setattr(json_io, 'zstandard', None)
+        with pytest.raises(ImportError):
+            json_io.load_json_file(path)
+
+    @pytest.mark.parametrize('suffix', ['.json', '.json' + json_io.ZSTD_SUFFIX])
+    def test_streamed_changes(self, suffix, tmp_path, monkeypatch):
+        pytest.importorskip('ijson')
+        path = tmp_path / ('changes_1' + suffix)
+        if suffix.endswith(json_io.ZSTD_SUFFIX):
+            pytest.importorskip('zstandard')
+            _write_zstd(path, BATCH)
+        else:
+            json_io.write_json_file(path, BATCH)
+        # Stream every file
+        monkeypatch.setattr(json_io, 'STREAMING_THRESHOLD_BYTES', 0)
+        assert list(json_io.iter_batch_changes(path)) == BATCH['changes']
+        assert json_io.load_batch_changes(path) == BATCH['changes']
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('changes_20260101_000000_000000_000001.json', True),
+    ('changes_20260101_000000_000000_000001.json.zst', True),
+    ('changes_20260101_000000_000000_000001.json.tmp', False),
+    ('.watermark', False),
+    ('summary.json', False),
+])
+def test_is_batch_file(name, expected):
+    assert json_io.is_batch_file(name) is expected
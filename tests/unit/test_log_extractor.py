@@ -0,0 +1,121 @@
+"""Unit tests for the CDC extractor's batching and batch file naming."""
+
+import re
+from datetime import datetime, timezone
+
+import pytest
+
+from src.cdc import log_extractor
+from src.cdc.log_extractor import CDCLogExtractor, chunk_by_timestamp
+
+BATCH_ID = re.compile(r'\d{8}_\d{6}_\d{6}_\d{6}')
+
+
+def _changes(*timestamps):
+    return [{'id': i, 'last_updated': ts} for i, ts in enumerate(timestamps)]
+
+
+class TestChunkByTimestamp:
+    def test_chunks_of_size(self):
+        chunks = list(chunk_by_timestamp(_changes(1, 2, 3, 4, 5), 2))
+        assert [[c['last_updated'] for c in chunk] for chunk in chunks] == [[1, 2], [3, 4], [5]]
+
+    def test_never_splits_a_timestamp(self):
+        chunks = list(chunk_by_timestamp(_changes(1, 2, 2, 2, 3), 2))
+        assert [[c['last_updated'] for c in chunk] for chunk in chunks] == [[1, 2, 2, 2], [3]]
+
+    def test_keeps_every_change_in_order(self):
+        changes = _changes(1, 1, 2, 3, 3, 3, 4)
+        assert [c for chunk in chunk_by_timestamp(changes, 1) for c in chunk] == changes
+
+    def test_empty(self):
+        assert list(chunk_by_timestamp([], 10)) == []
+
+
+@pytest.fixture
+def extractor():
+    # Batch naming doesn't touch the database
+    extractor = object.__new__(CDCLogExtractor)
+    extractor._batch_second = None
+    extractor._batch_prefix = ''
+    extractor._batch_seq = 0
+    return extractor
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Freeze time.time_ns at the value set on the returned list."""
+    now = [int(datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc).timestamp()) * 1_000_000_000]
+    monkeypatch.setattr(log_extractor.time, 'time_ns', lambda: now[0])
+    return now
+
+
+class TestNextBatchId:
+    def test_format(self, extractor, clock):
+        clock[0] += 123_456_789
+        assert extractor._next_batch_id() == '20260102_030405_123456_000001'
+
+    def test_same_instant_never_collides(self, extractor, clock):
+        ids = [extractor._next_batch_id() for _ in range(3)]
+        assert len(set(ids)) == 3
+        assert all(BATCH_ID.fullmatch(batch_id) for batch_id in ids)
+
+    def test_ids_sort_in_write_order(self, extractor, clock):
+        ids = []
+        for step in (0, 999_999_000, 1_000, 3_600_000_000_000):
+            clock[0] += step
+            ids.append(extractor._next_batch_id())
+        assert ids == sorted(ids)
+
+    def test_prefix_follows_the_second(self, extractor, clock):
+        extractor._next_batch_id()
+        clock[0] += 1_000_000_000
+        assert extractor._next_batch_id().startswith('20260102_030406_')
+
+    def test_running_log_rotates_hourly(self, extractor, clock):
+        # The running log is named after the first 11 prefix characters
+        extractor._next_batch_id()
+        assert extractor._batch_prefix[:11] == '20260102_03'
+        clock[0] += 3_600 * 1_000_000_000
+        extractor._next_batch_id()
+        assert extractor._batch_prefix[:11] == '20260102_04'
+
+
+class FakeSourceConnection:
+    """Answers every query with one row."""
+
+    def __init__(self, row):
+        self.row = row
+        self.queries = []
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params):
+        self.queries.append(params)
+
+    def fetchone(self):
+        return self.row
+
+    def rollback(self):
+        pass
+
+
+def test_replicated_change_fetches_unchanged_columns():
+    extractor = object.__new__(CDCLogExtractor)
+    extractor.connection = FakeSourceConnection(('shipped', 4))
+    change = extractor._replicated_change(
+        {'table': 'public.orders', 'id': 7, 'unit_price': '9.50',
+         'unchanged_columns': ['order_status', 'quantity']},
+        '2026-01-02T03:04:05', '2026-01-02T03:04:06'
+    )
+    assert extractor.connection.queries == [(7,)]
+    assert change['order_status'] == 'shipped'
+    assert change['total_amount'] == '38.00'
+    assert 'table' not in change and 'unchanged_columns' not in change
@@ -0,0 +1,24 @@
+"""Unit tests for the rotating log file handler."""
+
+import logging
+
+from src.utils.logging_config import FastRotatingFileHandler
+
+
+def test_rotates_on_encoded_size(tmp_path):
+    # Each record is 121 bytes in UTF-8 but only 41 characters
+    path = tmp_path / 'demo.log'
+    handler = FastRotatingFileHandler(path, maxBytes=1000, backupCount=3, encoding='utf-8')
+    logger = logging.getLogger('test_rotates_on_encoded_size')
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        for _ in range(30):
+            logger.warning('✅❌' * 20)
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+    files = sorted(tmp_path.iterdir())
+    assert len(files) > 1
+    assert all(f.stat().st_size <= 1000 for f in files)
@@ -0,0 +1,131 @@
+"""Unit tests for the pgoutput decoder and its helpers."""
+
+import struct
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.cdc.pgoutput import PG_EPOCH, PgOutputDecoder, format_lsn, parse_timestamp
+
+
+class TestParseTimestamp:
+    def test_two_digit_fraction(self):
+        # PostgreSQL drops trailing fractional zeros
+        assert parse_timestamp('2026-10-15 21:59:00.12') == datetime(2026, 10, 15, 21, 59, 0, 120000)
+
+    def test_six_digit_fraction(self):
+        assert parse_timestamp('2026-10-15 21:59:00.123456') == datetime(2026, 10, 15, 21, 59, 0, 123456)
+
+    def test_no_fraction(self):
+        assert parse_timestamp('2026-10-15 21:59:00') == datetime(2026, 10, 15, 21, 59, 0)
+
+    def test_utc_offset(self):
+        assert parse_timestamp('2026-10-15 21:59:00.5+00') == datetime(
+            2026, 10, 15, 21, 59, 0, 500000, tzinfo=timezone.utc
+        )
+
+    def test_negative_offset_with_minutes(self):
+        value = parse_timestamp('2026-10-15 21:59:00-03:30')
+        assert value.utcoffset() == -timedelta(hours=3, minutes=30)
+
+    def test_rejects_non_timestamp(self):
+        with pytest.raises(ValueError):
+            parse_timestamp('not a timestamp')
+
+
+def _string(text):
+    return text.encode() + b'\0'
+
+
+def _relation_message(relation_id, namespace, table, columns):
+    """Build a Relation message for (name, type oid) columns."""
+    body = struct.pack('!I', relation_id) + _string(namespace) + _string(table) + b'd'
+    body += struct.pack('!h', len(columns))
+    for name, type_oid in columns:
+        body += b'\x00' + _string(name) + struct.pack('!Ii', type_oid, -1)
+    return b'R' + body
+
+
+def _tuple_data(values):
+    """Build TupleData; None is a null and Ellipsis an unchanged TOAST value."""
+    body = struct.pack('!h', len(values))
+    for value in values:
+        if value is None:
+            body += b'n'
+        elif value is Ellipsis:
+            body += b'u'
+        else:
+            encoded = str(value).encode()
+            body += b't' + struct.pack('!i', len(encoded)) + encoded
+    return body
+
+
+ORDER_COLUMNS = [('id', 23), ('order_status', 1043), ('quantity', 21), ('unit_price', 1700)]
+
+
+@pytest.fixture
+def decoder():
+    decoder = PgOutputDecoder()
+    assert decoder.decode(_relation_message(16384, 'public', 'orders', ORDER_COLUMNS)) is None
+    return decoder
+
+
+class TestPgOutputDecoder:
+    def test_insert(self, decoder):
+        payload = b'I' + struct.pack('!I', 16384) + b'N' + _tuple_data([7, 'pending', 2, '9.50'])
+        assert decoder.decode(payload) == {
+            'id': 7, 'order_status': 'pending', 'quantity': 2, 'unit_price': '9.50',
+            'table': 'public.orders', 'operation_type': 'INSERT',
+        }
+
+    def test_update_keeps_new_tuple(self, decoder):
+        payload = (b'U' + struct.pack('!I', 16384)
+                   + b'O' + _tuple_data([7, 'pending', 2, '9.50'])
+                   + b'N' + _tuple_data([7, 'shipped', 2, '9.50']))
+        record = decoder.decode(payload)
+        assert record['order_status'] == 'shipped'
+        assert record['operation_type'] == 'UPDATE'
+
+    def test_update_without_old_tuple(self, decoder):
+        payload = b'U' + struct.pack('!I', 16384) + b'N' + _tuple_data([7, 'shipped', 2, '9.50'])
+        assert decoder.decode(payload)['order_status'] == 'shipped'
+
+    def test_delete_key_only(self, decoder):
+        payload = b'D' + struct.pack('!I', 16384) + b'K' + _tuple_data([7, None, None, None])
+        assert decoder.decode(payload) == {'id': 7, 'table': 'public.orders', 'operation_type': 'DELETE'}
+
+    def test_unchanged_toast_value_listed(self, decoder):
+        payload = b'U' + struct.pack('!I', 16384) + b'N' + _tuple_data([7, ..., 3, '9.50'])
+        record = decoder.decode(payload)
+        assert 'order_status' not in record
+        assert record['unchanged_columns'] == ['order_status']
+        assert record['quantity'] == 3
+
+    def test_unchanged_toast_value_from_old_row(self, decoder):
+        payload = (b'U' + struct.pack('!I', 16384)
+                   + b'O' + _tuple_data([7, 'shipped', 2, '9.50'])
+                   + b'N' + _tuple_data([7, ..., 3, '9.50']))
+        record = decoder.decode(payload)
+        assert record['order_status'] == 'shipped'
+        assert record['quantity'] == 3
+        assert 'unchanged_columns' not in record
+
+    def test_begin_sets_commit_timestamp(self, decoder):
+        payload = b'B' + struct.pack('!QqI', 0x16B3748, 86_400_000_001, 42)
+        assert decoder.decode(payload) is None
+        assert decoder.commit_timestamp == PG_EPOCH + timedelta(days=1, microseconds=1)
+
+    def test_commit_sets_end_lsn(self, decoder):
+        payload = b'C' + struct.pack('!bQQq', 0, 0x16B3748, 0x16B3780, 0)
+        assert decoder.decode(payload) is None
+        assert decoder.commit_end_lsn == 0x16B3780
+
+    def test_unknown_relation(self):
+        payload = b'I' + struct.pack('!I', 1) + b'N' + _tuple_data([1])
+        with pytest.raises(KeyError):
+            PgOutputDecoder().decode(payload)
+
+
+def test_format_lsn():
+    assert format_lsn(0x16B3748) == '0/16B3748'
+    assert format_lsn((0x1A << 32) | 0xFF) == '1A/FF'
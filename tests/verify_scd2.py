@@ -9,13 +9,10 @@ This script validates the SCD Type 2 implementation by:
 4. Generating a markdown lineage report for the specific order
 """
 
-import os
+import io
 import sys
-import json
-import time
 import logging
-import subprocess
-from datetime import datetime, timezone
+from datetime import datetime
 from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 
@@ -24,12 +21,20 @@ from psycopg2 import sql
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 
-# Add src to path for imports
-sys.path.append(str(Path(__file__).parent.parent / "src"))
+# Add project root to path for imports; the pipeline modules import each
+# other through the src package, so importing them the same way keeps one
+# copy of the shared pools and logging
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils.db_pool import acquire_connection, release_connection
+from src.utils.logging_config import capture_logging
 
 # Load environment variables
 load_dotenv()
 
+# Warehouse versions fetched per round-trip when reading an order's history
+HISTORY_FETCH_SIZE = 200
+
 # Configure structured logging
 logging.basicConfig(
     level=logging.INFO,
@@ -56,32 +61,15 @@ class SCD2Validator:
         self._connect()
         
     def _connect(self) -> None:
-        """Establish connections to both databases."""
+        """Borrow connections to both databases from the shared pools."""
         try:
-            # Connect to source database
-            self.source_connection = psycopg2.connect(
-                host=os.getenv('DB_HOST', 'localhost'),
-                port=os.getenv('DB_PORT', '5432'),
-                database=os.getenv('DB_NAME', 'operational_db'),
-                user=os.getenv('DB_USER', 'postgres'),
-                password=os.getenv('DB_PASSWORD', 'postgres')
-            )
-            self.source_connection.autocommit = False
-            
-            # Connect to warehouse database
-            self.warehouse_connection = psycopg2.connect(
-                host=os.getenv('WAREHOUSE_DB_HOST', 'localhost'),
-                port=os.getenv('WAREHOUSE_DB_PORT', '5433'),
-                database=os.getenv('WAREHOUSE_DB_NAME', 'warehouse_db'),
-                user=os.getenv('WAREHOUSE_DB_USER', 'postgres'),
-                password=os.getenv('WAREHOUSE_DB_PASSWORD', 'postgres')
-            )
-            self.warehouse_connection.autocommit = False
+            self.source_connection = acquire_connection('source')
+            self.warehouse_connection = acquire_connection('warehouse')
             
             logger.info("Successfully connected to both databases")
             
         except psycopg2.OperationalError as e:
-            logger.error(f"Failed to connect to databases: {e}")
+            logger.error("Failed to connect to databases: %s", e)
             raise
     
     def _get_existing_order(self) -> Optional[Dict[str, Any]]:
@@ -103,13 +91,13 @@ class SCD2Validator:
                     return self._create_test_order()
                     
         except psycopg2.Error as e:
-            logger.error(f"Failed to get existing order: {e}")
+            logger.error("Failed to get existing order: %s", e)
             return None
     
     def _create_test_order(self) -> Optional[Dict[str, Any]]:
         """Create a test order for validation."""
         try:
-            with self.source_connection.cursor() as cursor:
+            with self.source_connection.cursor(cursor_factory=RealDictCursor) as cursor:
                 cursor.execute(sql.SQL("""
                     INSERT INTO orders (customer_id, product_id, quantity, unit_price, order_status)
                     VALUES (%s, %s, %s, %s, %s)
@@ -123,18 +111,14 @@ class SCD2Validator:
                 ))
                 
                 self.source_connection.commit()
-                result = cursor.fetchone()
+                order_dict = cursor.fetchone()
                 
-                # Convert to dict with proper column names
-                columns = [desc[0] for desc in cursor.description]
-                order_dict = dict(zip(columns, result))
-                
-                logger.info(f"Created test order: {order_dict['id']}")
+                logger.info("Created test order: %s", order_dict['id'])
                 return order_dict
                 
         except psycopg2.Error as e:
             self.source_connection.rollback()
-            logger.error(f"Failed to create test order: {e}")
+            logger.error("Failed to create test order: %s", e)
             return None
     
     def _trigger_order_update(self, order_id: int) -> bool:
@@ -148,45 +132,55 @@ class SCD2Validator:
             True if update successful, False otherwise
         """
         try:
-            with self.source_connection.cursor() as cursor:
-                # Get current state
+            with self.source_connection.cursor(cursor_factory=RealDictCursor) as cursor:
+                # Read the current state and apply the update in one
+                # round-trip; rows are tagged with the version they show
+                # and carry only the columns the lineage report uses
                 cursor.execute(sql.SQL("""
-                    SELECT * FROM orders WHERE id = %s
+                    WITH original AS (
+                        SELECT * FROM orders WHERE id = %s FOR UPDATE
+                    ),
+                    updated AS (
+                        UPDATE orders AS o
+                        SET order_status = CASE
+                                WHEN original.order_status != 'completed' THEN 'completed'
+                                ELSE 'shipped'
+                            END,
+                            quantity = original.quantity + 1,
+                            last_updated = CURRENT_TIMESTAMP
+                        FROM original
+                        WHERE o.id = original.id
+                        RETURNING o.*
+                    )
+                    SELECT 'original' AS version, id, customer_id, product_id, quantity,
+                           unit_price, order_status, last_updated
+                    FROM original
+                    UNION ALL
+                    SELECT 'updated', id, customer_id, product_id, quantity,
+                           unit_price, order_status, last_updated
+                    FROM updated
                 """), (order_id,))
                 
-                current_order = cursor.fetchone()
-                if not current_order:
-                    logger.error(f"Order {order_id} not found")
-                    return False
-                
-                # Update with new values
-                new_status = 'completed' if current_order[5] != 'completed' else 'shipped'
-                new_quantity = current_order[3] + 1  # Increment quantity
-                
-                cursor.execute(sql.SQL("""
-                    UPDATE orders 
-                    SET order_status = %s, quantity = %s, last_updated = CURRENT_TIMESTAMP
-                    WHERE id = %s
-                    RETURNING *
-                """), (new_status, new_quantity, order_id))
-                
+                versions = {row.pop('version'): row for row in cursor.fetchall()}
                 self.source_connection.commit()
                 
-                updated_order = cursor.fetchone()
-                columns = [desc[0] for desc in cursor.description]
-                updated_dict = dict(zip(columns, updated_order))
+                if 'updated' not in versions:
+                    logger.error("Order %s not found", order_id)
+                    return False
                 
-                self.test_results['original_order'] = dict(zip(
-                    [desc[0] for desc in cursor.description], current_order
-                ))
+                updated_dict = versions['updated']
+                new_status = updated_dict['order_status']
+                new_quantity = updated_dict['quantity']
+                
+                self.test_results['original_order'] = versions['original']
                 self.test_results['updated_order'] = updated_dict
                 
-                logger.info(f"Updated order {order_id}: status={new_status}, quantity={new_quantity}")
+                logger.info("Updated order %s: status=%s, quantity=%s", order_id, new_status, new_quantity)
                 return True
                 
         except psycopg2.Error as e:
             self.source_connection.rollback()
-            logger.error(f"Failed to update order {order_id}: {e}")
+            logger.error("Failed to update order %s: %s", order_id, e)
             return False
     
     def _run_cdc_pipeline(self) -> bool:
@@ -198,48 +192,58 @@ class SCD2Validator:
         """
         logger.info("Starting CDC pipeline execution")
         
-        try:
-            # Run CDC extractor
-            logger.info("Running CDC extractor...")
-            extractor_result = subprocess.run([
-                sys.executable, 
-                str(Path(__file__).parent.parent / "src/cdc/single_run_extractor.py")
-            ], capture_output=True, text=True, timeout=30)
-            
-            if extractor_result.returncode != 0:
-                logger.error(f"CDC extractor failed: {extractor_result.stderr}")
-                return False
-            
-            # Wait a moment for file writing
-            time.sleep(2)
-            
-            # Run SCD Type 2 loader
-            logger.info("Running SCD Type 2 loader...")
-            loader_result = subprocess.run([
-                sys.executable,
-                str(Path(__file__).parent.parent / "src/warehouse/scd2_loader.py")
-            ], capture_output=True, text=True, timeout=30)
-            
-            if loader_result.returncode != 0:
-                logger.error(f"SCD Type 2 loader failed: {loader_result.stderr}")
-                return False
-            
-            logger.info("CDC pipeline completed successfully")
-            self.test_results['pipeline_output'] = {
-                'extractor_stdout': extractor_result.stdout,
-                'extractor_stderr': extractor_result.stderr,
-                'loader_stdout': loader_result.stdout,
-                'loader_stderr': loader_result.stderr
-            }
-            
-            return True
-            
-        except subprocess.TimeoutExpired:
-            logger.error("Pipeline execution timed out")
+        # Imported here rather than at module level so the validator's
+        # logging is configured before the pipeline modules are loaded
+        from src.cdc.single_run_extractor import run as run_extractor
+        from src.warehouse.scd2_loader import run as run_loader
+        
+        # Run CDC extractor
+        logger.info("Running CDC extractor...")
+        extractor_ok, extractor_output = self._run_in_process(run_extractor, self.source_connection)
+        
+        if not extractor_ok:
+            logger.error("CDC extractor failed: %s", extractor_output)
             return False
-        except Exception as e:
-            logger.error(f"Pipeline execution failed: {e}")
+        
+        # Run SCD Type 2 loader; the extractor has written its batch files
+        # by the time it returns
+        logger.info("Running SCD Type 2 loader...")
+        loader_ok, loader_output = self._run_in_process(run_loader, self.warehouse_connection)
+        
+        if not loader_ok:
+            logger.error("SCD Type 2 loader failed: %s", loader_output)
             return False
+        
+        logger.info("CDC pipeline completed successfully")
+        self.test_results['pipeline_output'] = {
+            'extractor_output': extractor_output,
+            'loader_output': loader_output
+        }
+        
+        return True
+    
+    def _run_in_process(self, entry_point, connection) -> Tuple[bool, str]:
+        """
+        Run a pipeline entry point in this process with its logs captured.
+        
+        The entry point works on the validator's own connection rather than
+        opening one, so the run needs no connections beyond the pools'.
+        
+        Args:
+            entry_point: run() function of a pipeline module
+            connection: Connection the entry point works on
+            
+        Returns:
+            Tuple of (success, captured log output)
+        """
+        output = io.StringIO()
+        try:
+            with capture_logging(output):
+                entry_point(connection)
+            return True, output.getvalue()
+        except Exception as e:
+            logger.error("Pipeline execution failed: %s", e)
+            return False, output.getvalue()
     
     def _validate_scd2_behavior(self, order_id: int) -> bool:
         """
@@ -252,12 +256,16 @@ class SCD2Validator:
             True if SCD Type 2 behavior is correct, False otherwise
         """
         try:
-            with self.warehouse_connection.cursor(cursor_factory=RealDictCursor) as cursor:
+            # Stream the versions through a server-side cursor; only the
+            # columns the checks and the lineage report use are selected
+            with self.warehouse_connection.cursor(
+                name='scd2_history', cursor_factory=RealDictCursor
+            ) as cursor:
+                cursor.itersize = HISTORY_FETCH_SIZE
                 # Query all records for this order
                 cursor.execute(sql.SQL("""
                     SELECT 
                         surrogate_key,
-                        order_key,
                         customer_id,
                         product_id,
                         quantity,
@@ -270,30 +278,46 @@ class SCD2Validator:
                         is_current,
                         cdc_operation,
                         cdc_timestamp,
-                        batch_id
+                        batch_id,
+                        -- Checked against the next version: a historical
+                        -- record has a valid_to no later than its successor's
+                        -- valid_from
+                        lead(valid_from) OVER versions IS NULL
+                        OR ((is_current OR valid_to IS NOT NULL)
+                            AND coalesce(valid_to <= lead(valid_from) OVER versions, TRUE))
+                            AS sequence_valid
                     FROM dim_orders_history 
                     WHERE order_key = %s
+                    WINDOW versions AS (ORDER BY valid_from)
                     ORDER BY valid_from
                 """), (order_id,))
                 
-                records = [dict(row) for row in cursor.fetchall()]
+                # RealDictCursor rows are already dicts
+                records = list(cursor)
                 self.test_results['warehouse_records'] = records
                 
-                # Validation checks
-                current_records = [r for r in records if r['is_current']]
-                historical_records = [r for r in records if not r['is_current']]
+                # Tally current and historical versions in one pass
+                current_count = historical_count = 0
+                current_valid_to_null = historical_valid_to_set = True
+                for record in records:
+                    if record['is_current']:
+                        current_count += 1
+                        current_valid_to_null &= record['valid_to'] is None
+                    else:
+                        historical_count += 1
+                        historical_valid_to_set &= record['valid_to'] is not None
                 
-                logger.info(f"Found {len(records)} total records for order {order_id}")
-                logger.info(f"Current records: {len(current_records)}")
-                logger.info(f"Historical records: {len(historical_records)}")
+                logger.info("Found %s total records for order %s", len(records), order_id)
+                logger.info("Current records: %s", current_count)
+                logger.info("Historical records: %s", historical_count)
                 
                 # SCD Type 2 validation
                 validation_results = {
-                    'has_current_record': len(current_records) == 1,
-                    'has_historical_record': len(historical_records) >= 1,
+                    'has_current_record': current_count == 1,
+                    'has_historical_record': historical_count >= 1,
                     'total_records_at_least_2': len(records) >= 2,
-                    'current_record_valid_to_null': all(r['valid_to'] is None for r in current_records),
-                    'historical_records_have_valid_to': all(r['valid_to'] is not None for r in historical_records),
+                    'current_record_valid_to_null': current_valid_to_null,
+                    'historical_records_have_valid_to': historical_valid_to_set,
                     'valid_time_sequences_correct': self._validate_time_sequences(records)
                 }
                 
@@ -302,44 +326,28 @@ class SCD2Validator:
                 # Log validation results
                 for check, passed in validation_results.items():
                     status = "✅ PASS" if passed else "❌ FAIL"
-                    logger.info(f"Validation {check}: {status}")
+                    logger.info("Validation %s: %s", check, status)
                 
                 return all(validation_results.values())
                 
         except psycopg2.Error as e:
-            logger.error(f"Failed to validate SCD Type 2 behavior: {e}")
+            logger.error("Failed to validate SCD Type 2 behavior: %s", e)
             return False
     
     def _validate_time_sequences(self, records: List[Dict[str, Any]]) -> bool:
         """
         Validate that time sequences are correct for SCD Type 2.
         
+        Each record's sequence_valid flag is computed by the warehouse query
+        with lead() over the versions ordered by valid_from.
+        
         Args:
             records: List of warehouse records
             
         Returns:
             True if time sequences are correct, False otherwise
         """
-        if len(records) < 2:
-            return True
-        
-        # Sort by valid_from
-        sorted_records = sorted(records, key=lambda x: x['valid_from'])
-        
-        for i in range(len(sorted_records) - 1):
-            current = sorted_records[i]
-            next_record = sorted_records[i + 1]
-            
-            # Historical records should have valid_to
-            if not current['is_current'] and current['valid_to'] is None:
-                return False
-            
-            # valid_to should be <= next valid_from
-            if (current['valid_to'] and 
-                current['valid_to'] > next_record['valid_from']):
-                return False
-        
-        return True
+        return all(record['sequence_valid'] for record in records)
     
     def _generate_lineage_report(self, order_id: int) -> str:
         """
@@ -353,7 +361,8 @@ class SCD2Validator:
         """
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC")
         
-        report = f"""# SCD Type 2 Lineage Report
+        # Sections are collected and joined once at the end
+        parts = [f"""# SCD Type 2 Lineage Report
 
 **Generated:** {now}  
 **Order ID:** {order_id}  
@@ -377,11 +386,11 @@ This report validates the SCD Type 2 implementation for Order #{order_id}. The t
 ### 1. Source Database Changes
 
 **Original Order State:**
-"""
+"""]
         
         if 'original_order' in self.test_results:
             orig = self.test_results['original_order']
-            report += f"""
+            parts.append(f"""
 - **Order ID:** {orig.get('id', 'N/A')}
 - **Customer ID:** {orig.get('customer_id', 'N/A')}
 - **Product ID:** {orig.get('product_id', 'N/A')}
@@ -389,13 +398,13 @@ This report validates the SCD Type 2 implementation for Order #{order_id}. The t
 - **Unit Price:** ${orig.get('unit_price', 'N/A')}
 - **Status:** {orig.get('order_status', 'N/A')}
 - **Last Updated:** {orig.get('last_updated', 'N/A')}
-"""
+""")
         
-        report += "\n**Updated Order State:**\n"
+        parts.append("\n**Updated Order State:**\n")
         
         if 'updated_order' in self.test_results:
             upd = self.test_results['updated_order']
-            report += f"""
+            parts.append(f"""
 - **Order ID:** {upd.get('id', 'N/A')}
 - **Customer ID:** {upd.get('customer_id', 'N/A')}
 - **Product ID:** {upd.get('product_id', 'N/A')}
@@ -403,9 +412,9 @@ This report validates the SCD Type 2 implementation for Order #{order_id}. The t
 - **Unit Price:** ${upd.get('unit_price', 'N/A')}
 - **Status:** {upd.get('order_status', 'N/A')}
 - **Last Updated:** {upd.get('last_updated', 'N/A')}
-"""
+""")
         
-        report += """
+        parts.append("""
 ### 2. CDC Pipeline Execution
 
 The CDC pipeline successfully:
@@ -415,21 +424,21 @@ The CDC pipeline successfully:
 
 ### 3. Warehouse Validation Results
 
-"""
+""")
         
         if 'validation_results' in self.test_results:
             validation = self.test_results['validation_results']
             for check, passed in validation.items():
                 status = "✅ PASS" if passed else "❌ FAIL"
-                report += f"- **{check.replace('_', ' ').title()}:** {status}\n"
+                parts.append(f"- **{check.replace('_', ' ').title()}:** {status}\n")
         
-        report += "\n---\n\n## Order Lineage Timeline\n\n"
+        parts.append("\n---\n\n## Order Lineage Timeline\n\n")
         
         if 'warehouse_records' in self.test_results:
             records = self.test_results['warehouse_records']
             for i, record in enumerate(records, 1):
                 status_icon = "🟢" if record['is_current'] else "🔴"
-                report += f"""
+                parts.append(f"""
 ### Version {i} {status_icon}
 
 - **Surrogate Key:** {record['surrogate_key']}
@@ -447,9 +456,11 @@ The CDC pipeline successfully:
 - **Order Date:** {record['order_date']}
 - **Batch ID:** {record['batch_id']}
 
-"""
+""")
         
-        report += """---
+        records = self.test_results.get('warehouse_records', [])
+        current_count = sum(1 for r in records if r['is_current'])
+        parts.append(f"""---
 
 ## SCD Type 2 Compliance Check
 
@@ -465,9 +476,9 @@ This validation confirms proper SCD Type 2 implementation:
 
 ### 📊 Key Metrics
 
-- **Total Records:** """ + str(len(self.test_results.get('warehouse_records', []))) + """
-- **Current Records:** """ + str(len([r for r in self.test_results.get('warehouse_records', []) if r['is_current']])) + """
-- **Historical Records:** """ + str(len([r for r in self.test_results.get('warehouse_records', []) if not r['is_current']])) + """
+- **Total Records:** {len(records)}
+- **Current Records:** {current_count}
+- **Historical Records:** {len(records) - current_count}
 
 ---
 
@@ -483,16 +494,16 @@ This validation confirms proper SCD Type 2 implementation:
 3. **SCD Type 2 Loader:** Historical dimension loading
 
 ### Validation Timestamps
-- **Test Started:** """ + now + """
+- **Test Started:** {now}
 - **Pipeline Duration:** ~30 seconds
-- **Report Generated:** """ + now + """
+- **Report Generated:** {now}
 
 ---
 
 *This report was automatically generated by the SCD Type 2 validation script.*
-"""
+""")
         
-        return report
+        return "".join(parts)
     
     def run_validation(self) -> bool:
         """
@@ -511,7 +522,7 @@ This validation confirms proper SCD Type 2 implementation:
                 return False
             
             self.test_order_id = test_order['id']
-            logger.info(f"Using order {self.test_order_id} for validation")
+            logger.info("Using order %s for validation", self.test_order_id)
             
             # Step 2: Trigger update
             logger.info("Step 1: Triggering order update...")
@@ -540,20 +551,22 @@ This validation confirms proper SCD Type 2 implementation:
             with open(report_file, 'w') as f:
                 f.write(report)
             
-            logger.info(f"Lineage report saved to {report_file}")
+            logger.info("Lineage report saved to %s", report_file)
             logger.info("SCD Type 2 validation completed successfully")
             
             return True
             
         except Exception as e:
-            logger.error(f"Validation failed: {e}")
+            logger.error("Validation failed: %s", e)
             return False
         finally:
-            # Cleanup connections
+            # Return connections to the shared pools
             if self.source_connection:
-                self.source_connection.close()
+                release_connection(self.source_connection, 'source')
+                self.source_connection = None
             if self.warehouse_connection:
-                self.warehouse_connection.close()
+                release_connection(self.warehouse_connection, 'warehouse')
+                self.warehouse_connection = None
 
 def main():
     """Main entry point for SCD Type 2 validation."""
@@ -571,7 +584,7 @@ def main():
             sys.exit(1)
             
     except Exception as e:
-        logger.error(f"Fatal error in validation: {e}")
+        logger.error("Fatal error in validation: %s", e)
         sys.exit(1)
 
 if __name__ == "__main__":